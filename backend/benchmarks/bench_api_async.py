@@ -0,0 +1,159 @@
+"""
+Load test: /api throughput and tail latency, async vs sync database path.
+
+Usage (from the backend directory):
+    python benchmarks/bench_api_async.py [--seconds 10] [--concurrency 64] [--cinemas 8]
+
+Seeds a throwaway database, then starts uvicorn once per API_DB_MODE
+("sync": regular engine in the threadpool, "async": aiosqlite on the event
+loop) with the response cache disabled, so every request reaches the
+database. A pool of concurrent clients hits a mix of paginated
+/api/movies, /api/movies/grouped, /api/favorites and /api/status requests.
+Reports requests/s, p50/p95/p99 latency and errors for each mode.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from bench_read_latency import make_catalogue, percentile, sync_catalogue  # noqa: E402
+
+MODES = ("sync", "async")
+API_KEY = "bench"
+
+# (weight, path) of the request mix
+REQUESTS = [
+    (6, "/api/movies?limit=100"),
+    (2, "/api/movies/grouped"),
+    (1, "/api/favorites"),
+    (1, "/api/status"),
+]
+
+
+def seed_database(args):
+    """Child process: create and fill the database named by DATABASE_URL."""
+    sys.path.insert(0, BACKEND_DIR)
+    logging.disable(logging.CRITICAL)
+    import database
+
+    database.init_db()
+    with database.SessionLocal() as db:
+        sync_catalogue(db, make_catalogue(args.cinemas, args.movies, args.days, args.times, seed=0))
+        for m in range(0, args.movies, 5):
+            db.add(database.Favorite(movie_title=f"Movie {m}"))
+        db.commit()
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_ready(client, base_url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            await client.get(f"{base_url}/api/status", headers={"X-API-Key": API_KEY})
+            return
+        except httpx.TransportError:
+            await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
+
+
+async def load(base_url, seconds, concurrency, seed):
+    rng = random.Random(seed)
+    paths = [path for weight, path in REQUESTS for _ in range(weight)]
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+        await wait_ready(client, base_url)
+
+        async def worker(deadline):
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(rng.choice(paths), headers={"X-API-Key": API_KEY})
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        # Short warm-up so pools and caches of both modes start equal
+        await asyncio.gather(*(worker(time.monotonic() + 1.0) for _ in range(concurrency)))
+        latencies.clear()
+        errors = 0
+        started = time.monotonic()
+        await asyncio.gather(*(worker(started + seconds) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return latencies, errors, elapsed
+
+
+def run_mode(mode, tmp, args):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+        API_KEY=API_KEY,
+        API_DB_MODE=mode,
+        RESPONSE_CACHE_TTL="0",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         "--app-dir", BACKEND_DIR],
+        env=env, cwd=tmp,
+    )
+    try:
+        return asyncio.run(load(f"http://127.0.0.1:{port}", args.seconds, args.concurrency, seed=1))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--cinemas", type=int, default=8)
+    parser.add_argument("--movies", type=int, default=25)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--times", type=int, default=4)
+    parser.add_argument("--seed-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed_only:
+        seed_database(args)
+        return
+
+    rows = args.cinemas * args.movies * args.days * args.times
+    print(f"~{rows} showtimes, {args.concurrency} concurrent clients, {args.seconds:.0f}s per mode\n")
+    print(f"{'mode':<6} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db")
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--seed-only"] + sys.argv[1:],
+            env=env, cwd=tmp, check=True,
+        )
+        for mode in MODES:
+            latencies, errors, elapsed = run_mode(mode, tmp, args)
+            print(f"{mode:<6} {len(latencies):>9} {len(latencies) / elapsed:>8.1f} "
+                  f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 95) * 1000:>8.1f} "
+                  f"{percentile(latencies, 99) * 1000:>8.1f} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
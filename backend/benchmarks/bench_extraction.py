@@ -0,0 +1,162 @@
+"""
+Micro-benchmark of the per-row field extraction of the parsers.
+
+Usage (from the backend directory):
+    python benchmarks/bench_extraction.py [--scale 10] [--repeat 5] [--keywords 8]
+
+Times what both parser backends do for every movie row once its strings
+are out of the HTML tree: resolve the day label, build the movie fields
+(title cleaning, URLs, age rating), apply the skip keywords and build each
+showtime (start time, details type). The rows are those of a synthetic
+page (see synthetic.py), so every movie repeats once per day.
+
+"baseline" is the extraction as it was before parsers.ExtractionContext:
+the skip keywords re-read per page and checked with any(), the title
+cleaned with str.replace + re.sub, datetime.now() per day label and
+strptime per showtime. Both variants must produce the same records.
+"""
+import argparse
+import datetime
+import logging
+import os
+import re
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+import parsers  # noqa: E402
+from synthetic import TIMES, TYPES, day_label  # noqa: E402
+
+URL = "https://cinema.example"
+FIELDS = parsers.SHOWTIME_FIELDS
+
+
+def make_rows(today, scale, days=7, movies=14):
+    """The raw strings of synthetic.make_page's rows: [(day label, [(movie fields, [time slots])])]."""
+    rows = []
+    for d in range(days):
+        day_rows = []
+        for m in range(movies * scale):
+            movie = (f"/img/p{m}.jpg", f"Film {m}  - With english subtitles", f"/film/{m}",
+                     ["drama", "vígjáték"], f"/images/ages/{m % 13 + 1}.png")
+            slots = [(t, f"/jegy/{d}{m}{i}", kind.strip() or None) for i, (t, kind) in enumerate(zip(TIMES, TYPES))]
+            day_rows.append((movie, slots))
+        rows.append((day_label(today, d), day_rows))
+    return rows
+
+
+# --- The extraction before ExtractionContext, for reference ---
+
+def baseline_clean_movie_title(title):
+    for phrase in parsers.TITLE_SUFFIXES:
+        title = title.replace(phrase, "")
+    return re.sub(r'\s+', ' ', title).strip()
+
+
+def baseline_details_type(type_text):
+    if not type_text:
+        return 'szinkronizált'
+    type_text = type_text.strip().upper()
+    if type_text == 'M':
+        return 'magyar nyelvű'
+    if type_text == 'F':
+        return 'feliratos'
+    if type_text == 'E':
+        return 'eredeti nyelvű'
+    return 'szinkronizált'
+
+
+def baseline_day_label(label):
+    # parse_day_label without `today` still calls datetime.now() per label
+    return parsers.parse_day_label(label)
+
+
+def baseline_extract(rows, cinema_name):
+    skip_keywords = parsers.get_skip_keywords()
+    out = []
+    for label, day_rows in rows:
+        date_str_fmt = baseline_day_label(label)
+        for (poster_src, raw_title, href, genres, age_src), slots in day_rows:
+            poster_url = poster_src
+            if poster_url and not poster_url.startswith("http"):
+                poster_url = parsers.absolute_url(URL, poster_url)
+            age_restriction, age_restriction_url = parsers.parse_age(age_src, URL)
+            movie = {
+                "movie_title": baseline_clean_movie_title(raw_title),
+                "movie_url": parsers.absolute_url(URL, href),
+                "poster_url": poster_url,
+                "genre": ", ".join(genres) if genres else None,
+                "age_restriction": age_restriction,
+                "age_restriction_url": age_restriction_url,
+            }
+            title = movie["movie_title"].lower()
+            if any(k in title for k in skip_keywords):
+                continue
+            for start_time_str, ticket_href, type_code in slots:
+                start_time = datetime.datetime.strptime(f"{date_str_fmt} {start_time_str}", "%Y-%m-%d %H:%M")
+                out.append(parsers.ScrapedShowtime(
+                    cinema_name=cinema_name, movie_title=movie["movie_title"], start_time=start_time,
+                    date_str=date_str_fmt, ticket_url=parsers.absolute_url(URL, ticket_href),
+                    movie_url=movie["movie_url"], poster_url=movie["poster_url"], genre=movie["genre"],
+                    age_restriction=movie["age_restriction"], details_type=baseline_details_type(type_code),
+                    age_restriction_url=movie["age_restriction_url"],
+                ))
+    return out
+
+
+def context_extract(rows, cinema_name, today):
+    context = parsers.ExtractionContext()
+    out = []
+    for label, day_rows in rows:
+        date_str_fmt = context.day(label, today)
+        for (poster_src, raw_title, href, genres, age_src), slots in day_rows:
+            movie = context.movie(URL, poster_src, raw_title, href, genres, age_src)
+            if context.is_skipped(movie["movie_title"]):
+                continue
+            for start_time_str, ticket_href, type_code in slots:
+                out.append(context.showtime(cinema_name, movie, date_str_fmt, start_time_str, ticket_href,
+                                            type_code, URL))
+    return out
+
+
+def best_of(repeat, fn, *args):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=10, help="page scale (see synthetic.py)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes; the best is reported")
+    parser.add_argument("--keywords", type=int, default=8, help="number of SKIP_MOVIE_KEYWORDS")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    os.environ["SKIP_MOVIE_KEYWORDS"] = ",".join(["Film 3 "] + [f"keyword{i}" for i in range(args.keywords - 1)])
+    today = datetime.date.today()
+    rows = make_rows(today, args.scale)
+    movie_rows = sum(len(day_rows) for _, day_rows in rows)
+
+    baseline_time, expected = best_of(args.repeat, baseline_extract, rows, "Sample Mozi")
+    context_time, found = best_of(args.repeat, context_extract, rows, "Sample Mozi", today)
+    if [[getattr(st, f) for f in FIELDS] for st in expected] != [[getattr(st, f) for f in FIELDS] for st in found]:
+        sys.exit("ExtractionContext output differs from the baseline")
+
+    print(f"{movie_rows} movie rows, {len(found)} showtimes, {args.keywords} skip keywords\n")
+    print(f"{'variant':<10} {'total ms':>9} {'us/row':>8} {'us/showtime':>12}")
+    for name, elapsed in (("baseline", baseline_time), ("context", context_time)):
+        print(f"{name:<10} {elapsed * 1000:>9.1f} {elapsed / movie_rows * 1e6:>8.2f} "
+              f"{elapsed / len(found) * 1e6:>12.2f}")
+    print(f"\nspeedup: {baseline_time / context_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
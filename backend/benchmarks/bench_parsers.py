@@ -0,0 +1,115 @@
+"""
+Compare the scraper's HTML parser backends on saved cinema pages.
+
+Usage (from the backend directory):
+    python benchmarks/bench_parsers.py [--pages DIR] [--repeat N]
+
+Every backend parses every *.html file in DIR. Reports pages/sec and the
+peak memory of a parse pass, and checks that all backends extract the
+same showtimes as the BeautifulSoup reference.
+"""
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import resource
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from parsers import PARSER_BACKENDS, parse_cinema_page  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIXTURE_URL = "https://cinema.example"
+FIELDS = (
+    "cinema_name", "movie_title", "start_time", "date_str", "ticket_url", "movie_url",
+    "poster_url", "genre", "age_restriction", "details_type", "age_restriction_url",
+)
+
+
+def load_pages(directory):
+    pages = []
+    for path in sorted(glob.glob(os.path.join(directory, "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            pages.append((os.path.basename(path), f.read()))
+    return pages
+
+
+def extract(pages, backend):
+    return [
+        [tuple(getattr(st, f) for f in FIELDS) for st in parse_cinema_page(html, FIXTURE_URL, backend)]
+        for _, html in pages
+    ]
+
+
+def run_backend(backend, directory, repeat, queue):
+    """Runs in a fresh process so RSS figures are not shared between backends."""
+    logging.disable(logging.CRITICAL)
+    pages = load_pages(directory)
+    extract(pages, backend)  # warm-up
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        extract(pages, backend)
+    elapsed = time.perf_counter() - started
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    extract(pages, backend)
+    _, py_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    queue.put({
+        "backend": backend,
+        "pages_per_sec": len(pages) * repeat / elapsed,
+        "py_peak_kb": py_peak / 1024,
+        "max_rss_kb": rss_after,
+        "rss_growth_kb": rss_after - rss_before,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default=FIXTURE_DIR, help="directory of saved cinema pages (*.html)")
+    parser.add_argument("--repeat", type=int, default=20, help="timed passes over all pages")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    pages = load_pages(args.pages)
+    if not pages:
+        sys.exit(f"No *.html pages found in {args.pages}")
+    total_bytes = sum(len(html.encode("utf-8")) for _, html in pages)
+    print(f"{len(pages)} page(s), {total_bytes / 1024:.0f} KiB, {args.repeat} passes\n")
+
+    reference = extract(pages, "bs4")
+    for backend in PARSER_BACKENDS:
+        if extract(pages, backend) != reference:
+            sys.exit(f"Backend '{backend}' does not match the bs4 reference output")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = []
+    for backend in PARSER_BACKENDS:
+        queue = ctx.Queue()
+        proc = ctx.Process(target=run_backend, args=(backend, args.pages, args.repeat, queue))
+        proc.start()
+        results.append(queue.get())
+        proc.join()
+
+    base = results[0]["pages_per_sec"]
+    print(f"{'backend':<8} {'pages/s':>10} {'speedup':>8} {'py peak KiB':>12} {'max RSS KiB':>12} {'RSS growth':>11}")
+    for r in results:
+        print(
+            f"{r['backend']:<8} {r['pages_per_sec']:>10.1f} {r['pages_per_sec'] / base:>7.2f}x "
+            f"{r['py_peak_kb']:>12.0f} {r['max_rss_kb']:>12} {r['rss_growth_kb']:>11}"
+        )
+    rows = sum(len(r) for r in reference)
+    print(f"\nAll backends extracted the same {rows} showtimes.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Load test: /api/movies read latency while a scrape is writing.
+
+Usage (from the backend directory):
+    python benchmarks/bench_read_latency.py [--seconds 10] [--readers 8] [--cinemas 8]
+
+Runs the same workload against a throwaway database twice: once with the
+old SQLite defaults (rollback journal, synchronous=FULL, no mmap) and once
+with the tuned storage settings from database.py (WAL, synchronous=NORMAL,
+mmap, larger page cache). Readers run a paginated /api/movies query and
+its serialization in a loop while a writer repeatedly syncs a perturbed
+catalogue in one transaction, like a full scrape_all. Readers are separate
+processes, as with several uvicorn workers. Reports p50/p95/p99 read
+latency, lock errors and write throughput for each profile.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROFILES = {
+    "baseline": {
+        "SQLITE_JOURNAL_MODE": "DELETE",
+        "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_MMAP_SIZE": "0",
+        "SQLITE_CACHE_SIZE": "-2000",
+        "SQLITE_TEMP_STORE": "DEFAULT",
+    },
+    "tuned": {},
+}
+
+
+def make_catalogue(cinemas, movies, days, times, seed):
+    """Synthetic scrape output; `seed` perturbs ticket URLs and drops a few slots."""
+    from parsers import ScrapedShowtime
+
+    rng = random.Random(seed)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    records = []
+    for c in range(cinemas):
+        for m in range(movies):
+            for d in range(days):
+                day = today + timedelta(days=d)
+                for t in range(times):
+                    if rng.random() < 0.05:
+                        continue
+                    start = day + timedelta(hours=10 + t * 3)
+                    records.append(ScrapedShowtime(
+                        cinema_name=f"Cinema {c}",
+                        movie_title=f"Movie {m}",
+                        start_time=start,
+                        date_str=start.strftime("%Y-%m-%d"),
+                        ticket_url=f"https://cinema{c}.example/jegy/{m}-{d}-{t}?v={rng.randint(0, 3)}",
+                        movie_url=f"https://cinema{c}.example/film/{m}",
+                        poster_url=f"https://cinema{c}.example/poster/{m}.jpg",
+                        genre="dráma",
+                        age_restriction="12",
+                        details_type="feliratos" if t % 2 else "szinkronizált",
+                        age_restriction_url=None,
+                    ))
+    return records
+
+
+def sync_catalogue(db, records):
+    """
+    Sync a catalogue (records grouped by cinema, as make_catalogue returns
+    them) the way a full scrape does: one ScrapeResult per cinema through
+    scraper._sync_full, which commits. Returns its stats.
+    """
+    from itertools import groupby
+    from scraper import ScrapeResult, parse_lazily, _sync_full
+
+    results = []
+    for cinema_name, rows in groupby(records, key=lambda st: st.cinema_name):
+        result = ScrapeResult(f"https://{cinema_name.lower().replace(' ', '')}.example/", cinema_name)
+        result.showtimes = parse_lazily(result, iter(list(rows)))
+        results.append(result)
+    return _sync_full(db, results)
+
+
+def percentile(values, pct):
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def read_loop(deadline, queue):
+    """Reader process: run the /api/movies query until the deadline."""
+    logging.disable(logging.CRITICAL)
+    from sqlalchemy.exc import OperationalError
+    import database
+    from main import query_movies, showtime_list_adapter
+
+    database.engine.dispose(close=False)  # do not reuse the parent's connections
+    latencies = []
+    errors = 0
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            with database.SessionLocal() as db:
+                rows, _ = query_movies(db, limit=200)
+                showtime_list_adapter.dump_json(
+                    showtime_list_adapter.validate_python(rows, from_attributes=True)
+                )
+        except OperationalError:
+            errors += 1
+            continue
+        latencies.append(time.perf_counter() - started)
+    queue.put((latencies, errors))
+
+
+def run_profile(args):
+    """Child process: the database module reads its settings from the environment."""
+    sys.path.insert(0, BACKEND_DIR)
+    logging.disable(logging.CRITICAL)
+    import multiprocessing
+    from sqlalchemy.exc import OperationalError
+    import database
+
+    database.init_db()
+    shape = (args.cinemas, args.movies, args.days, args.times)
+    with database.SessionLocal() as db:
+        sync_catalogue(db, make_catalogue(*shape, seed=0))
+    database.engine.dispose()
+
+    # Readers are separate processes so they contend for SQLite locks, not the GIL
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    deadline = time.time() + args.seconds
+    readers = [ctx.Process(target=read_loop, args=(deadline, queue)) for _ in range(args.readers)]
+    for proc in readers:
+        proc.start()
+
+    writes = []
+    write_errors = 0
+    seed = 1
+    while time.time() < deadline:
+        catalogue = make_catalogue(*shape, seed=seed)
+        started = time.perf_counter()
+        try:
+            with database.SessionLocal() as db:
+                sync_catalogue(db, catalogue)
+            writes.append(time.perf_counter() - started)
+        except OperationalError:
+            write_errors += 1
+        seed += 1
+
+    latencies = []
+    errors = write_errors
+    for _ in readers:
+        reader_latencies, reader_errors = queue.get()
+        latencies.extend(reader_latencies)
+        errors += reader_errors
+    for proc in readers:
+        proc.join()
+
+    print(json.dumps({
+        "reads": len(latencies),
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies, default=float("nan")) * 1000,
+        "errors": errors,
+        "syncs": len(writes),
+        "sync_ms": sum(writes) / len(writes) * 1000 if writes else float("nan"),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--cinemas", type=int, default=8)
+    parser.add_argument("--movies", type=int, default=25)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--times", type=int, default=4)
+    parser.add_argument("--profile", choices=PROFILES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.profile:
+        run_profile(args)
+        return
+
+    rows = args.cinemas * args.movies * args.days * args.times
+    print(f"~{rows} showtimes, {args.readers} readers, 1 writer, {args.seconds:.0f}s per profile\n")
+    print(f"{'profile':<9} {'reads':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+          f"{'errors':>7} {'syncs':>6} {'sync ms':>8}")
+    for name, overrides in PROFILES.items():
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", **overrides)
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--profile", name] + sys.argv[1:],
+                env=env, cwd=tmp, capture_output=True, text=True, check=True,
+            ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{name:<9} {r['reads']:>7} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f} "
+              f"{r['max_ms']:>8.1f} {r['errors']:>7} {r['syncs']:>6} {r['sync_ms']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""
+Offline benchmark of the scrape pipeline on synthetic pages.
+
+Usage (from the backend directory):
+    python benchmarks/bench_scrape_pipeline.py [--scales 1,10,100] [--cinemas 4] [--repeat 3]
+
+For each scale (1 = the size of a real cinema page, see synthetic.py):
+  * parse throughput of every parser backend (showtimes/s, MiB/s);
+  * scrape_all against a local replay server (see replay.py) on a fresh
+    database: the initial run, a repeat run (answered with 304s) and a run
+    where ~10% of every cinema's showtimes changed, with the sync time and
+    total duration of each;
+  * the size of the resulting SQLite database.
+Each scale runs in its own process with its own database. The same
+measurements run as pytest-benchmark tests in tests/test_benchmarks.py.
+"""
+import argparse
+import datetime
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from synthetic import make_page  # noqa: E402
+
+RUNS = ("initial", "repeat", "changed")
+
+
+def write_recordings(directory, today, cinemas, scale, variant):
+    """A recording directory (see replay.py) of synthetic cinema pages."""
+    from replay import INDEX_FILE, page_slug
+
+    os.makedirs(directory, exist_ok=True)
+    index = {}
+    for c in range(cinemas):
+        url = f"https://cinema{c}.example/musor"
+        slug = page_slug(url)
+        with open(os.path.join(directory, f"{slug}.html"), "w", encoding="utf-8") as f:
+            f.write(make_page(today, scale=scale, cinema=f"Cinema {c}", variant=variant * (c + 1)))
+        index[url] = {"file": f"{slug}.html", "recorded_at": today.isoformat()}
+    with open(os.path.join(directory, INDEX_FILE), "w", encoding="utf-8") as f:
+        json.dump(index, f)
+    return list(index)
+
+
+def bench_parse(today, scale, repeat):
+    from parsers import PARSER_BACKENDS, parse_cinema_page
+
+    html = make_page(today, scale=scale)
+    size = len(html.encode("utf-8"))
+    results = {}
+    for backend in PARSER_BACKENDS:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            count = len(parse_cinema_page(html, "https://cinema.example", backend, today=today))
+        elapsed = (time.perf_counter() - started) / repeat
+        results[backend] = {"showtimes_per_sec": count / elapsed, "mib_per_sec": size / elapsed / 2**20}
+    return size, count, results
+
+
+def run_scale(args):
+    """Child process: the database module reads DATABASE_URL on import."""
+    logging.disable(logging.CRITICAL)
+    today = datetime.date.today()
+    tmp = os.environ["BENCH_DIR"]
+    size, count, parse = bench_parse(today, args.scale, args.repeat)
+
+    from replay import ReplayServer
+    base_dir, changed_dir = os.path.join(tmp, "base"), os.path.join(tmp, "changed")
+    urls = write_recordings(base_dir, today, args.cinemas, args.scale, variant=0)
+    write_recordings(changed_dir, today, args.cinemas, args.scale, variant=1)
+    os.environ["MOVIE_THEATER_URLS"] = ",".join(urls)
+
+    import database
+    from scraper import scrape_all
+
+    database.init_db()
+    runs = {}
+    for run, directory in zip(RUNS, (base_dir, base_dir, changed_dir)):
+        with ReplayServer(directory) as server:
+            os.environ["SCRAPE_REPLAY_URL"] = server.url
+            runs[run] = scrape_all()
+    database.engine.dispose()
+    db_bytes = sum(
+        os.path.getsize(path) for path in (f"{tmp}/bench.db", f"{tmp}/bench.db-wal") if os.path.exists(path)
+    )
+    print(json.dumps({"page_bytes": size, "page_showtimes": count, "parse": parse, "runs": runs,
+                      "db_bytes": db_bytes}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated page scales")
+    parser.add_argument("--cinemas", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=3, help="timed parse passes per backend")
+    parser.add_argument("--scale", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.scale:
+        run_scale(args)
+        return
+
+    print(f"{args.cinemas} cinemas per run, {args.repeat} parse passes\n")
+    print(f"{'scale':>5} {'page KiB':>9} {'showtimes':>10} {'backend':<8} {'showtimes/s':>12} {'MiB/s':>7}")
+    results = []
+    for scale in [int(s) for s in args.scales.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            env = dict(
+                os.environ,
+                BENCH_DIR=tmp,
+                DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+                DATA_VERSION_FILE=f"{tmp}/data_version",
+                SCRAPE_RECORD_DIR="",
+                IMAGE_CACHE_MAX_MB="0",
+                MOVIE_DETAILS="false",
+                SNAPSHOTS="false",
+            )
+            out = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--scale", str(scale),
+                 "--cinemas", str(args.cinemas), "--repeat", str(args.repeat)],
+                env=env, cwd=tmp, capture_output=True, text=True, check=True,
+            ).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        results.append((scale, r))
+        for backend, p in r["parse"].items():
+            print(f"{scale:>5} {r['page_bytes'] / 1024:>9.0f} {r['page_showtimes']:>10} {backend:<8} "
+                  f"{p['showtimes_per_sec']:>12.0f} {p['mib_per_sec']:>7.2f}")
+
+    print(f"\n{'scale':>5} {'run':<8} {'showtimes':>10} {'inserted':>9} {'updated':>8} {'deleted':>8} "
+          f"{'parse s':>8} {'sync s':>8} {'total s':>8} {'DB MiB':>7}")
+    for scale, r in results:
+        for run in RUNS:
+            t = r["runs"][run] or {}
+            db_size = f"{r['db_bytes'] / 2**20:.1f}" if run == RUNS[-1] else ""
+            print(f"{scale:>5} {run:<8} {t.get('showtimes', 0):>10} {t.get('inserted', 0):>9} "
+                  f"{t.get('updated', 0):>8} {t.get('deleted', 0):>8} {t.get('parse_seconds', 0):>8.2f} "
+                  f"{t.get('sync_seconds', 0):>8.2f} {t.get('duration_seconds', 0):>8.2f} "
+                  f"{db_size:>7}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Latency of the /api/search title index (search.py) on synthetic titles.
+
+Usage (from the backend directory):
+    python benchmarks/bench_search.py [--titles 30000] [--queries 300] [--seed 0]
+
+Builds a TitleIndex over random Hungarian-looking titles of 1-5 words, with
+word frequencies following a Zipf distribution like real titles ("a", "az",
+"2" are everywhere), then times queries of three kinds taken from the
+titles: prefixes, whole titles with one letter dropped (typos, served by
+the fuzzy step) and the first three letters of every word. Reports the
+build time and p50/p90/p99/max lookup latency per kind.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from search import TitleIndex  # noqa: E402
+
+LETTERS = "aábcdeéfghiíjklmnoóöőprstuúüűvz"
+
+
+def make_titles(count, rng, vocabulary=8000):
+    words = ["".join(rng.choice(LETTERS) for _ in range(rng.randint(2, 9))) for _ in range(vocabulary)]
+    weights = [1 / (i + 1) for i in range(vocabulary)]
+    titles = set()
+    while len(titles) < count:
+        titles.add(" ".join(rng.choices(words, weights, k=rng.randint(1, 5))).capitalize())
+    return sorted(titles)
+
+
+def make_queries(titles, count, rng):
+    queries = []
+    for _ in range(count):
+        title = rng.choice(titles)
+        kind = rng.choice(("prefix", "typo", "words"))
+        if kind == "prefix":
+            queries.append((kind, title[:rng.randint(1, len(title))]))
+        elif kind == "typo":
+            i = rng.randrange(len(title))
+            queries.append((kind, title[:i] + title[i + 1:]))
+        else:
+            queries.append((kind, " ".join(word[:3] for word in title.split())))
+    return queries
+
+
+def percentile(values, p):
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--titles", type=int, default=30000)
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--limit", type=int, default=20, help="results per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    titles = make_titles(args.titles, rng)
+    started = time.perf_counter()
+    index = TitleIndex([(i, title, None, None) for i, title in enumerate(titles)])
+    print(f"Indexed {len(index)} titles in {time.perf_counter() - started:.2f}s\n")
+
+    latencies = defaultdict(list)
+    for kind, query in make_queries(titles, args.queries, rng):
+        started = time.perf_counter()
+        index.search(query, args.limit)
+        elapsed = (time.perf_counter() - started) * 1000
+        latencies[kind].append(elapsed)
+        latencies["all"].append(elapsed)
+
+    print(f"{'queries':<8} {'count':>6} {'p50 ms':>7} {'p90 ms':>7} {'p99 ms':>7} {'max ms':>7}")
+    for kind, values in latencies.items():
+        values.sort()
+        print(f"{kind:<8} {len(values):>6} {percentile(values, 0.5):>7.3f} {percentile(values, 0.9):>7.3f} "
+              f"{percentile(values, 0.99):>7.3f} {values[-1]:>7.3f}")
+
+
+if __name__ == "__main__":
+    main()
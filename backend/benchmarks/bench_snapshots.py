@@ -0,0 +1,153 @@
+"""
+Load test: /api/movies served from snapshot files vs built from the database.
+
+Usage (from the backend directory):
+    python benchmarks/bench_snapshots.py [--seconds 10] [--concurrency 16] [--cinemas 8]
+
+Seeds a throwaway database and writes its snapshots (snapshots.py), then
+starts uvicorn twice with the response cache disabled: once serving the
+snapshot files, once with SNAPSHOTS=false so every request runs the
+query and serializes the rows. Clients ask for the full list and single
+dates, gzip-compressed. Reports requests/s, p50/p99 latency and the server
+process CPU time per request (Linux only).
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+from bench_api_async import API_KEY, free_port, wait_ready  # noqa: E402
+from bench_read_latency import make_catalogue, percentile, sync_catalogue  # noqa: E402
+
+HEADERS = {"X-API-Key": API_KEY, "Accept-Encoding": "gzip"}
+
+
+def seed_database(args):
+    """Child process: fill the database named by DATABASE_URL and write its snapshots."""
+    sys.path.insert(0, BACKEND_DIR)
+    logging.disable(logging.CRITICAL)
+    import database
+    from snapshots import write_snapshots
+
+    database.init_db()
+    with database.SessionLocal() as db:
+        sync_catalogue(db, make_catalogue(args.cinemas, args.movies, args.days, args.times, seed=0))
+        write_snapshots(db)
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of a process, from /proc; None elsewhere."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+async def load(base_url, paths, seconds, concurrency, seed):
+    rng = random.Random(seed)
+    latencies = []
+    errors = 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30.0) as client:
+
+        async def worker(deadline):
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(rng.choice(paths), headers=HEADERS)
+                    response.raise_for_status()
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker(started + seconds) for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+    return latencies, errors, elapsed
+
+
+def run_variant(snapshots, tmp, paths, args):
+    port = free_port()
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{tmp}/bench.db",
+        API_KEY=API_KEY,
+        RESPONSE_CACHE_TTL="0",
+        SNAPSHOTS=snapshots,
+        SNAPSHOT_DIR=f"{tmp}/snapshots",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         "--app-dir", BACKEND_DIR],
+        env=env, cwd=tmp,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async def ready():
+            async with httpx.AsyncClient() as client:
+                await wait_ready(client, base_url)
+        asyncio.run(ready())
+        cpu_before = cpu_seconds(server.pid)
+        latencies, errors, elapsed = asyncio.run(load(base_url, paths, args.seconds, args.concurrency, seed=1))
+        cpu_after = cpu_seconds(server.pid)
+    finally:
+        server.terminate()
+        server.wait()
+    cpu = (cpu_after - cpu_before) / max(1, len(latencies)) if cpu_before is not None else None
+    return latencies, errors, elapsed, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--cinemas", type=int, default=8)
+    parser.add_argument("--movies", type=int, default=25)
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--times", type=int, default=4)
+    parser.add_argument("--seed-only", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.seed_only:
+        seed_database(args)
+        return
+
+    today = datetime.date.today()
+    days = [(today + datetime.timedelta(days=d)).isoformat() for d in range(args.days)]
+    paths = ["/api/movies"] + [f"/api/movies?date_from={day}&date_to={day}" for day in days]
+
+    rows = args.cinemas * args.movies * args.days * args.times
+    print(f"~{rows} showtimes, {args.concurrency} concurrent clients, {args.seconds:.0f}s per variant\n")
+    print(f"{'variant':<9} {'requests':>9} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'CPU ms/req':>11} {'errors':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", SNAPSHOTS="true",
+                   SNAPSHOT_DIR=f"{tmp}/snapshots")
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--seed-only"] + sys.argv[1:],
+            env=env, cwd=tmp, check=True,
+        )
+        for name, snapshots in (("database", "false"), ("snapshot", "true")):
+            latencies, errors, elapsed, cpu = run_variant(snapshots, tmp, paths, args)
+            cpu_ms = f"{cpu * 1000:>11.2f}" if cpu is not None else f"{'n/a':>11}"
+            print(f"{name:<9} {len(latencies):>9} {len(latencies) / elapsed:>8.1f} "
+                  f"{percentile(latencies, 50) * 1000:>8.1f} {percentile(latencies, 99) * 1000:>8.1f} "
+                  f"{cpu_ms} {errors:>7}")
+
+
+if __name__ == "__main__":
+    main()
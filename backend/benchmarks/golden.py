@@ -0,0 +1,105 @@
+"""
+Golden-output check for the scraper's HTML parsers.
+
+Usage (from the backend directory):
+    python benchmarks/golden.py [--update]
+
+Every fixtures/<name>.html with a fixtures/<name>.golden.json is parsed by
+every parser backend, and the extracted showtimes must equal the golden
+set. The golden file stores the page URL and the date the page is parsed
+as of, since day labels are relative. --update rewrites the golden files
+from the bs4 backend (new fixtures get the defaults below).
+
+fixtures/webstyles_sample.html is synthetic (synthetic.make_page for
+2026-10-16), not a recorded page, and its golden file was written by the
+bs4 backend: it catches parser regressions and lxml/bs4 differences, not
+changes in the live sites' markup. Add recorded pages next to it for that.
+
+The same checks run under pytest (tests/test_golden.py), which also scrapes
+each fixture end to end through replay.py.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from parsers import PARSER_BACKENDS, parse_cinema_page  # noqa: E402
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+FIELDS = (
+    "cinema_name", "movie_title", "start_time", "date_str", "ticket_url", "movie_url",
+    "poster_url", "genre", "age_restriction", "details_type", "age_restriction_url",
+)
+DEFAULT_URL = "https://cinema.example"
+DEFAULT_TODAY = "2026-10-16"
+
+
+def extract(html, url, today, backend):
+    """Sorted showtimes as JSON-ready field lists."""
+    rows = []
+    for st in parse_cinema_page(html, url, backend, today=date.fromisoformat(today)):
+        row = [getattr(st, f) for f in FIELDS]
+        row[FIELDS.index("start_time")] = st.start_time.isoformat() if st.start_time else None
+        rows.append(row)
+    return sorted(rows, key=lambda row: [value or "" for value in row])
+
+
+def write_golden(f, header, showtimes):
+    """JSON with one showtime per line, so golden diffs stay readable."""
+    f.write(json.dumps(header, ensure_ascii=False)[:-1] + ', "showtimes": [\n')
+    f.write(",\n".join(json.dumps(row, ensure_ascii=False) for row in showtimes))
+    f.write("\n]}\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="rewrite the golden files")
+    args = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    failures = 0
+    for page in sorted(glob.glob(os.path.join(FIXTURE_DIR, "*.html"))):
+        golden_path = page[:-len(".html")] + ".golden.json"
+        with open(page, encoding="utf-8") as f:
+            html = f.read()
+        golden = {"url": DEFAULT_URL, "today": DEFAULT_TODAY}
+        if os.path.exists(golden_path):
+            with open(golden_path, encoding="utf-8") as f:
+                golden = json.load(f)
+        elif not args.update:
+            print(f"{os.path.basename(page)}: no golden file, skipped")
+            continue
+
+        if args.update:
+            showtimes = extract(html, golden["url"], golden["today"], "bs4")
+            with open(golden_path, "w", encoding="utf-8") as f:
+                write_golden(f, {"url": golden["url"], "today": golden["today"], "fields": FIELDS}, showtimes)
+            print(f"{os.path.basename(golden_path)}: wrote {len(showtimes)} showtimes")
+            continue
+
+        expected = {tuple(row) for row in golden["showtimes"]}
+        for backend in PARSER_BACKENDS:
+            found = {tuple(row) for row in extract(html, golden["url"], golden["today"], backend)}
+            missing, unexpected = expected - found, found - expected
+            if missing or unexpected:
+                failures += 1
+                print(f"{os.path.basename(page)} [{backend}]: {len(missing)} missing, {len(unexpected)} unexpected")
+                for row in sorted(missing, key=str)[:5]:
+                    print(f"  missing:    {row}")
+                for row in sorted(unexpected, key=str)[:5]:
+                    print(f"  unexpected: {row}")
+            else:
+                print(f"{os.path.basename(page)} [{backend}]: {len(found)} showtimes match")
+
+    if failures:
+        sys.exit(f"{failures} golden mismatch(es)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Synthetic Webstyles cinema pages for benchmarks.
+
+make_page(scale=1) mimics the markup of a Webstyles cinema site (7 days x
+14 movies x 4 showtimes = 392 showtimes, ~80 KiB); the parser fixture
+fixtures/webstyles_sample.html is its output for 2026-10-16. `scale`
+multiplies the movies per day, so scale=100 is a ~8 MiB page. `variant`
+moves about `changed` of the showtimes to another ticket URL and time, to
+simulate a re-scrape where part of the programme changed.
+
+Usage (from the backend directory):
+    python benchmarks/synthetic.py [--scale N] [--variant N] > page.html
+"""
+import argparse
+import random
+
+HU_MONTH_NAMES = (
+    "január", "február", "március", "április", "május", "június",
+    "július", "augusztus", "szeptember", "október", "november", "december",
+)
+TIMES = ("10:00", "13:15", "16:30", "19:45")
+TYPES = ("F", "M", "E", " ")
+
+HEADER = """<html>
+<head>
+<title> {cinema} </title>
+</head>
+<body>
+<div id="day-tabs-wrapper">
+<div class="swiper-slide" data-tab="1" data-date="{today}">x</div>
+<div class="swiper-slide" data-tab="8" data-date="musorlista">m</div>
+</div>
+<div class="tab-8">
+"""
+
+MOVIE = """<tr>
+<td class="poster">
+<img src="/img/p{movie}.jpg">
+</td>
+<td>
+<table>
+<tr>
+<td class="info">
+<a href="/film/{movie}">
+<div class="title">Film {movie}  - With english subtitles</div>
+</a>
+<div class="meta">
+<div class="genre">drama</div>
+<div class="genre">vígjáték</div>
+<img src="/images/ages/{age}.png">
+</div>
+</td>
+<td class="times">
+{times}</td>
+</tr>
+</table>
+</td>
+</tr>
+"""
+
+TIME = """<div class="movie-time">
+<a href="/jegy/{ticket}">
+<span class="time">{time}</span>
+<span class="type">{type}</span>
+</a>
+</div>
+"""
+
+
+def day_label(today, offset):
+    """Day header as the sites print it: "Ma", "Holnap", then "október 18."."""
+    if offset == 0:
+        return "Ma"
+    if offset == 1:
+        return "Holnap"
+    day = today.fromordinal(today.toordinal() + offset)
+    return f"{HU_MONTH_NAMES[day.month - 1]} {day.day}."
+
+
+def make_page(today, scale=1, days=7, movies=14, cinema="Sample Mozi", variant=0, changed=0.1):
+    """Render a cinema page listing `days` days of `movies * scale` movies, from `today`."""
+    rng = random.Random(variant)
+    parts = [HEADER.format(cinema=cinema, today=today.isoformat())]
+    for d in range(days):
+        parts.append(
+            f'<div class="day-wrapper">\n<div class="day">\n'
+            f'<span class="date">{day_label(today, d)}</span>\n</div>\n<table class="movie-wrapper">\n'
+        )
+        for m in range(movies * scale):
+            times = []
+            for t, (time, kind) in enumerate(zip(TIMES, TYPES)):
+                ticket = f"{d}{m}{t}"
+                if variant and rng.random() < changed:
+                    ticket += f"v{variant}"
+                    time = f"{int(time[:2]) + 1}{time[2:]}"
+                times.append(TIME.format(ticket=ticket, time=time, type=kind))
+            parts.append(MOVIE.format(movie=m, age=m % 13 + 1, times="".join(times)))
+        parts.append("</table>\n</div>\n")
+    parts.append("</div>\n</body>\n</html>")
+    return "".join(parts)
+
+
+def main():
+    import datetime
+    import sys
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", type=int, default=1)
+    parser.add_argument("--variant", type=int, default=0)
+    parser.add_argument("--today", type=datetime.date.fromisoformat, default=datetime.date.today())
+    args = parser.parse_args()
+    sys.stdout.write(make_page(args.today, scale=args.scale, variant=args.variant))
+
+
+if __name__ == "__main__":
+    main()
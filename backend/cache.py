@@ -0,0 +1,170 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+from config import env_int, env_float, env_str
+
+
+def make_etag(body: bytes):
+    """Strong ETag derived from the response body."""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+ENCODERS = {"gzip": lambda body: gzip.compress(body, compresslevel=6)}
+if brotli is not None:
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=5)
+
+
+def choose_encoding(accept_encoding):
+    """Pick the best supported content-coding from an Accept-Encoding header."""
+    if not accept_encoding:
+        return None
+    accepted = set()
+    for part in accept_encoding.split(","):
+        name, *params = [p.strip() for p in part.split(";")]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            accepted.add(name.lower())
+    for encoding in ("br", "gzip"):
+        if encoding in ENCODERS and (encoding in accepted or "*" in accepted):
+            return encoding
+    return None
+
+
+class CachedResponse:
+    __slots__ = ("body", "etag", "headers", "expires_at", "_encoded")
+
+    def __init__(self, body, headers, expires_at):
+        self.body = body
+        self.etag = make_etag(body)
+        self.headers = headers
+        self.expires_at = expires_at
+        self._encoded = {}
+
+    def encoded(self, encoding):
+        """
+        Return (body, etag) for a content-coding, compressing once per entry.
+        Each coding gets its own strong ETag.
+        """
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body, self.etag
+        body = self._encoded.get(encoding)
+        if body is None:
+            body = ENCODERS[encoding](self.body)
+            self._encoded[encoding] = body
+        return body, f'{self.etag[:-1]}-{encoding}"'
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache of pre-serialized JSON response bodies with a TTL.
+    Entries are tied to a data version; bump() invalidates all of them at once
+    (after a scrape commits or favorites change).
+
+    Other processes (the scraper worker, other uvicorn workers) signal their
+    changes by replacing `version_file`; the cache drops its entries when it
+    sees a new file.
+    """
+
+    def __init__(self, max_entries=256, ttl=300.0, version_file=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.version = 0
+        self.version_file = version_file
+        self._file_stamp = self._stat_version_file()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _stat_version_file(self):
+        if not self.version_file:
+            return None
+        try:
+            st = os.stat(self.version_file)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def check_external(self):
+        """Invalidate if another process bumped the version since the last check."""
+        stamp = self._stat_version_file()
+        if stamp != self._file_stamp:
+            with self._lock:
+                self._file_stamp = stamp
+                self.version += 1
+                self._entries.clear()
+
+    def get(self, key):
+        self.check_external()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, body, headers=None, version=None):
+        """
+        Store a body built for `version` (the version read before querying).
+        Bodies built from data that was invalidated meanwhile are not cached.
+        """
+        entry = CachedResponse(body, headers or {}, time.monotonic() + self.ttl)
+        with self._lock:
+            if version is not None and version != self.version:
+                return entry
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def bump(self):
+        """Invalidate every cached response, here and in other processes."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            if self.version_file:
+                # A fresh file (new inode) on every bump, so readers never miss one
+                tmp = f"{self.version_file}.{os.getpid()}.tmp"
+                try:
+                    with open(tmp, "w") as f:
+                        f.write(str(time.time_ns()))
+                    os.replace(tmp, self.version_file)
+                except OSError:
+                    pass
+                self._file_stamp = self._stat_version_file()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+response_cache = ResponseCache(
+    max_entries=max(1, env_int("RESPONSE_CACHE_SIZE", 256)),
+    ttl=env_float("RESPONSE_CACHE_TTL", 300.0),
+    version_file=env_str("DATA_VERSION_FILE", "data/data_version"),
+)
+
+
+def bump_data_version():
+    """Call after committing changes to showtimes, favorites or scrape status."""
+    response_cache.bump()
@@ -0,0 +1,39 @@
+import os
+
+
+def env_str(name, default=None):
+    """Read a string env var, treating empty values (e.g. from docker-compose) as unset."""
+    value = os.getenv(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip()
+
+
+def env_int(name, default):
+    """Read an integer env var, falling back to default when unset or invalid."""
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def env_float(name, default):
+    """Read a float env var, falling back to default when unset or invalid."""
+    value = env_str(name)
+    if value is None:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
+
+
+def env_bool(name, default=False):
+    """Read a boolean env var ("1", "true", "yes", "on" are truthy)."""
+    value = env_str(name)
+    if value is None:
+        return default
+    return value.lower() in ("1", "true", "yes", "on")
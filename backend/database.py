@@ -1,34 +1,206 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime, ForeignKey, Index, text
+from sqlalchemy.pool import QueuePool
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, relationship
 import datetime
 import os
+from functools import partial
+
+from config import env_int, env_str
 
 # Ensure data directory exists
 os.makedirs("data", exist_ok=True)
 
 # Docker volume path or local path
-DB_URL = "sqlite:///data/movies.db"
+DB_URL = env_str("DATABASE_URL", "sqlite:///data/movies.db")
+
+def get_sqlite_pragmas():
+    """
+    Connection pragmas for SQLite, configurable through environment variables.
+    WAL lets /api readers keep reading while a scrape holds the write lock.
+    """
+    return {
+        "journal_mode": env_str("SQLITE_JOURNAL_MODE", "WAL"),
+        "synchronous": env_str("SQLITE_SYNCHRONOUS", "NORMAL"),
+        "busy_timeout": env_int("SQLITE_BUSY_TIMEOUT_MS", 5000),
+        "mmap_size": env_int("SQLITE_MMAP_SIZE", 256 * 1024 * 1024),
+        "cache_size": env_int("SQLITE_CACHE_SIZE", -64 * 1024),  # negative = KiB
+        "temp_store": env_str("SQLITE_TEMP_STORE", "MEMORY"),
+        "foreign_keys": "ON",
+    }
+
+def check_sqlite_url(url):
+    """The schema setup (init_db) and the scrape sync use SQLite SQL, so only SQLite URLs are supported."""
+    if url.partition(":")[0].split("+")[0] != "sqlite":
+        raise ValueError(f"Unsupported DATABASE_URL '{url}': only SQLite databases are supported")
+
+def _set_sqlite_pragmas(pragmas, dbapi_connection, connection_record):
+    """Apply `pragmas` to a new connection; bound per engine as its "connect" listener."""
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f"PRAGMA {name}={value}")
+    cursor.close()
 
-engine = create_engine(DB_URL, connect_args={"check_same_thread": False})
+def create_db_engine(url=DB_URL):
+    check_sqlite_url(url)
+    # A file database can serve many connections concurrently under WAL,
+    # so keep a pool of them across API threads and the scraper.
+    engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False},
+        poolclass=QueuePool,
+        pool_size=env_int("DB_POOL_SIZE", 10),
+        max_overflow=env_int("DB_MAX_OVERFLOW", 10),
+    )
+    event.listen(engine, "connect", partial(_set_sqlite_pragmas, get_sqlite_pragmas()))
+    return engine
+
+engine = create_db_engine()
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def to_async_url(url):
+    """Map a sync SQLite URL onto the aiosqlite driver."""
+    check_sqlite_url(url)
+    scheme, sep, rest = url.partition("://")
+    return "sqlite+aiosqlite" + sep + rest
+
+def create_async_db_engine(url=DB_URL):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_engine = create_async_engine(
+        to_async_url(url),
+        pool_size=env_int("DB_POOL_SIZE", 10),
+        max_overflow=env_int("DB_MAX_OVERFLOW", 10),
+    )
+    event.listen(async_engine.sync_engine, "connect", partial(_set_sqlite_pragmas, get_sqlite_pragmas()))
+    return async_engine
+
+_async_sessionmaker = None
+
+def get_async_sessionmaker():
+    """Async session factory, created on first use so aiosqlite stays optional."""
+    global _async_sessionmaker
+    if _async_sessionmaker is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker
+        _async_sessionmaker = async_sessionmaker(create_async_db_engine(), expire_on_commit=False)
+    return _async_sessionmaker
+
 Base = declarative_base()
 
+class Cinema(Base):
+    __tablename__ = "cinemas"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, nullable=False, unique=True)
+
+class Movie(Base):
+    """Per-title metadata shared by all showtimes of a movie."""
+    __tablename__ = "movies"
+
+    id = Column(Integer, primary_key=True)
+    title = Column(String, nullable=False, unique=True)
+    search_key = Column(String, nullable=True)  # parsers.fold_title(title), for /api/search
+    movie_url = Column(String, nullable=True)
+    poster_url = Column(String, nullable=True)
+    genre = Column(String, nullable=True)
+    age_restriction = Column(String, nullable=True)
+    age_restriction_url = Column(String, nullable=True)
+    # The cinema whose page the metadata above comes from. Its URLs are absolute
+    # links into that cinema's site, so other cinemas only fill in missing fields.
+    source_cinema_id = Column(Integer, ForeignKey("cinemas.id"), nullable=True)
+    # Cached thumbnails (images.py) of poster_url and age_restriction_url
+    poster_image = Column(String, nullable=True)
+    age_restriction_image = Column(String, nullable=True)
+
 class Showtime(Base):
     __tablename__ = "showtimes"
 
     id = Column(Integer, primary_key=True, index=True)
-    cinema_name = Column(String, index=True)
-    movie_title = Column(String, index=True)
+    cinema_id = Column(Integer, ForeignKey("cinemas.id"), nullable=False)
+    movie_id = Column(Integer, ForeignKey("movies.id"), nullable=False)
     start_time = Column(DateTime)
     date_str = Column(String)  # YYYY-MM-DD
     ticket_url = Column(String, nullable=True)
+    details_type = Column(String, nullable=True) # e.g. "sub", "synchronized"
+
+    cinema = relationship(Cinema, lazy="joined")
+    movie = relationship(Movie, lazy="joined")
+
+    __table_args__ = (
+        # Natural key used by the scraper sync
+        Index("uq_showtime_key", "cinema_id", "movie_id", "start_time", unique=True),
+        # /api/movies: date range + keyset order on (start_time, id)
+        Index("ix_showtime_start_id", "start_time", "id"),
+        # /api/movies?cinema=...: same order within one cinema
+        Index("ix_showtime_cinema_start_id", "cinema_id", "start_time", "id"),
+        # Title lookups (favorites, search) and movie pruning
+        Index("ix_showtime_movie_id", "movie_id"),
+    )
+
+    # Read-only views of the normalized metadata, so a Showtime still reads
+    # like the flat row the API exposes
+    @property
+    def cinema_name(self):
+        return self.cinema.name
+
+    @property
+    def movie_title(self):
+        return self.movie.title
+
+    @property
+    def movie_url(self):
+        return self.movie.movie_url
+
+    @property
+    def poster_url(self):
+        return self.movie.poster_url
+
+    @property
+    def genre(self):
+        return self.movie.genre
+
+    @property
+    def age_restriction(self):
+        return self.movie.age_restriction
+
+    @property
+    def age_restriction_url(self):
+        return self.movie.age_restriction_url
+
+    @property
+    def poster_image(self):
+        return self.movie.poster_image
+
+    @property
+    def age_restriction_image(self):
+        return self.movie.age_restriction_image
+
+class ArchivedShowtime(Base):
+    """
+    A showtime whose day has passed, moved out of the showtimes table by the
+    scraper (see sync.prune_past_showtimes). Flat, so it outlives the movie
+    and cinema rows, which are pruned once nothing plays.
+    """
+    __tablename__ = "showtime_archive"
+
+    id = Column(Integer, primary_key=True)
+    cinema_name = Column(String, nullable=False)
+    movie_title = Column(String, nullable=False)
+    start_time = Column(DateTime, nullable=False)
+    date_str = Column(String)  # YYYY-MM-DD
+    ticket_url = Column(String, nullable=True)
+    details_type = Column(String, nullable=True)
     movie_url = Column(String, nullable=True)
-    poster_url = Column(String, nullable=True)
     genre = Column(String, nullable=True)
     age_restriction = Column(String, nullable=True)
-    details_type = Column(String, nullable=True) # e.g. "sub", "synchronized"
-    age_restriction_url = Column(String, nullable=True)
+    archived_at = Column(DateTime, default=datetime.datetime.now)
+
+    __table_args__ = (
+        # A showtime is archived once
+        Index("uq_archive_key", "cinema_name", "movie_title", "start_time", unique=True),
+        # /api/archive: time range + keyset order on (start_time, id)
+        Index("ix_archive_start_id", "start_time", "id"),
+    )
 
 class Favorite(Base):
     __tablename__ = "favorites"
@@ -42,8 +214,185 @@ class AppSettings(Base):
     key = Column(String, primary_key=True, index=True)
     value = Column(String)
 
+class DateSummary(Base):
+    """
+    Per-date counts for the UI's date tabs, materialized at the end of every
+    scrape (and on favorite changes) by sync.refresh_date_summaries().
+    """
+    __tablename__ = "date_summaries"
+
+    date_str = Column(String, primary_key=True)  # YYYY-MM-DD
+    showtimes = Column(Integer, nullable=False)
+    movies = Column(Integer, nullable=False)
+    cinemas = Column(Integer, nullable=False)
+    favorites = Column(Text, nullable=True)  # JSON list of favorite titles playing that day
+    computed_at = Column(DateTime, default=datetime.datetime.now)
+
+class CachedImage(Base):
+    """A poster or age rating image URL and the thumbnail cached for it (see images.py)."""
+    __tablename__ = "images"
+
+    url = Column(String, primary_key=True)
+    digest = Column(String, nullable=True, index=True)  # file name in IMAGE_CACHE_DIR; None if failed
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    bytes = Column(Integer, nullable=True)
+    fetched_at = Column(DateTime, nullable=True)
+    error = Column(Text, nullable=True)
+
+class MovieDetail(Base):
+    """Fields scraped from a movie's own page (movie_url), cached for a TTL (see details.py)."""
+    __tablename__ = "movie_details"
+
+    movie_url = Column(String, primary_key=True)
+    original_title = Column(String, nullable=True)
+    runtime_minutes = Column(Integer, nullable=True)
+    synopsis = Column(Text, nullable=True)
+    actors = Column(Text, nullable=True)  # JSON list of cast names
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True)  # sha256 of the body
+    fetched_at = Column(DateTime, nullable=True)  # last download or revalidation attempt
+    error = Column(Text, nullable=True)  # of the last attempt
+
+class PageState(Base):
+    """HTTP validators of the last parsed version of a cinema page."""
+    __tablename__ = "page_states"
+
+    url = Column(String, primary_key=True)
+    cinema_name = Column(String, nullable=True)
+    etag = Column(String, nullable=True)
+    last_modified = Column(String, nullable=True)
+    content_hash = Column(String, nullable=True)  # sha256 of the body
+    parsed_at = Column(DateTime, default=datetime.datetime.now)
+
+class ScrapeSchedule(Base):
+    """Adaptive scrape schedule of one cinema page (see schedule.py)."""
+    __tablename__ = "scrape_schedules"
+
+    url = Column(String, primary_key=True)
+    cinema_name = Column(String, nullable=True)
+    showtimes_hash = Column(String, nullable=True)  # fingerprint of the parsed showtimes
+    interval_seconds = Column(Integer, nullable=True)
+    failures = Column(Integer, nullable=False, default=0)  # consecutive failed scrapes
+    checks = Column(Integer, nullable=False, default=0)
+    changes = Column(Integer, nullable=False, default=0)
+    last_checked_at = Column(DateTime, nullable=True)
+    last_changed_at = Column(DateTime, nullable=True)
+    next_check_at = Column(DateTime, nullable=True, index=True)
+
+class ScrapeJob(Base):
+    """
+    A queued or finished scrape, consumed by the scraper worker (worker.py).
+    `active` is 1 while the job is queued or running and NULL afterwards;
+    its unique constraint allows at most one active scrape at a time. A full
+    scrape requested while a partial one runs waits with `active` 2 (jobs.py).
+    """
+    __tablename__ = "scrape_jobs"
+
+    id = Column(Integer, primary_key=True)
+    status = Column(String, nullable=False, default="queued")  # queued, running, done, failed
+    trigger = Column(String, nullable=True)  # api, schedule, cli
+    urls = Column(Text, nullable=True)  # JSON list of the URLs to scrape; NULL: all configured
+    active = Column(Integer, unique=True, nullable=True, default=1)
+    created_at = Column(DateTime, default=datetime.datetime.now)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+    progress = Column(Text, nullable=True)  # JSON: {url: {cinema_name, status, per-cinema metrics}}
+    stats = Column(Text, nullable=True)  # JSON: run totals and phase timings
+    error = Column(Text, nullable=True)
+
+class ChangeEvent(Base):
+    """
+    A committed data change, streamed to clients by /api/events (see
+    events.py). Written in the transaction of the change itself.
+    """
+    __tablename__ = "change_events"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String, nullable=False)  # showtimes, movies, favorites
+    payload = Column(Text, nullable=False)  # JSON, e.g. {inserted, updated, deleted} showtime ids
+    created_at = Column(DateTime, default=datetime.datetime.now)
+
 def init_db():
+    legacy = _detach_legacy_showtimes()
     Base.metadata.create_all(bind=engine)
+    if legacy:
+        _migrate_legacy_showtimes()
+    _ensure_columns()
+    _ensure_indexes()
+
+def _detach_legacy_showtimes():
+    """
+    Showtimes used to carry cinema and movie metadata as strings on every row.
+    If the database still has that layout, rename the table out of the way
+    (dropping its indexes, whose names the new table reuses).
+    Returns True when a legacy table is waiting to be migrated.
+    """
+    with engine.begin() as conn:
+        legacy_exists = conn.execute(text(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'showtimes_legacy'"
+        )).first()
+        if legacy_exists:
+            return True
+        columns = [row[1] for row in conn.execute(text("PRAGMA table_info(showtimes)"))]
+        if "cinema_name" not in columns:
+            return False
+
+        indexes = conn.execute(text(
+            "SELECT name FROM sqlite_master "
+            "WHERE type = 'index' AND tbl_name = 'showtimes' AND sql IS NOT NULL"
+        )).scalars().all()
+        for name in indexes:
+            conn.execute(text(f'DROP INDEX "{name}"'))
+        conn.execute(text("ALTER TABLE showtimes RENAME TO showtimes_legacy"))
+    return True
+
+def _migrate_legacy_showtimes():
+    """Copy legacy showtimes into the normalized cinemas/movies/showtimes tables."""
+    with engine.begin() as conn:
+        conn.execute(text(
+            "INSERT OR IGNORE INTO cinemas (name) "
+            "SELECT DISTINCT cinema_name FROM showtimes_legacy WHERE cinema_name IS NOT NULL"
+        ))
+        # Each field from the newest row of the title that has it: MAX() over
+        # "<zero-padded id><value>" skips NULL values, SUBSTR drops the id
+        fields = ("movie_url", "poster_url", "genre", "age_restriction", "age_restriction_url")
+        newest = ", ".join(f"SUBSTR(MAX(printf('%020d', id) || {field}), 21)" for field in fields)
+        conn.execute(text(
+            f"INSERT OR IGNORE INTO movies (title, {', '.join(fields)}) "
+            f"SELECT movie_title, {newest} FROM showtimes_legacy "
+            "WHERE movie_title IS NOT NULL GROUP BY movie_title"
+        ))
+        # OR IGNORE drops duplicate natural keys (older databases had no unique key)
+        conn.execute(text(
+            "INSERT OR IGNORE INTO showtimes "
+            "(id, cinema_id, movie_id, start_time, date_str, ticket_url, details_type) "
+            "SELECT l.id, c.id, m.id, l.start_time, l.date_str, l.ticket_url, l.details_type "
+            "FROM showtimes_legacy l "
+            "JOIN cinemas c ON c.name = l.cinema_name "
+            "JOIN movies m ON m.title = l.movie_title "
+            "ORDER BY l.id"
+        ))
+        conn.execute(text("DROP TABLE showtimes_legacy"))
+
+def _ensure_columns():
+    """create_all does not alter existing tables, so add nullable columns introduced later."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            existing = {row[1] for row in conn.execute(text(f'PRAGMA table_info("{table.name}")'))}
+            for column in table.columns:
+                if column.name not in existing and column.nullable and not column.unique:
+                    type_sql = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {type_sql}'))
+
+def _ensure_indexes():
+    """create_all skips indexes on tables that already exist, so add any that are missing."""
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
 
 def get_db():
     db = SessionLocal()
@@ -51,3 +400,7 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    async with get_async_sessionmaker()() as db:
+        yield db
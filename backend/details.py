@@ -0,0 +1,237 @@
+"""
+Movie detail enrichment.
+
+The listing pages only carry title, poster, genres and age rating. Runtime,
+synopsis, original title and cast are on each movie's own page (movie_url).
+After every scrape, enrich_movies() looks at the distinct movie_urls of the
+stored movies, and fetches the ones whose cached details are missing or
+older than MOVIE_DETAILS_TTL_HOURS, MOVIE_DETAILS_WORKERS at a time. Expired
+entries are revalidated with their ETag / Last-Modified (and body hash), so
+an unchanged page is neither downloaded again nor re-parsed. Each run reports
+its cache hits, revalidations, downloads, failures and time.
+"""
+import datetime
+import hashlib
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup
+from sqlalchemy import select, delete
+from sqlalchemy.orm import Session
+
+from config import env_bool, env_float, env_int
+from database import Movie, MovieDetail
+from fetcher import Fetcher, conditional_headers
+from sync import _chunks
+
+logger = logging.getLogger(__name__)
+
+# Failed pages are tried again by the first scrape after this long
+RETRY_AFTER = datetime.timedelta(hours=6)
+
+# Outcomes of one movie_url in a run, in report order
+OUTCOMES = ("hit", "revalidated", "fetched", "failed")
+
+# "Label: value" lines of a detail page (Hungarian and English labels)
+_LABELS = {
+    "original_title": r"eredeti\s+c[ií]m|original\s+title",
+    "runtime": r"j[aá]t[eé]kid[oő]|hossz|id[oő]tartam|running\s+time|runtime|length",
+    "cast": r"f[oő]?szerepl[oő]k|szerepl[oő]k|cast|starring",
+    "synopsis": r"tartalom|le[ií]r[aá]s|synopsis|plot",
+}
+_LABEL_RE = re.compile(
+    r"^(?:" + "|".join(f"(?P<{key}>{pattern})" for key, pattern in _LABELS.items()) + r")\s*:\s*(?P<value>.*)$",
+    re.IGNORECASE,
+)
+_MINUTES_RE = re.compile(r"(\d+)\s*(?:perc|min)", re.IGNORECASE)
+_ISO_DURATION_RE = re.compile(r"^PT(?:(\d+)H)?(?:(\d+)M)?", re.IGNORECASE)
+_SYNOPSIS_CLASS_RE = re.compile(r"synopsis|description|leiras|tartalom|plot", re.IGNORECASE)
+
+
+def get_details_settings():
+    """Retrieve the detail enrichment settings from environment variables."""
+    return {
+        "enabled": env_bool("MOVIE_DETAILS", True),
+        "ttl": datetime.timedelta(hours=max(0.0, env_float("MOVIE_DETAILS_TTL_HOURS", 168))),
+        "workers": max(1, env_int("MOVIE_DETAILS_WORKERS", 4)),
+    }
+
+
+def parse_runtime(value):
+    """Minutes from "120 perc", "1 óra 50 perc" style text or an ISO 8601 duration (PT1H50M)."""
+    if not value:
+        return None
+    iso = _ISO_DURATION_RE.match(value.strip())
+    if iso and (iso.group(1) or iso.group(2)):
+        return int(iso.group(1) or 0) * 60 + int(iso.group(2) or 0)
+    hours = re.search(r"(\d+)\s*(?:óra|h\b)", value, re.IGNORECASE)
+    minutes = _MINUTES_RE.search(value)
+    if hours or minutes:
+        return (int(hours.group(1)) * 60 if hours else 0) + (int(minutes.group(1)) if minutes else 0)
+    return int(value) if value.strip().isdigit() else None
+
+
+def _split_names(value):
+    return [name.strip() for name in re.split(r"[,;]", value) if name.strip()]
+
+
+def _json_ld_movie(soup):
+    """The first schema.org Movie object embedded as JSON-LD, if any."""
+    for script in soup.find_all("script", type="application/ld+json"):
+        try:
+            data = json.loads(script.string or "")
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            data = data.get("@graph", [data])
+        candidates = data if isinstance(data, list) else []
+        for item in candidates:
+            if isinstance(item, dict) and item.get("@type") in ("Movie", "Film"):
+                return item
+    return None
+
+
+def parse_detail_page(html):
+    """
+    Extract original_title, runtime_minutes, synopsis and cast from a movie
+    page (str, or bytes to let BeautifulSoup detect the encoding).
+    Schema.org JSON-LD is used where present, then "Label: value" lines of
+    the page text, then the meta description for the synopsis. Missing
+    fields are None.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    details = {"original_title": None, "runtime_minutes": None, "synopsis": None, "cast": None}
+
+    movie = _json_ld_movie(soup)
+    if movie:
+        alternate = movie.get("alternateName")
+        details["original_title"] = alternate[0] if isinstance(alternate, list) and alternate else alternate or None
+        details["runtime_minutes"] = parse_runtime(movie.get("duration"))
+        details["synopsis"] = movie.get("description") or None
+        actors = movie.get("actor") or []
+        if not isinstance(actors, list):
+            actors = [actors]
+        names = [actor.get("name") if isinstance(actor, dict) else actor for actor in actors]
+        details["cast"] = [name for name in names if isinstance(name, str) and name.strip()] or None
+
+    for tag in soup(["script", "style"]):
+        tag.decompose()
+    lines = [line.strip() for line in soup.get_text("\n").splitlines() if line.strip()]
+    for i, line in enumerate(lines):
+        match = _LABEL_RE.match(line)
+        if not match:
+            continue
+        key = next(k for k in _LABELS if match.group(k))
+        # The value follows the label, on the same line or in the next element
+        value = match.group("value").strip() or (lines[i + 1] if i + 1 < len(lines) else "")
+        if key == "runtime" and details["runtime_minutes"] is None:
+            details["runtime_minutes"] = parse_runtime(value)
+        elif key == "original_title" and not details["original_title"]:
+            details["original_title"] = value or None
+        elif key == "cast" and not details["cast"]:
+            details["cast"] = _split_names(value) or None
+        elif key == "synopsis" and not details["synopsis"]:
+            details["synopsis"] = value or None
+
+    if not details["synopsis"]:
+        block = soup.find(class_=_SYNOPSIS_CLASS_RE)
+        text = block.get_text(" ", strip=True) if block else None
+        if not text:
+            meta = soup.find("meta", attrs={"property": "og:description"}) or soup.find(
+                "meta", attrs={"name": "description"})
+            text = meta.get("content", "").strip() if meta else None
+        details["synopsis"] = text or None
+    return details
+
+
+def fetch_details(fetcher, movie_url, cached, settings):
+    """
+    Fetch (or revalidate) one movie page. `cached` is its MovieDetail column
+    values or None. Returns (outcome, column values to store).
+    """
+    values = {"movie_url": movie_url, "fetched_at": datetime.datetime.now(), "error": None}
+    try:
+        headers = conditional_headers(cached) if cached and not cached["error"] else {}
+        response = fetcher.get(movie_url, headers=headers)
+        if response.status_code == 304:
+            return "revalidated", values
+        response.raise_for_status()
+        content_hash = hashlib.sha256(response.content).hexdigest()
+        values.update(
+            etag=response.headers.get("ETag"),
+            last_modified=response.headers.get("Last-Modified"),
+            content_hash=content_hash,
+        )
+        if cached and not cached["error"] and cached["content_hash"] == content_hash:
+            return "revalidated", values
+        details = parse_detail_page(response.content)
+        cast = details.pop("cast")
+        values.update(details, actors=json.dumps(cast, ensure_ascii=False) if cast else None)
+        return "fetched", values
+    except Exception as e:
+        logger.warning(f"Failed to fetch movie details {movie_url}: {e}")
+        # Keep what was cached before; try again after RETRY_AFTER
+        values["error"] = str(e)[:500]
+        return "failed", values
+
+
+def enrich_movies(db: Session, fetcher=None):
+    """
+    Fetch the details of every stored movie_url that is not cached or has
+    expired, forget URLs no movie uses any more, and commit. Returns the
+    run stats: details_<outcome> counts, details_hit_rate (hits and
+    revalidations over all URLs) and details_seconds; empty if disabled.
+    """
+    settings = get_details_settings()
+    if not settings["enabled"]:
+        return {}
+    started = time.perf_counter()
+    now = datetime.datetime.now()
+
+    urls = set(db.execute(select(Movie.movie_url).where(Movie.movie_url.is_not(None))).scalars())
+    cached = {
+        row.movie_url: {
+            "etag": row.etag, "last_modified": row.last_modified, "content_hash": row.content_hash,
+            "fetched_at": row.fetched_at, "error": row.error,
+        }
+        for row in db.execute(select(MovieDetail)).scalars()
+    }
+
+    def expired(entry):
+        ttl = min(settings["ttl"], RETRY_AFTER) if entry["error"] else settings["ttl"]
+        return entry["fetched_at"] is None or entry["fetched_at"] + ttl <= now
+
+    todo = sorted(url for url in urls if url not in cached or expired(cached[url]))
+    counts = dict.fromkeys(OUTCOMES, 0)
+    counts["hit"] = len(urls) - len(todo)
+
+    if todo:
+        own_fetcher = fetcher is None
+        fetcher = fetcher or Fetcher()
+        try:
+            with ThreadPoolExecutor(max_workers=settings["workers"], thread_name_prefix="details") as pool:
+                results = list(pool.map(lambda url: fetch_details(fetcher, url, cached.get(url), settings), todo))
+        finally:
+            if own_fetcher:
+                fetcher.close()
+        for outcome, values in results:
+            counts[outcome] += 1
+            db.merge(MovieDetail(**values))
+
+    stale = [url for url in cached if url not in urls]
+    for chunk in _chunks(stale):
+        db.execute(delete(MovieDetail).where(MovieDetail.movie_url.in_(chunk)))
+    db.commit()
+
+    stats = {f"details_{outcome}": count for outcome, count in counts.items()}
+    stats["details_hit_rate"] = (counts["hit"] + counts["revalidated"]) / len(urls) if urls else 1.0
+    stats["details_seconds"] = time.perf_counter() - started
+    logger.info(
+        f"Movie details: {len(urls)} movies, {counts['hit']} cached, {counts['revalidated']} revalidated, "
+        f"{counts['fetched']} fetched, {counts['failed']} failed "
+        f"(hit rate {stats['details_hit_rate']:.0%}) in {stats['details_seconds']:.2f}s"
+    )
+    return stats
@@ -0,0 +1,89 @@
+"""
+Change events for /api/events.
+
+Every transaction that changes what the API serves also inserts a row into
+change_events: after a scrape syncs a cinema ("showtimes", with the ids of
+the inserted, updated and deleted showtimes and of the movies whose
+metadata changed), when thumbnails are linked to movies ("movies") and when
+favorites change ("favorites"). The event commits together with the change,
+so it is written by whichever process made it (API, scraper worker) and a
+client that has seen event N can ask for everything after N.
+
+/api/events streams new rows as Server-Sent Events once the data version
+(cache.py) changes. Diffs with more than EVENT_MAX_IDS ids are sent as
+{"reset": true} instead: reload everything rather than fetch that many rows.
+Only the latest EVENT_HISTORY events are kept; a client resuming from an
+older one gets a reset too.
+"""
+import json
+
+from sqlalchemy import select, insert, delete, func, literal
+from sqlalchemy.orm import Session
+
+from database import ChangeEvent
+
+EVENT_KINDS = ("showtimes", "movies", "favorites")
+
+# Events kept for clients that reconnect with Last-Event-ID
+EVENT_HISTORY = 1000
+
+# Larger diffs are sent as a reset
+EVENT_MAX_IDS = 500
+
+
+def compact_payload(payload):
+    """The payload as stored: id lists over EVENT_MAX_IDS in total become {"reset": true}."""
+    ids = sum(len(value) for value in payload.values() if isinstance(value, list))
+    if ids > EVENT_MAX_IDS:
+        return {"reset": True}
+    return payload
+
+
+def change_statements(kind, when=None, **payload):
+    """
+    Statements recording a change event and dropping events beyond EVENT_HISTORY.
+    With `when` (a SQL condition), the event is only recorded if it holds;
+    run them before the change itself, in its transaction.
+    """
+    data = json.dumps(compact_payload(payload), ensure_ascii=False, separators=(",", ":"))
+    if when is None:
+        record = insert(ChangeEvent).values(kind=kind, payload=data)
+    else:
+        record = insert(ChangeEvent).from_select(
+            ["kind", "payload"], select(literal(kind), literal(data)).where(when)
+        )
+    latest = select(func.max(ChangeEvent.id)).scalar_subquery()
+    return [record, delete(ChangeEvent).where(ChangeEvent.id <= latest - EVENT_HISTORY)]
+
+
+def record_change(db: Session, kind, **payload):
+    """Record a change event in the caller's transaction (does not commit)."""
+    for stmt in change_statements(kind, **payload):
+        db.execute(stmt)
+
+
+def record_showtime_changes(db: Session, changes, cinema=None):
+    """Record a "showtimes" event for a ShowtimeChanges, if anything changed (`cinema`: the one synced)."""
+    if not changes:
+        return
+    payload = changes.as_dict()
+    if cinema is not None:
+        payload["cinema"] = cinema
+    record_change(db, "showtimes", **payload)
+
+
+def events_after_statement(last_id, limit=100):
+    """Events with an id above `last_id`, oldest first."""
+    return select(ChangeEvent).where(ChangeEvent.id > last_id).order_by(ChangeEvent.id).limit(limit)
+
+
+def latest_event_statement():
+    """(oldest id, latest id) of the kept events; both None if there are none."""
+    return select(func.min(ChangeEvent.id), func.max(ChangeEvent.id))
+
+
+def format_event(event_id, kind, data):
+    """One Server-Sent Events message; `data` is JSON text or an object."""
+    if not isinstance(data, str):
+        data = json.dumps(data, ensure_ascii=False, separators=(",", ":"))
+    return f"id: {event_id}\nevent: {kind}\ndata: {data}\n\n"
@@ -0,0 +1,104 @@
+import logging
+import threading
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from config import env_int, env_float
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = "WhatToCinema/1.0 (+https://github.com/daunera/WhatToCinema)"
+
+# Statuses worth retrying: rate limiting and transient upstream errors
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def get_fetch_settings():
+    """Retrieve HTTP fetch tuning from environment variables."""
+    return {
+        "max_workers": max(1, env_int("SCRAPE_MAX_WORKERS", 8)),
+        "per_host_limit": max(1, env_int("SCRAPE_PER_HOST_LIMIT", 2)),
+        "timeout": env_float("SCRAPE_TIMEOUT", 15.0),
+        "retries": max(0, env_int("SCRAPE_RETRIES", 3)),
+        "backoff": env_float("SCRAPE_BACKOFF", 0.5),
+    }
+
+
+def conditional_headers(page_state):
+    """Build If-None-Match / If-Modified-Since headers from stored validators."""
+    headers = {}
+    if page_state.get("etag"):
+        headers["If-None-Match"] = page_state["etag"]
+    if page_state.get("last_modified"):
+        headers["If-Modified-Since"] = page_state["last_modified"]
+    return headers
+
+
+class Fetcher:
+    """
+    Shared HTTP client for the scraper.
+    One keep-alive connection pool for all cinemas, retry with exponential
+    backoff, request timeouts and a cap on concurrent requests per host.
+    """
+
+    def __init__(self, max_workers=None, per_host_limit=None, timeout=None, retries=None, backoff=None):
+        settings = get_fetch_settings()
+        self.max_workers = max_workers or settings["max_workers"]
+        self.per_host_limit = per_host_limit or settings["per_host_limit"]
+        self.timeout = timeout or settings["timeout"]
+        retries = settings["retries"] if retries is None else retries
+        backoff = settings["backoff"] if backoff is None else backoff
+
+        self.session = requests.Session()
+        self.session.headers["User-Agent"] = USER_AGENT
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=("GET", "HEAD"),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            max_retries=retry,
+            pool_connections=self.max_workers,
+            pool_maxsize=max(self.max_workers, self.per_host_limit),
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._host_slots = {}
+        self._host_lock = threading.Lock()
+
+    @contextmanager
+    def _host_slot(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._host_lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = threading.BoundedSemaphore(self.per_host_limit)
+                self._host_slots[host] = slot
+        with slot:
+            yield
+
+    def get(self, url, **kwargs):
+        """GET a URL through the shared pool, honouring the per-host limit."""
+        kwargs.setdefault("timeout", self.timeout)
+        with self._host_slot(url):
+            return self.session.get(url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
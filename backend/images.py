@@ -0,0 +1,233 @@
+"""
+Thumbnail cache for poster and age rating images.
+
+After every scrape, cache_images() downloads each poster_url and
+age_restriction_url it has not seen before, once, and stores a WebP
+thumbnail (at most IMAGE_THUMB_WIDTH pixels wide) under IMAGE_CACHE_DIR,
+named by the hash of its content: <dir>/<ab>/<digest>.webp. The images
+table maps every source URL to its digest and movies carry the digests of
+their two images, so a URL is fetched once however many showtimes and
+cinemas use it, and identical images share one file.
+
+/api/images/<digest>.webp serves the files with immutable cache headers, as
+a digest always names the same bytes. The cache is bounded to
+IMAGE_CACHE_MAX_MB: serving a file touches its mtime and the least recently
+used files are evicted first. An evicted file is fetched again the next time
+it is requested.
+"""
+import datetime
+import hashlib
+import io
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import select, update, delete
+from sqlalchemy.orm import Session
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # Pillow is optional; without it images are not cached
+    Image = None
+
+from config import env_float, env_int, env_str
+from database import CachedImage, Movie, SessionLocal
+from events import record_change
+from fetcher import Fetcher
+from sync import _chunks
+
+logger = logging.getLogger(__name__)
+
+DIGEST_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# Failed downloads are retried by the first scrape after this long
+RETRY_AFTER = datetime.timedelta(hours=24)
+
+# Served files get their mtime refreshed at most this often (seconds)
+TOUCH_INTERVAL = 3600
+
+
+def get_image_settings():
+    """Retrieve the image cache settings from environment variables."""
+    return {
+        "directory": env_str("IMAGE_CACHE_DIR", "data/images"),
+        "max_bytes": max(0, env_float("IMAGE_CACHE_MAX_MB", 200)) * 2**20,
+        "width": max(16, env_int("IMAGE_THUMB_WIDTH", 200)),
+        "quality": min(100, max(1, env_int("IMAGE_THUMB_QUALITY", 80))),
+    }
+
+
+def images_enabled(settings=None):
+    settings = settings or get_image_settings()
+    return Image is not None and settings["max_bytes"] > 0
+
+
+def image_path(directory, digest):
+    return os.path.join(directory, digest[:2], f"{digest}.webp")
+
+
+def make_thumbnail(data, width, quality):
+    """WebP thumbnail of an image at most `width` wide (never upscaled); returns (bytes, width, height)."""
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, width * 3))
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+        out = io.BytesIO()
+        image.save(out, "WEBP", quality=quality, method=4)
+        return out.getvalue(), image.width, image.height
+
+
+def store_thumbnail(directory, thumbnail):
+    """Write a thumbnail under its content hash (if not there yet) and return the digest."""
+    digest = hashlib.blake2b(thumbnail, digest_size=16).hexdigest()
+    path = image_path(directory, digest)
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(thumbnail)
+        os.replace(tmp, path)
+    return digest
+
+
+def fetch_image(fetcher, url, settings):
+    """Download and thumbnail one image; returns the CachedImage column values."""
+    values = {"url": url, "digest": None, "width": None, "height": None, "bytes": None,
+              "fetched_at": datetime.datetime.now(), "error": None}
+    try:
+        response = fetcher.get(url)
+        response.raise_for_status()
+        thumbnail, width, height = make_thumbnail(response.content, settings["width"], settings["quality"])
+        values.update(
+            digest=store_thumbnail(settings["directory"], thumbnail),
+            width=width, height=height, bytes=len(thumbnail),
+        )
+    except Exception as e:
+        logger.warning(f"Failed to cache image {url}: {e}")
+        values["error"] = str(e)[:500]
+    return values
+
+
+def link_movies(db: Session):
+    """Point every movie at the cached thumbnails of its current image URLs; returns the ids changed."""
+    changed = set()
+    for url_column, image_column in (
+        (Movie.poster_url, Movie.poster_image),
+        (Movie.age_restriction_url, Movie.age_restriction_image),
+    ):
+        digest = select(CachedImage.digest).where(CachedImage.url == url_column).scalar_subquery()
+        changed.update(db.execute(
+            update(Movie).where(image_column.is_not(digest)).values({image_column: digest}).returning(Movie.id)
+        ).scalars())
+    return changed
+
+
+def evict(directory, max_bytes):
+    """Delete the least recently used files until the cache fits in `max_bytes`; returns the count."""
+    files = []
+    total = 0
+    for root, _, names in os.walk(directory):
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, path))
+            total += st.st_size
+    removed = 0
+    for _, size, path in sorted(files):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    if removed:
+        logger.info(f"Evicted {removed} cached images ({total / 2**20:.1f} MiB left)")
+    return removed
+
+
+def cache_images(db: Session, fetcher=None):
+    """
+    Fetch the images of all movies that are not cached yet (or failed more
+    than RETRY_AFTER ago), link movies to their thumbnails, forget URLs no
+    movie uses any more and evict down to the size bound. Commits.
+    Returns (images fetched, movies relinked).
+    """
+    settings = get_image_settings()
+    if not images_enabled(settings):
+        return 0, 0
+
+    wanted = set()
+    for poster_url, age_restriction_url in db.execute(select(Movie.poster_url, Movie.age_restriction_url)):
+        wanted.update(url for url in (poster_url, age_restriction_url) if url)
+    known = {
+        url: (digest, fetched_at)
+        for url, digest, fetched_at in db.execute(select(CachedImage.url, CachedImage.digest, CachedImage.fetched_at))
+    }
+    retry_before = datetime.datetime.now() - RETRY_AFTER
+    todo = sorted(
+        url for url in wanted
+        if url not in known or (known[url][0] is None and (known[url][1] or retry_before) <= retry_before)
+    )
+
+    if todo:
+        started = time.perf_counter()
+        own_fetcher = fetcher is None
+        fetcher = fetcher or Fetcher()
+        try:
+            with ThreadPoolExecutor(max_workers=fetcher.max_workers, thread_name_prefix="images") as pool:
+                rows = list(pool.map(lambda url: fetch_image(fetcher, url, settings), todo))
+        finally:
+            if own_fetcher:
+                fetcher.close()
+        for values in rows:
+            db.merge(CachedImage(**values))
+        db.flush()
+        failed = sum(1 for values in rows if values["digest"] is None)
+        logger.info(
+            f"Cached {len(rows) - failed} images ({failed} failed) in {time.perf_counter() - started:.2f}s"
+        )
+
+    stale = [url for url in known if url not in wanted]
+    for chunk in _chunks(stale):
+        db.execute(delete(CachedImage).where(CachedImage.url.in_(chunk)))
+    relinked = link_movies(db)
+    if relinked:
+        record_change(db, "movies", movies=sorted(relinked))
+    db.commit()
+    evict(settings["directory"], settings["max_bytes"])
+    return len(todo), len(relinked)
+
+
+def cached_image_path(digest):
+    """
+    Path of the cached file for `digest`, or None. Marks it as recently used;
+    an evicted file is fetched again from a URL that produced it.
+    """
+    if not DIGEST_RE.match(digest):
+        return None
+    settings = get_image_settings()
+    path = image_path(settings["directory"], digest)
+    try:
+        if time.time() - os.stat(path).st_mtime > TOUCH_INTERVAL:
+            os.utime(path)
+        return path
+    except OSError:
+        pass
+
+    if not images_enabled(settings):
+        return None
+    with SessionLocal() as db:
+        urls = db.execute(select(CachedImage.url).where(CachedImage.digest == digest)).scalars().all()
+    with Fetcher(retries=0) as fetcher:
+        for url in urls:
+            if fetch_image(fetcher, url, settings)["digest"] == digest:
+                return path
+    return None
@@ -0,0 +1,218 @@
+import json
+import logging
+import datetime
+import threading
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from cache import bump_data_version
+from config import env_int
+from database import SessionLocal, ScrapeJob
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+def get_stale_after():
+    """Seconds without a heartbeat after which a running job is considered dead."""
+    return max(60, env_int("SCRAPE_JOB_STALE_SECONDS", 900))
+
+# ScrapeJob.active values: the job queued or running, and a full scrape
+# requested while a partial one was running, which waits for it to finish
+ACTIVE = 1
+FOLLOW_UP = 2
+
+def enqueue_scrape(trigger="api", urls=None):
+    """
+    Queue a scrape of all cinemas (or only `urls`) unless one is already
+    queued or running. Returns (job_id, created); repeated triggers get the
+    active job's id. A full scrape request widens a queued partial one, and
+    queues a follow-up full scrape behind a running partial one.
+    """
+    urls_json = json.dumps(list(urls)) if urls is not None else None
+    with SessionLocal() as db:
+        for _ in range(3):
+            job = ScrapeJob(status="queued", trigger=trigger, urls=urls_json, active=ACTIVE)
+            db.add(job)
+            try:
+                db.commit()
+                logger.info(f"Queued scrape job {job.id} ({trigger})")
+                return job.id, True
+            except IntegrityError:
+                db.rollback()
+            active = db.execute(select(ScrapeJob.id, ScrapeJob.status, ScrapeJob.urls).where(
+                ScrapeJob.active == ACTIVE
+            )).first()
+            if active is not None and urls is None and active.urls is not None:
+                # Widen only while still queued: a worker may have claimed it (and read its URLs) since
+                widened = db.execute(
+                    update(ScrapeJob)
+                    .where(ScrapeJob.id == active.id, ScrapeJob.status == "queued")
+                    .values(urls=None)
+                ).rowcount
+                if not widened:
+                    db.rollback()
+                    return _enqueue_follow_up(db, trigger)
+            db.commit()
+            if active is not None:
+                return active.id, False
+            # The active job finished in between; try again
+    raise RuntimeError("Could not queue scrape job")
+
+def _enqueue_follow_up(db, trigger):
+    """Queue a full scrape to run once the running partial one finishes; (job_id, created)."""
+    job = ScrapeJob(status="queued", trigger=trigger, urls=None, active=FOLLOW_UP)
+    db.add(job)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        return db.execute(select(ScrapeJob.id).where(ScrapeJob.active == FOLLOW_UP)).scalar(), False
+    logger.info(f"Queued scrape job {job.id} ({trigger}) after the running partial scrape")
+    # The partial scrape may have finished before the follow-up was committed
+    _promote_follow_up(db)
+    db.commit()
+    return job.id, True
+
+def _promote_follow_up(db):
+    """Make a waiting follow-up job the active one once no other job is (does not commit)."""
+    db.execute(
+        update(ScrapeJob)
+        .where(ScrapeJob.active == FOLLOW_UP)
+        .where(~select(ScrapeJob.id).where(ScrapeJob.active == ACTIVE).exists())
+        .values(active=ACTIVE)
+    )
+
+def fail_stale_jobs():
+    """Mark running jobs whose worker stopped heartbeating as failed, releasing the lock."""
+    now = datetime.datetime.now()
+    cutoff = now - datetime.timedelta(seconds=get_stale_after())
+    with SessionLocal() as db:
+        count = db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.status == "running", ScrapeJob.heartbeat_at < cutoff)
+            .values(status="failed", active=None, finished_at=now, error="Worker stopped responding")
+        ).rowcount
+        _promote_follow_up(db)
+        db.commit()
+    if count:
+        logger.warning(f"Marked {count} stale scrape job(s) as failed")
+    return count
+
+def claim_next_job():
+    """Atomically move the active job to running if it is queued. Returns its id or None."""
+    fail_stale_jobs()
+    now = datetime.datetime.now()
+    with SessionLocal() as db:
+        job_id = db.execute(
+            select(ScrapeJob.id).where(ScrapeJob.status == "queued", ScrapeJob.active == ACTIVE)
+        ).scalar()
+        if job_id is None:
+            return None
+        claimed = db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id == job_id, ScrapeJob.status == "queued")
+            .values(status="running", started_at=now, heartbeat_at=now)
+        ).rowcount
+        db.commit()
+    return job_id if claimed else None
+
+def job_urls(job_id):
+    """URLs a job should scrape, or None for all configured cinemas."""
+    with SessionLocal() as db:
+        urls = db.execute(select(ScrapeJob.urls).where(ScrapeJob.id == job_id)).scalar()
+    return json.loads(urls) if urls else None
+
+def finish_job(job_id, error=None, stats=None):
+    """Mark a job done (or failed with `error`), storing the run's aggregated stats."""
+    now = datetime.datetime.now()
+    with SessionLocal() as db:
+        db.execute(
+            update(ScrapeJob)
+            .where(ScrapeJob.id == job_id)
+            .values(
+                status="failed" if error else "done",
+                active=None,
+                finished_at=now,
+                heartbeat_at=now,
+                error=error,
+                stats=json.dumps(stats) if stats is not None else None,
+            )
+        )
+        _promote_follow_up(db)
+        db.commit()
+    bump_data_version()
+
+class JobProgress:
+    """
+    Progress callback for scrape_all(): keeps per-cinema state and metrics
+    and writes them to the job row. Used as a context manager, it also
+    refreshes the worker heartbeat from a timer thread while the job runs,
+    so phases without progress (a slow page, movie details, thumbnails,
+    snapshots) do not get the job failed as stale.
+    """
+
+    def __init__(self, job_id, urls):
+        self.job_id = job_id
+        self.cinemas = {
+            url.split('#')[0]: {"cinema_name": None, "status": "pending", "showtimes": 0}
+            for url in urls
+        }
+        self._stop = threading.Event()
+        self._thread = None
+        self._save()
+
+    def __call__(self, url, status, **metrics):
+        self.cinemas[url] = dict(metrics, status=status)
+        self._save()
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._beat, name=f"job-{self.job_id}-heartbeat", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self):
+        interval = get_stale_after() / 4
+        while not self._stop.wait(interval):
+            try:
+                with SessionLocal() as db:
+                    db.execute(
+                        update(ScrapeJob)
+                        .where(ScrapeJob.id == self.job_id)
+                        .values(heartbeat_at=datetime.datetime.now())
+                    )
+                    db.commit()
+            except Exception as e:
+                # E.g. the database stayed locked by a long sync; the next beat tries again
+                logger.warning(f"Heartbeat of scrape job {self.job_id} failed: {e}")
+
+    def _save(self):
+        with SessionLocal() as db:
+            db.execute(
+                update(ScrapeJob)
+                .where(ScrapeJob.id == self.job_id)
+                .values(
+                    progress=json.dumps(self.cinemas, ensure_ascii=False),
+                    heartbeat_at=datetime.datetime.now(),
+                )
+            )
+            db.commit()
+
+def job_to_dict(job):
+    """Plain representation of a ScrapeJob row for the API."""
+    return {
+        "id": job.id,
+        "status": job.status,
+        "trigger": job.trigger,
+        "urls": json.loads(job.urls) if job.urls else None,
+        "created_at": job.created_at,
+        "started_at": job.started_at,
+        "finished_at": job.finished_at,
+        "error": job.error,
+        "progress": json.loads(job.progress) if job.progress else {},
+        "stats": json.loads(job.stats) if job.stats else {},
+    }
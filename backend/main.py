@@ -1,22 +1,41 @@
 
 import os
+import io
+import csv
+import json
+import asyncio
 import logging
-from typing import List, Optional
-from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks, Header, Query, Security
+import threading
+from time import perf_counter
+from typing import Dict, List, Optional, Union
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, Security
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, StreamingResponse
 from fastapi.security import APIKeyHeader
 from fastapi.middleware.cors import CORSMiddleware
+from sqlalchemy import select, insert, delete, func, tuple_
 from sqlalchemy.orm import Session
-from apscheduler.schedulers.background import BackgroundScheduler
-from pydantic import BaseModel
-from datetime import datetime
+from pydantic import BaseModel, TypeAdapter
+from datetime import datetime, date, time, timedelta
 
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from database import init_db, get_db, Showtime, Favorite, AppSettings
-from scraper import scrape_all
+from database import (
+    init_db, SessionLocal, get_async_sessionmaker, Showtime, Movie, Cinema, Favorite, AppSettings, ScrapeJob,
+    DateSummary, MovieDetail, ArchivedShowtime,
+)
+from jobs import enqueue_scrape, job_to_dict
+import metrics
+from cache import response_cache, bump_data_version, choose_encoding
+from config import env_bool, env_str
+from sync import refresh_date_summaries, ARCHIVE_FIELDS
+from search import TitleIndex
+from images import cached_image_path
+from snapshots import SHOWTIME_COLUMNS, snapshot_file
+from events import change_statements, events_after_statement, latest_event_statement, format_event
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -45,13 +64,25 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = perf_counter()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.request_latency.observe(
+        (request.method, route.path if route is not None else "unmatched", str(response.status_code)),
+        perf_counter() - started,
+    )
+    return response
+
 # API Key Security
 API_KEY_NAME = "X-API-Key"
 api_key_header = APIKeyHeader(name=API_KEY_NAME, auto_error=True)
 
-def get_api_key(api_key: str = Security(api_key_header)):
+async def get_api_key(api_key: str = Security(api_key_header)):
     env_api_key = os.getenv("API_KEY")
     if not env_api_key:
         # If API_KEY is not set on server, fail securely
@@ -62,21 +93,85 @@ def get_api_key(api_key: str = Security(api_key_header)):
         raise HTTPException(status_code=403, detail="Could not validate credentials")
     return api_key
 
-# Scheduler
-scheduler = BackgroundScheduler()
+# Scraping runs in the standalone worker (worker.py). EMBEDDED_WORKER=true
+# runs it in a thread of this process instead, for single-process setups;
+# with several uvicorn workers the job lock still allows only one scrape.
+worker_stop = threading.Event()
 
 @app.on_event("startup")
 def on_startup():
     init_db()
-    
-    # Schedule scraping daily at 7:00 AM
-    scheduler.add_job(scrape_all, 'cron', hour=7, minute=0)
-    scheduler.start()
-    logger.info("Scheduler started. Scraping job set for 7:00 AM daily.")
+    # Databases from before the summary table get it filled once
+    with SessionLocal() as db:
+        if db.query(DateSummary).first() is None and db.query(Showtime).first() is not None:
+            refresh_date_summaries(db)
+            db.commit()
+
+    if env_bool("EMBEDDED_WORKER", False):
+        from worker import run_worker
+        threading.Thread(target=run_worker, args=(worker_stop,), name="scrape-worker", daemon=True).start()
+        logger.info("Embedded scraper worker started.")
 
 @app.on_event("shutdown")
 def on_shutdown():
-    scheduler.shutdown()
+    worker_stop.set()
+
+# How endpoints reach the database: "async" awaits aiosqlite on the event
+# loop, "sync" runs the regular engine in the threadpool.
+API_DB_MODES = ("async", "sync")
+
+def get_api_db_mode():
+    mode = (env_str("API_DB_MODE", "async")).lower()
+    if mode not in API_DB_MODES:
+        logger.warning(f"Unknown API_DB_MODE '{mode}', using 'async'")
+        mode = "async"
+    if mode == "async":
+        try:
+            get_async_sessionmaker()
+        except (ImportError, ValueError) as e:
+            logger.warning(f"Async database driver unavailable ({e}), using 'sync'")
+            mode = "sync"
+    return mode
+
+API_DB_MODE = get_api_db_mode()
+logger.info(f"API database mode: {API_DB_MODE}")
+
+def _fetch_sync(stmt, scalars):
+    with SessionLocal() as db:
+        result = db.execute(stmt)
+        return result.scalars().all() if scalars else result.all()
+
+def _write_sync(stmts):
+    with SessionLocal() as db:
+        for stmt in stmts:
+            db.execute(stmt)
+        db.commit()
+
+async def fetch_all(stmt, scalars=False):
+    """Run a read statement in the configured API_DB_MODE and return all rows."""
+    if API_DB_MODE == "sync":
+        return await run_in_threadpool(_fetch_sync, stmt, scalars)
+    async with get_async_sessionmaker()() as db:
+        result = await db.execute(stmt)
+        return result.scalars().all() if scalars else result.all()
+
+async def execute_write(*stmts):
+    """Run write statements in one transaction and commit."""
+    if API_DB_MODE == "sync":
+        return await run_in_threadpool(_write_sync, stmts)
+    async with get_async_sessionmaker()() as db:
+        for stmt in stmts:
+            await db.execute(stmt)
+        await db.commit()
+
+# Upper bound for the /api/movies page size
+MAX_PAGE_SIZE = 1000
+
+# Rows read per query while streaming /api/archive
+ARCHIVE_PAGE_SIZE = 2000
+
+# Reference point for the compact epoch timestamps of /api/movies/grouped
+EPOCH = datetime(1970, 1, 1)
 
 # Pydantic Models
 class ShowtimeSchema(BaseModel):
@@ -92,6 +187,9 @@ class ShowtimeSchema(BaseModel):
     age_restriction: Optional[str]
     details_type: Optional[str]
     age_restriction_url: Optional[str]
+    # Cached thumbnails, served at /api/images/<digest>.webp (None until cached)
+    poster_image: Optional[str] = None
+    age_restriction_image: Optional[str] = None
 
     class Config:
         from_attributes = True
@@ -106,63 +204,698 @@ class FavoriteSchema(BaseModel):
 class FavoriteCreate(BaseModel):
     movie_title: str
 
+class CinemaProgressSchema(BaseModel):
+    cinema_name: Optional[str]
+    # pending, synced, parsed, unchanged, empty or failed
+    status: str
+    showtimes: int
+    bytes: Optional[int] = None
+    fetch_seconds: Optional[float] = None
+    parse_seconds: Optional[float] = None
+    sync_seconds: Optional[float] = None
+    prune_seconds: Optional[float] = None
+    inserted: Optional[int] = None
+    updated: Optional[int] = None
+    deleted: Optional[int] = None
+    errors: Optional[int] = None
+    error: Optional[str] = None
+
+class ScrapeJobSchema(BaseModel):
+    id: int
+    status: str
+    trigger: Optional[str]
+    urls: Optional[List[str]] = None  # None: all configured cinemas
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    error: Optional[str]
+    progress: Dict[str, CinemaProgressSchema]
+    # Run totals: showtimes, inserted, updated, deleted, bytes, errors,
+    # favorites_pruned, duration_seconds and <phase>_seconds summed over cinemas
+    stats: Dict[str, float]
+
 class StatusSchema(BaseModel):
     last_scrape_time: Optional[datetime]
+    runs: List[ScrapeJobSchema] = []
+
+class ScrapeTriggerSchema(BaseModel):
+    message: str
+    job_id: int
+    deduplicated: bool
+
+class GroupedMovieSchema(BaseModel):
+    title: str
+    movie_url: Optional[str]
+    poster_url: Optional[str]
+    genre: Optional[str]
+    age_restriction: Optional[str]
+    age_restriction_url: Optional[str]
+    poster_image: Optional[str] = None
+    age_restriction_image: Optional[str] = None
+    # [id, cinema_index, start_epoch, type_index, ticket_url]
+    showtimes: List[List[Union[int, str, None]]]
+
+class GroupedMoviesSchema(BaseModel):
+    cinemas: List[str]
+    types: List[Optional[str]]
+    movies: List[GroupedMovieSchema]
+
+class DateSummarySchema(BaseModel):
+    date: str
+    showtimes: int
+    movies: int
+    cinemas: int
+    favorites: List[str]
+
+showtime_list_adapter = TypeAdapter(List[ShowtimeSchema])
+favorite_list_adapter = TypeAdapter(List[FavoriteSchema])
+date_summary_list_adapter = TypeAdapter(List[DateSummarySchema])
+
+class MovieDetailsSchema(BaseModel):
+    title: str
+    movie_url: Optional[str]
+    original_title: Optional[str] = None
+    runtime_minutes: Optional[int] = None
+    synopsis: Optional[str] = None
+    cast: List[str] = []
+    fetched_at: Optional[datetime] = None  # None until the movie page was fetched
+
+class SearchResultSchema(BaseModel):
+    id: int
+    title: str
+    poster_url: Optional[str] = None
+    score: float
+    match: str  # exact, prefix, words or fuzzy
+
+search_result_list_adapter = TypeAdapter(List[SearchResultSchema])
 
 # Endpoints
 
+def encode_cursor(showtime):
+    """Keyset cursor pointing just after the given showtime."""
+    return f"{showtime.start_time.isoformat()}_{showtime.id}"
+
+def decode_cursor(cursor: str):
+    try:
+        start_time, showtime_id = cursor.rsplit("_", 1)
+        return datetime.fromisoformat(start_time), int(showtime_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def movies_statement(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cinema: Optional[List[str]] = None,
+    title: Optional[str] = None,
+    genre: Optional[str] = None,
+    details_type: Optional[str] = None,
+    favorites_only: bool = False,
+    ids: Optional[List[int]] = None,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+):
+    """
+    Build the filtered /api/movies select over the normalized tables.
+    With `limit`, one extra row is fetched to detect the next page (see paginate()).
+    """
+    stmt = (
+        select(*SHOWTIME_COLUMNS)
+        .join(Cinema, Cinema.id == Showtime.cinema_id)
+        .join(Movie, Movie.id == Showtime.movie_id)
+    )
+
+    # Date range as a start_time range so it can use ix_showtime_start_id
+    date_from = date_from or datetime.now().date()
+    stmt = stmt.where(Showtime.start_time >= datetime.combine(date_from, time.min))
+    if date_to:
+        stmt = stmt.where(Showtime.start_time < datetime.combine(date_to + timedelta(days=1), time.min))
+
+    if cinema:
+        stmt = stmt.where(Cinema.name.in_(cinema))
+    if title:
+        stmt = stmt.where(Movie.title.ilike(f"%{title}%"))
+    if genre:
+        stmt = stmt.where(Movie.genre.ilike(f"%{genre}%"))
+    if details_type:
+        stmt = stmt.where(Showtime.details_type == details_type)
+    if favorites_only:
+        stmt = stmt.where(Movie.title.in_(select(Favorite.movie_title)))
+    if ids:
+        stmt = stmt.where(Showtime.id.in_(ids))
+
+    if cursor:
+        stmt = stmt.where(tuple_(Showtime.start_time, Showtime.id) > decode_cursor(cursor))
+
+    stmt = stmt.order_by(Showtime.start_time, Showtime.id)
+    if limit:
+        stmt = stmt.limit(limit + 1)
+    return stmt
+
+def paginate(rows, limit):
+    """Trim the look-ahead row; returns (rows, next_cursor)."""
+    if limit and len(rows) > limit:
+        rows = rows[:limit]
+        return rows, encode_cursor(rows[-1])
+    return rows, None
+
+def query_movies(db: Session, limit: Optional[int] = None, **filters):
+    """
+    Run a filtered /api/movies query on a sync session (benchmarks, scripts).
+    Takes the movies_statement() arguments as keywords; returns
+    (rows, next_cursor) where rows are flat named tuples matching ShowtimeSchema.
+    """
+    rows = db.execute(movies_statement(limit=limit, **filters)).all()
+    return paginate(rows, limit)
+
+async def fetch_movies(limit: Optional[int] = None, **filters):
+    """query_movies() for the endpoints, through the API_DB_MODE path."""
+    return paginate(await fetch_all(movies_statement(limit=limit, **filters)), limit)
+
+def etag_matches(if_none_match: Optional[str], etag: str):
+    if not if_none_match:
+        return False
+    candidates = [c.strip() for c in if_none_match.split(",")]
+    return "*" in candidates or etag in (c[2:] if c.startswith("W/") else c for c in candidates)
+
+async def cached_json_response(request: Request, key, build):
+    """
+    Serve pre-serialized JSON from the response cache, building it on a miss.
+    `build` is a coroutine function returning (body_bytes, extra_headers).
+    Negotiates gzip/brotli and honours If-None-Match.
+    """
+    entry = response_cache.get(key)
+    if entry is None:
+        version = response_cache.version
+        body, headers = await build()
+        entry = response_cache.set(key, body, headers, version)
+
+    encoding = choose_encoding(request.headers.get("accept-encoding"))
+    body, etag = entry.encoded(encoding)
+
+    headers = dict(entry.headers)
+    headers["ETag"] = etag
+    headers["Cache-Control"] = "no-cache"
+    headers["Vary"] = "Accept-Encoding"
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if body is not entry.body:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
+
+def request_cache_key(request: Request, *extra):
+    return (request.url.path, *extra, tuple(sorted(request.query_params.multi_items())))
+
+def snapshot_response(request: Request, key):
+    """
+    Serve a static snapshot file (see snapshots.py) as stored, in the best
+    content-coding the client accepts; None if there is no current snapshot.
+    """
+    found = snapshot_file(key, choose_encoding(request.headers.get("accept-encoding")), datetime.now().date())
+    if found is None:
+        return None
+    path, etag, encoding = found
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(path, media_type="application/json", headers=headers)
+
 @app.get("/api/movies", response_model=List[ShowtimeSchema], dependencies=[Depends(get_api_key)])
-def get_movies(
-    db: Session = Depends(get_db)
+async def get_movies(
+    request: Request,
+    date_from: Optional[date] = Query(None, description="First day (YYYY-MM-DD), defaults to today"),
+    date_to: Optional[date] = Query(None, description="Last day (YYYY-MM-DD), inclusive"),
+    cinema: Optional[List[str]] = Query(None, description="Cinema name, may be repeated"),
+    title: Optional[str] = Query(None, description="Case-insensitive title substring"),
+    genre: Optional[str] = Query(None, description="Case-insensitive genre substring"),
+    details_type: Optional[str] = Query(None),
+    favorites_only: bool = False,
+    id: Optional[List[int]] = Query(None, description="Showtime id, may be repeated (to apply a change event)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Page size; omit for all rows"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
 ):
     """
-    Get all showtimes from today onwards.
+    Get showtimes from today (or `date_from`) onwards, ordered by start time.
+    With `limit`, results are paginated by keyset on (start_time, id); the
+    cursor for the next page is returned in the X-Next-Cursor header.
+    The full list and single dates are served from the snapshot files
+    written after each scrape, when they are current.
     """
-    query = db.query(Showtime)
-    
-    # Showtimes from today onwards
-    today = datetime.now().strftime("%Y-%m-%d")
-    query = query.filter(Showtime.date_str >= today)
-        
-    return query.order_by(Showtime.start_time).all()
+    params = set(request.query_params.keys())
+    if not params or (params == {"date_from", "date_to"} and date_from == date_to):
+        response = snapshot_response(request, date_from.isoformat() if params else "all")
+        if response is not None:
+            return response
+
+    async def build():
+        rows, next_cursor = await fetch_movies(
+            date_from=date_from, date_to=date_to, cinema=cinema, title=title, genre=genre,
+            details_type=details_type, favorites_only=favorites_only, ids=id, limit=limit, cursor=cursor,
+        )
+        body = showtime_list_adapter.dump_json(showtime_list_adapter.validate_python(rows, from_attributes=True))
+        return body, ({"X-Next-Cursor": next_cursor} if next_cursor else {})
 
-@app.post("/api/scrape", dependencies=[Depends(get_api_key)])
-def trigger_scrape(
-    background_tasks: BackgroundTasks
+    # "today" is the default lower bound, so it is part of the key
+    return await cached_json_response(request, request_cache_key(request, datetime.now().date()), build)
+
+def group_showtimes(rows):
+    """
+    Build the compact grouped payload: each movie's metadata once, with its
+    showtimes as [id, cinema_index, start_epoch, type_index, ticket_url].
+    start_epoch is the cinema's local wall-clock time expressed as seconds
+    since 1970-01-01 (format it as UTC on the client).
+    """
+    cinemas, cinema_index = [], {}
+    types, type_index = [], {}
+    movies = {}
+
+    for st in rows:
+        if st.cinema_name not in cinema_index:
+            cinema_index[st.cinema_name] = len(cinemas)
+            cinemas.append(st.cinema_name)
+        if st.details_type not in type_index:
+            type_index[st.details_type] = len(types)
+            types.append(st.details_type)
+
+        movie = movies.get(st.movie_title)
+        if movie is None:
+            movie = movies[st.movie_title] = {
+                "title": st.movie_title,
+                "movie_url": st.movie_url,
+                "poster_url": st.poster_url,
+                "genre": st.genre,
+                "age_restriction": st.age_restriction,
+                "age_restriction_url": st.age_restriction_url,
+                "poster_image": st.poster_image,
+                "age_restriction_image": st.age_restriction_image,
+                "showtimes": [],
+            }
+        movie["showtimes"].append([
+            st.id,
+            cinema_index[st.cinema_name],
+            int((st.start_time - EPOCH).total_seconds()),
+            type_index[st.details_type],
+            st.ticket_url,
+        ])
+
+    return {"cinemas": cinemas, "types": types, "movies": list(movies.values())}
+
+@app.get("/api/movies/grouped", response_model=GroupedMoviesSchema, dependencies=[Depends(get_api_key)])
+async def get_movies_grouped(
+    request: Request,
+    date_from: Optional[date] = Query(None, description="First day (YYYY-MM-DD), defaults to today"),
+    date_to: Optional[date] = Query(None, description="Last day (YYYY-MM-DD), inclusive"),
+    cinema: Optional[List[str]] = Query(None, description="Cinema name, may be repeated"),
+    title: Optional[str] = Query(None, description="Case-insensitive title substring"),
+    genre: Optional[str] = Query(None, description="Case-insensitive genre substring"),
+    details_type: Optional[str] = Query(None),
+    favorites_only: bool = False,
+):
+    """
+    Same filters as /api/movies, grouped per movie so metadata is sent once.
+    Showtime rows are [id, cinema_index, start_epoch, type_index, ticket_url]
+    indexing into the top-level `cinemas` and `types` arrays.
+    """
+    async def build():
+        rows, _ = await fetch_movies(
+            date_from=date_from, date_to=date_to, cinema=cinema, title=title, genre=genre,
+            details_type=details_type, favorites_only=favorites_only,
+        )
+        return json.dumps(group_showtimes(rows), ensure_ascii=False, separators=(",", ":")).encode(), {}
+
+    return await cached_json_response(request, request_cache_key(request, datetime.now().date()), build)
+
+@app.get("/api/movies/details", response_model=MovieDetailsSchema, dependencies=[Depends(get_api_key)])
+async def get_movie_details(request: Request, title: str = Query(..., description="Exact movie title")):
+    """Runtime, synopsis, original title and cast from the movie's own page (fetched after each scrape)."""
+    async def build():
+        rows = await fetch_all(
+            select(
+                Movie.title, Movie.movie_url, MovieDetail.original_title, MovieDetail.runtime_minutes,
+                MovieDetail.synopsis, MovieDetail.actors, MovieDetail.fetched_at,
+            )
+            .outerjoin(MovieDetail, MovieDetail.movie_url == Movie.movie_url)
+            .where(Movie.title == title)
+        )
+        if not rows:
+            raise HTTPException(status_code=404, detail="Movie not found")
+        details = dict(rows[0]._mapping)
+        actors = details.pop("actors")
+        details["cast"] = json.loads(actors) if actors else []
+        return MovieDetailsSchema(**details).model_dump_json().encode(), {}
+
+    return await cached_json_response(request, request_cache_key(request), build)
+
+@app.get("/api/summary", response_model=List[DateSummarySchema], dependencies=[Depends(get_api_key)])
+async def get_summary(
+    request: Request,
+    date_from: Optional[date] = Query(None, description="First day (YYYY-MM-DD), defaults to today"),
+):
+    """
+    Per date: number of showtimes, movies and cinemas, and the favorites
+    playing. Read from the summary table materialized after each scrape,
+    so the UI can render its date tabs before the showtime list arrives.
+    """
+    async def build():
+        date_from_str = (date_from or datetime.now().date()).isoformat()
+        rows = await fetch_all(
+            select(DateSummary).where(DateSummary.date_str >= date_from_str).order_by(DateSummary.date_str),
+            scalars=True,
+        )
+        summary = [
+            {
+                "date": row.date_str,
+                "showtimes": row.showtimes,
+                "movies": row.movies,
+                "cinemas": row.cinemas,
+                "favorites": json.loads(row.favorites) if row.favorites else [],
+            }
+            for row in rows
+        ]
+        return date_summary_list_adapter.dump_json(date_summary_list_adapter.validate_python(summary)), {}
+
+    return await cached_json_response(request, request_cache_key(request, datetime.now().date()), build)
+
+# (data version, TitleIndex) of the movie titles, rebuilt when the data changes
+_title_index = (None, None)
+_title_index_lock = asyncio.Lock()
+
+async def get_title_index():
+    global _title_index
+    response_cache.check_external()
+    async with _title_index_lock:
+        version = response_cache.version
+        if _title_index[0] != version:
+            started = perf_counter()
+            rows = await fetch_all(select(Movie.id, Movie.title, Movie.search_key, Movie.poster_url))
+            index = await run_in_threadpool(TitleIndex, rows)
+            _title_index = (version, index)
+            logger.info(f"Built title index of {len(index)} movies in {perf_counter() - started:.2f}s")
+        return _title_index[1]
+
+@app.get("/api/search", response_model=List[SearchResultSchema], dependencies=[Depends(get_api_key)])
+async def search_movies(
+    request: Request,
+    q: str = Query(..., min_length=1, description="Title or part of it; accents and case are ignored"),
+    limit: int = Query(20, ge=1, le=100),
+    fuzzy: bool = Query(True, description="Also return titles with typos or missing letters"),
 ):
     """
-    Trigger manual scrape. Protected by API Key.
+    Movie titles matching `q`, best first: exact title, title prefix, titles
+    containing every word (as word prefixes), then similar words (fuzzy).
     """
-    background_tasks.add_task(scrape_all)
-    return {"message": "Scraping triggered in background"}
+    async def build():
+        index = await get_title_index()
+        results = [
+            {"id": movie_id, "title": title, "poster_url": poster_url, "score": round(score, 3), "match": match}
+            for (movie_id, title, poster_url), score, match in index.search(q, limit, fuzzy)
+        ]
+        return search_result_list_adapter.dump_json(search_result_list_adapter.validate_python(results)), {}
+
+    return await cached_json_response(request, request_cache_key(request), build)
+
+def archive_statement(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    cinema: Optional[List[str]] = None,
+    title: Optional[str] = None,
+    after=None,
+):
+    """One page of archived showtimes in (start_time, id) order, after the keyset `after`."""
+    stmt = select(ArchivedShowtime.id, *(getattr(ArchivedShowtime, f) for f in ARCHIVE_FIELDS))
+    if date_from:
+        stmt = stmt.where(ArchivedShowtime.start_time >= datetime.combine(date_from, time.min))
+    if date_to:
+        stmt = stmt.where(ArchivedShowtime.start_time < datetime.combine(date_to + timedelta(days=1), time.min))
+    if cinema:
+        stmt = stmt.where(ArchivedShowtime.cinema_name.in_(cinema))
+    if title:
+        stmt = stmt.where(ArchivedShowtime.movie_title.ilike(f"%{title}%"))
+    if after:
+        stmt = stmt.where(tuple_(ArchivedShowtime.start_time, ArchivedShowtime.id) > after)
+    return stmt.order_by(ArchivedShowtime.start_time, ArchivedShowtime.id).limit(ARCHIVE_PAGE_SIZE)
+
+def format_archive_page(rows, fmt):
+    if fmt == "csv":
+        out = io.StringIO()
+        csv.writer(out).writerows(rows)
+        return out.getvalue().encode()
+    return "".join(
+        json.dumps(dict(row._mapping, start_time=row.start_time.isoformat()), ensure_ascii=False) + "\n"
+        for row in rows
+    ).encode()
+
+@app.get("/api/archive", dependencies=[Depends(get_api_key)])
+async def get_archive(
+    date_from: Optional[date] = Query(None, description="First day (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Last day (YYYY-MM-DD), inclusive"),
+    cinema: Optional[List[str]] = Query(None, description="Cinema name, may be repeated"),
+    title: Optional[str] = Query(None, description="Case-insensitive title substring"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="ndjson (one object per line) or csv"),
+):
+    """
+    Showtimes of past days (moved out of the live table by the scraper), in
+    start time order. Streamed: rows are read ARCHIVE_PAGE_SIZE at a time by
+    keyset on (start_time, id) and sent as they are read, so any range can
+    be exported without holding it in memory.
+    """
+    async def stream():
+        if format == "csv":
+            out = io.StringIO()
+            csv.writer(out).writerow(("id",) + ARCHIVE_FIELDS)
+            yield out.getvalue().encode()
+        after = None
+        while True:
+            rows = await fetch_all(archive_statement(date_from, date_to, cinema, title, after))
+            if rows:
+                yield format_archive_page(rows, format)
+            if len(rows) < ARCHIVE_PAGE_SIZE:
+                return
+            after = (rows[-1].start_time, rows[-1].id)
+
+    if format == "csv":
+        return StreamingResponse(
+            stream(), media_type="text/csv; charset=utf-8",
+            headers={"Content-Disposition": 'attachment; filename="showtime_archive.csv"'},
+        )
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+# Image URLs name their content, so clients may keep them forever
+IMAGE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+@app.get("/api/images/{digest}.webp", dependencies=[Depends(get_api_key)])
+async def get_image(digest: str):
+    """A cached poster or age rating thumbnail (see poster_image / age_restriction_image)."""
+    path = await run_in_threadpool(cached_image_path, digest)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": IMAGE_CACHE_CONTROL})
+
+@app.post("/api/scrape", response_model=ScrapeTriggerSchema, dependencies=[Depends(get_api_key)])
+async def trigger_scrape():
+    """
+    Queue a manual scrape for the worker. Protected by API Key.
+    While a scrape is queued or running, the existing job is returned instead;
+    while only some cinemas are being scraped, a full scrape is queued to follow.
+    """
+    job_id, created = await run_in_threadpool(enqueue_scrape, "api")
+    return ScrapeTriggerSchema(
+        message="Scraping queued" if created else "Scraping already queued or running",
+        job_id=job_id,
+        deduplicated=not created,
+    )
+
+@app.get("/api/scrape/jobs", response_model=List[ScrapeJobSchema], dependencies=[Depends(get_api_key)])
+async def list_scrape_jobs(limit: int = Query(10, ge=1, le=100)):
+    """Most recent scrape jobs, newest first."""
+    jobs = await fetch_all(select(ScrapeJob).order_by(ScrapeJob.id.desc()).limit(limit), scalars=True)
+    return [job_to_dict(job) for job in jobs]
+
+@app.get("/api/scrape/jobs/{job_id}", response_model=ScrapeJobSchema, dependencies=[Depends(get_api_key)])
+async def get_scrape_job(job_id: int):
+    """Status of one scrape job with per-cinema progress."""
+    jobs = await fetch_all(select(ScrapeJob).where(ScrapeJob.id == job_id), scalars=True)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_to_dict(jobs[0])
 
 @app.get("/api/status", response_model=StatusSchema, dependencies=[Depends(get_api_key)])
-def get_status(db: Session = Depends(get_db)):
-    last_scrape = db.query(AppSettings).filter(AppSettings.key == "last_scrape_time").first()
-    return {
-        "last_scrape_time": datetime.fromisoformat(last_scrape.value) if last_scrape else None
-    }
+async def get_status(runs: int = Query(5, ge=0, le=50, description="Number of recent scrape runs")):
+    """
+    Last successful scrape time and the most recent scrape runs with their metrics.
+    Not served from the response cache: a running job updates its progress
+    without bumping the data version.
+    """
+    values = await fetch_all(
+        select(AppSettings.value).where(AppSettings.key == "last_scrape_time"), scalars=True
+    )
+    jobs = []
+    if runs:
+        jobs = await fetch_all(select(ScrapeJob).order_by(ScrapeJob.id.desc()).limit(runs), scalars=True)
+    return StatusSchema(
+        last_scrape_time=datetime.fromisoformat(values[0]) if values else None,
+        runs=[job_to_dict(job) for job in jobs],
+    )
+
+# Change stream: how often the data version is checked, the interval of
+# keep-alive comments (so proxies keep idle streams open) and the client's
+# reconnect delay
+EVENT_POLL_SECONDS = 1.0
+EVENT_KEEPALIVE_SECONDS = 15.0
+EVENT_RETRY_MS = 5000
+
+# Notified by watch_data_version() on every data change, for all open streams
+_version_changed: Optional[asyncio.Condition] = None
+_version_watcher: Optional[asyncio.Task] = None
+
+async def watch_data_version():
+    """One poller per process for the streams: bumps may come from the worker or other API processes."""
+    version = response_cache.version
+    while True:
+        await asyncio.sleep(EVENT_POLL_SECONDS)
+        response_cache.check_external()
+        if response_cache.version != version:
+            version = response_cache.version
+            async with _version_changed:
+                _version_changed.notify_all()
+
+async def wait_for_change(seen, timeout):
+    """
+    Wait until the data version differs from `seen` (the version the caller
+    last read its data at, so a change in between is not missed); returns
+    False if `timeout` passed first.
+    """
+    global _version_changed, _version_watcher
+    if _version_watcher is None or _version_watcher.done():
+        _version_changed = _version_changed or asyncio.Condition()
+        _version_watcher = asyncio.create_task(watch_data_version())
+    async with _version_changed:
+        try:
+            await asyncio.wait_for(_version_changed.wait_for(lambda: response_cache.version != seen), timeout)
+        except asyncio.TimeoutError:
+            return False
+    return True
+
+@app.get("/api/events", dependencies=[Depends(get_api_key)])
+async def stream_events(
+    request: Request,
+    since: Optional[int] = Query(None, description="Last event id seen; defaults to the Last-Event-ID header"),
+):
+    """
+    Server-Sent Events stream of data changes, replacing /api/status polling.
+    A new stream starts with a `ready` event carrying the latest event id.
+    Then, as changes commit:
+      showtimes  {inserted, updated, deleted, movies, cinema}: showtime ids
+                 (fetch them with /api/movies?id=...) and ids of movies
+                 whose metadata changed
+      movies     {movies}: movies linked to new thumbnails
+      favorites  {added} / {removed} titles, or {pruned} after a scrape
+    Any payload may be {"reset": true} (too many ids): reload everything.
+    Reconnecting with Last-Event-ID (or `since`) resumes after that event,
+    or sends a `reset` event if it is too old.
+    """
+    last_event_id = request.headers.get("last-event-id", "")
+    if since is None and last_event_id.isdigit():
+        since = int(last_event_id)
+
+    async def stream():
+        oldest, latest = (await fetch_all(latest_event_statement()))[0]
+        latest = latest or 0
+        yield f"retry: {EVENT_RETRY_MS}\n\n"
+        if since is None:
+            yield format_event(latest, "ready", {"id": latest})
+            last = latest
+        elif since > latest or (oldest is not None and since < oldest - 1):
+            # Events after `since` were dropped (or the database was replaced)
+            yield format_event(latest, "reset", {"reset": True})
+            last = latest
+        else:
+            last = since
+
+        while not await request.is_disconnected():
+            seen = response_cache.version
+            events = await fetch_all(events_after_statement(last), scalars=True)
+            for event in events:
+                yield format_event(event.id, event.kind, event.payload)
+                last = event.id
+            if events:
+                continue
+            if not await wait_for_change(seen, EVENT_KEEPALIVE_SECONDS):
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/api/metrics", dependencies=[Depends(get_api_key)])
+async def get_metrics():
+    """
+    Prometheus text exposition: API request latency of this process, and
+    the scrape pipeline metrics of the last finished run (from the job table).
+    """
+    finished = await fetch_all(
+        select(ScrapeJob).where(ScrapeJob.status.in_(("done", "failed"))).order_by(ScrapeJob.id.desc()).limit(1),
+        scalars=True,
+    )
+    runs_by_status = dict(await fetch_all(select(ScrapeJob.status, func.count()).group_by(ScrapeJob.status)))
+    showtime_count = (await fetch_all(select(func.count()).select_from(Showtime)))[0][0]
+    body = metrics.render(
+        metrics.request_latency.render(),
+        metrics.gauge("whattocinema_response_cache_entries", "Cached API responses.", [([], len(response_cache))]),
+        metrics.render_scrape_metrics(
+            job_to_dict(finished[0]) if finished else None, runs_by_status, showtime_count
+        ),
+    )
+    return Response(content=body, media_type="text/plain; version=0.0.4; charset=utf-8")
 
 @app.get("/api/favorites", response_model=List[FavoriteSchema], dependencies=[Depends(get_api_key)])
-def get_favorites(db: Session = Depends(get_db)):
-    return db.query(Favorite).all()
+async def get_favorites(request: Request):
+    async def build():
+        rows = await fetch_all(select(Favorite.movie_title, Favorite.created_at))
+        favorites = favorite_list_adapter.validate_python(rows, from_attributes=True)
+        return favorite_list_adapter.dump_json(favorites), {}
+
+    return await cached_json_response(request, request_cache_key(request), build)
+
+def _refresh_summary_sync():
+    """Favorites are part of the date summary, so recompute it after a change."""
+    with SessionLocal() as db:
+        refresh_date_summaries(db)
+        db.commit()
+
+async def find_favorite(movie_title: str):
+    rows = await fetch_all(
+        select(Favorite.movie_title, Favorite.created_at).where(Favorite.movie_title == movie_title)
+    )
+    return FavoriteSchema.model_validate(rows[0], from_attributes=True) if rows else None
 
 @app.post("/api/favorites", dependencies=[Depends(get_api_key)])
-def add_favorite(fav: FavoriteCreate, db: Session = Depends(get_db)):
-    existing = db.query(Favorite).filter(Favorite.movie_title == fav.movie_title).first()
+async def add_favorite(fav: FavoriteCreate):
+    existing = await find_favorite(fav.movie_title)
     if existing:
         return existing
-    
-    new_fav = Favorite(movie_title=fav.movie_title)
-    db.add(new_fav)
-    db.commit()
-    db.refresh(new_fav)
-    return new_fav
+
+    await execute_write(
+        insert(Favorite).values(movie_title=fav.movie_title),
+        *change_statements("favorites", added=[fav.movie_title]),
+    )
+    await run_in_threadpool(_refresh_summary_sync)
+    bump_data_version()
+    return await find_favorite(fav.movie_title)
 
 @app.delete("/api/favorites/{movie_title}", dependencies=[Depends(get_api_key)])
-def remove_favorite(movie_title: str, db: Session = Depends(get_db)):
-    db.query(Favorite).filter(Favorite.movie_title == movie_title).delete()
-    db.commit()
+async def remove_favorite(movie_title: str):
+    exists = select(Favorite.movie_title).where(Favorite.movie_title == movie_title).exists()
+    await execute_write(
+        # Recorded only if there is a favorite to delete
+        *change_statements("favorites", when=exists, removed=[movie_title]),
+        delete(Favorite).where(Favorite.movie_title == movie_title),
+    )
+    await run_in_threadpool(_refresh_summary_sync)
+    bump_data_version()
     return {"message": "Favorite removed"}
 
 if __name__ == "__main__":
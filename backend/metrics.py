@@ -0,0 +1,156 @@
+import bisect
+import threading
+
+# Request latency buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Per-cinema scrape metrics exported from the last finished run: (metric, progress key, help)
+CINEMA_GAUGES = (
+    ("whattocinema_scrape_cinema_bytes", "bytes", "Page size downloaded in the last run."),
+    ("whattocinema_scrape_cinema_showtimes", "showtimes", "Showtimes parsed in the last run."),
+    ("whattocinema_scrape_cinema_errors", "errors", "Fetch, parse or sync errors in the last run."),
+)
+PHASES = ("fetch", "parse", "sync", "prune")
+ROW_CHANGES = ("inserted", "updated", "deleted")
+DETAIL_OUTCOMES = ("hit", "revalidated", "fetched", "failed")  # see details.OUTCOMES
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Histogram:
+    """Minimal thread-safe Prometheus histogram keyed by a tuple of label values."""
+
+    def __init__(self, name, help, label_names, buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self._series[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((k, list(v)) for k, v in self._series.items())
+        for label_values, counts in series:
+            labels = list(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{format_labels(labels + [('le', bound)])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(labels)} {counts[-1]}")
+            lines.append(f"{self.name}_count{format_labels(labels)} {cumulative}")
+        return lines
+
+
+request_latency = Histogram(
+    "whattocinema_http_request_duration_seconds",
+    "API request latency (this process).",
+    ("method", "route", "status"),
+)
+
+
+def gauge(name, help, samples, type="gauge"):
+    """Render a metric family from [(labels, value)] samples."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {type}"]
+    lines.extend(f"{name}{format_labels(labels)} {value}" for labels, value in samples)
+    return lines
+
+
+def render_scrape_metrics(last_run, runs_by_status, showtime_count):
+    """
+    Prometheus lines for the scrape pipeline. `last_run` is job_to_dict() of
+    the last finished scrape job (or None), `runs_by_status` maps job status
+    to a count.
+    """
+    lines = gauge(
+        "whattocinema_scrape_runs_total", "Scrape jobs by final status.",
+        [([("status", status)], count) for status, count in sorted(runs_by_status.items())],
+        type="counter",
+    )
+    lines += gauge("whattocinema_showtimes", "Showtimes currently stored.", [([], showtime_count)])
+    if last_run is None:
+        return lines
+
+    stats = last_run["stats"]
+    finished = last_run["finished_at"]
+    lines += gauge(
+        "whattocinema_scrape_last_run_success", "1 if the last finished scrape succeeded.",
+        [([], int(last_run["status"] == "done"))],
+    )
+    if finished is not None:
+        lines += gauge(
+            "whattocinema_scrape_last_run_timestamp_seconds", "When the last scrape finished (Unix time).",
+            [([], finished.timestamp())],
+        )
+    if stats:
+        lines += gauge(
+            "whattocinema_scrape_last_run_duration_seconds", "Wall-clock duration of the last scrape.",
+            [([], stats.get("duration_seconds", 0))],
+        )
+        lines += gauge(
+            "whattocinema_scrape_last_run_phase_seconds",
+            "Time spent per phase in the last scrape, summed over cinemas.",
+            [([("phase", phase)], stats.get(f"{phase}_seconds", 0)) for phase in PHASES],
+        )
+        lines += gauge(
+            "whattocinema_scrape_last_run_rows", "Showtime rows changed by the last scrape.",
+            [([("change", change)], stats.get(change, 0)) for change in ROW_CHANGES],
+        )
+        if "details_hit_rate" in stats:
+            lines += gauge(
+                "whattocinema_scrape_last_run_details", "Movie detail pages by cache outcome in the last scrape.",
+                [([("outcome", outcome)], stats.get(f"details_{outcome}", 0)) for outcome in DETAIL_OUTCOMES],
+            )
+            lines += gauge(
+                "whattocinema_scrape_last_run_details_hit_ratio",
+                "Share of movie detail pages served from the cache or revalidated in the last scrape.",
+                [([], stats["details_hit_rate"])],
+            )
+            lines += gauge(
+                "whattocinema_scrape_last_run_details_seconds", "Time spent fetching movie details in the last scrape.",
+                [([], stats.get("details_seconds", 0))],
+            )
+
+    cinemas = [
+        (cinema.get("cinema_name") or url, cinema)
+        for url, cinema in sorted(last_run["progress"].items())
+    ]
+    lines += gauge(
+        "whattocinema_scrape_cinema_phase_seconds", "Time spent per phase for each cinema in the last run.",
+        [
+            ([("cinema", name), ("phase", phase)], cinema[f"{phase}_seconds"])
+            for name, cinema in cinemas for phase in PHASES if f"{phase}_seconds" in cinema
+        ],
+    )
+    lines += gauge(
+        "whattocinema_scrape_cinema_rows", "Showtime rows changed for each cinema in the last run.",
+        [
+            ([("cinema", name), ("change", change)], cinema[change])
+            for name, cinema in cinemas for change in ROW_CHANGES if change in cinema
+        ],
+    )
+    for metric, key, help in CINEMA_GAUGES:
+        lines += gauge(metric, help, [([("cinema", name)], cinema.get(key, 0)) for name, cinema in cinemas])
+    return lines
+
+
+def render(*groups):
+    return "\n".join(line for group in groups for line in group) + "\n"
@@ -0,0 +1,537 @@
+import os
+import re
+import logging
+import unicodedata
+from datetime import datetime, timedelta
+from bs4 import BeautifulSoup
+
+try:
+    import lxml.html
+    from lxml import etree
+except ImportError:  # lxml is optional; fall back to BeautifulSoup
+    lxml = None
+
+logger = logging.getLogger(__name__)
+
+def get_skip_keywords():
+    """Retrieve skip keywords from environment variable."""
+    keywords = os.getenv("SKIP_MOVIE_KEYWORDS", "")
+    return [k.strip().lower() for k in keywords.split(",") if k.strip()]
+
+# Subtitle notes appended to titles by some cinemas
+TITLE_SUFFIXES = (
+    "- Original language with Hungarian subtitles",
+    "- With english subtitles",
+    "(original language with Hungarian subtitles)",
+)
+
+_TITLE_SUFFIX_RE = re.compile("|".join(re.escape(suffix) for suffix in TITLE_SUFFIXES))
+_SPACES_RE = re.compile(r"\s+")
+_WORD_RE = re.compile(r"\w+")
+
+def clean_movie_title(title):
+    """
+    Clean movie title by removing specific phrases and normalizing whitespace.
+    """
+    return _SPACES_RE.sub(" ", _TITLE_SUFFIX_RE.sub("", title)).strip()
+
+def fold_title(title):
+    """
+    Search key of a title: subtitle suffixes removed, lowercased, accents
+    folded (á -> a, ő -> o) and punctuation collapsed to single spaces.
+    """
+    decomposed = unicodedata.normalize("NFKD", clean_movie_title(title).casefold())
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_WORD_RE.findall(folded))
+
+# Showtime type codes (the span.type letter) -> details type
+DETAILS_TYPES = {"M": "magyar nyelvű", "F": "feliratos", "E": "eredeti nyelvű"}
+
+def get_details_type(type_text):
+    """Normalize detail type (e.g. M -> Hungarian, F -> Subtitled)."""
+    if not type_text:
+        return 'szinkronizált'
+    return DETAILS_TYPES.get(type_text.strip().upper(), 'szinkronizált')
+
+HU_MONTHS = {
+    "január": 1, "február": 2, "március": 3, "április": 4, "május": 5, "június": 6,
+    "július": 7, "augusztus": 8, "szeptember": 9, "október": 10, "november": 11, "december": 12
+}
+
+# Age rating image ids (ages/<id>.png) -> rating label
+AGE_MAP = {
+    "1": "KN", "2": "6", "3": "12", "4": "16", "5": "18", "6": "X",
+    "7": "?", "8": "KN", "9": "6", "10": "12", "11": "16", "12": "18", "13": "X"
+}
+
+AGE_SRC_RE = re.compile(r'ages/(\d+)')
+
+SHOWTIME_FIELDS = (
+    "cinema_name", "movie_title", "start_time", "date_str", "ticket_url", "movie_url",
+    "poster_url", "genre", "age_restriction", "details_type", "age_restriction_url",
+)
+
+class ScrapedShowtime:
+    """
+    One parsed showtime as a flat record, the shape the API exposes.
+    Plain object rather than an ORM instance; sync.py maps it onto the
+    normalized cinemas/movies/showtimes tables.
+    """
+
+    __slots__ = SHOWTIME_FIELDS
+
+    # Spelled out rather than a setattr loop: one is built per showtime
+    def __init__(self, cinema_name=None, movie_title=None, start_time=None, date_str=None, ticket_url=None,
+                 movie_url=None, poster_url=None, genre=None, age_restriction=None, details_type=None,
+                 age_restriction_url=None):
+        self.cinema_name = cinema_name
+        self.movie_title = movie_title
+        self.start_time = start_time
+        self.date_str = date_str
+        self.ticket_url = ticket_url
+        self.movie_url = movie_url
+        self.poster_url = poster_url
+        self.genre = genre
+        self.age_restriction = age_restriction
+        self.details_type = details_type
+        self.age_restriction_url = age_restriction_url
+
+# --- Shared field helpers (identical output for every backend) ---
+
+def absolute_url(url, path):
+    """Join a site-relative path onto the cinema URL."""
+    return f"{url.rstrip('/')}/{path.lstrip('/')}"
+
+def parse_day_label(label, today=None):
+    """
+    Convert a day header ("február 23.", "Ma", "Holnap") to YYYY-MM-DD.
+    Relative labels and the year are resolved against `today` (default:
+    the current date). Returns None when the label cannot be interpreted.
+    """
+    d_text = label.strip().replace('.', '')
+    now = datetime.combine(today, datetime.min.time()) if today else datetime.now()
+
+    if d_text.lower() == "ma":
+        return now.strftime("%Y-%m-%d")
+    if d_text.lower() == "holnap":
+        return (now + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    # Regular date: "február 23"
+    parts = d_text.split()
+    if len(parts) < 2:
+        return None
+    try:
+        day_num = int(parts[1])
+    except ValueError:
+        return None
+    month = HU_MONTHS.get(parts[0].lower(), now.month)
+
+    # Assume current year, handle year rollover if needed
+    year = now.year
+    if month < now.month and (now.month - month) > 6:
+        year += 1
+    return f"{year}-{month:02d}-{day_num:02d}"
+
+def parse_age(src, url):
+    """Return (age_restriction, age_restriction_url) for an age rating image src."""
+    if not src or "ages" not in src:
+        return None, None
+    match = AGE_SRC_RE.search(src)
+    if not match:
+        return None, None
+    age_id = match.group(1)
+    age_url = src if src.startswith("http") else absolute_url(url, src)
+    return AGE_MAP.get(age_id, age_id), age_url
+
+def parse_start_time(date_str_fmt, start_time_str):
+    """Combine YYYY-MM-DD and HH:MM into a datetime; raises ValueError if invalid."""
+    if (len(start_time_str) == 5 and start_time_str[2] == ":" and start_time_str.isascii()
+            and start_time_str[:2].isdigit() and start_time_str[3:].isdigit()):
+        try:
+            return datetime(int(date_str_fmt[:4]), int(date_str_fmt[5:7]), int(date_str_fmt[8:10]),
+                            int(start_time_str[:2]), int(start_time_str[3:]))
+        except ValueError:
+            pass
+    # Anything else ("9:45", odd padding) goes through the strict parser
+    return datetime.strptime(f"{date_str_fmt} {start_time_str}", "%Y-%m-%d %H:%M")
+
+class ExtractionContext:
+    """
+    Per-scrape state of the row extraction: the skip keywords compiled into
+    one alternation (read from the environment once), and memo tables for
+    what repeats across rows and pages. Every movie is listed once per day
+    and often at several cinemas, so its fields are built once; day labels,
+    start times and type codes come from a handful of values.
+    """
+
+    def __init__(self, skip_keywords=None):
+        keywords = get_skip_keywords() if skip_keywords is None else skip_keywords
+        self.skip_re = re.compile("|".join(re.escape(k) for k in keywords)) if keywords else None
+        self._movies = {}
+        self._skipped = {}
+        self._days = {}
+        self._types = {}
+        self._start_times = {}
+
+    def day(self, label, today=None):
+        """parse_day_label, memoized per (label, today)."""
+        key = (label, today)
+        date_str = self._days.get(key)
+        if date_str is None and key not in self._days:
+            date_str = self._days[key] = parse_day_label(label, today or datetime.now().date())
+        return date_str
+
+    def movie(self, url, poster_src, raw_title, href, genres, age_src):
+        """make_movie, memoized per page URL and raw fields."""
+        key = (url, poster_src, raw_title, href, tuple(genres), age_src)
+        movie = self._movies.get(key)
+        if movie is None:
+            movie = self._movies[key] = make_movie(url, poster_src, raw_title, href, genres, age_src)
+        return movie
+
+    def is_skipped(self, movie_title):
+        skipped = self._skipped.get(movie_title)
+        if skipped is None:
+            skipped = self._skipped[movie_title] = (
+                self.skip_re is not None and self.skip_re.search(movie_title.lower()) is not None
+            )
+        return skipped
+
+    def details_type(self, type_code):
+        details_type = self._types.get(type_code)
+        if details_type is None:
+            details_type = self._types[type_code] = get_details_type(type_code)
+        return details_type
+
+    def showtime(self, cinema_name, movie, date_str_fmt, start_time_str, ticket_href, type_code, url):
+        """Build one showtime record from a movie's shared fields and a single time slot."""
+        key = (date_str_fmt, start_time_str)
+        full_start_time = self._start_times.get(key)
+        if full_start_time is None:
+            try:
+                full_start_time = self._start_times[key] = parse_start_time(date_str_fmt, start_time_str)
+            except ValueError:
+                logger.warning(f"Failed to parse time: {date_str_fmt} {start_time_str}")
+                return None
+
+        return ScrapedShowtime(
+            cinema_name=cinema_name,
+            movie_title=movie["movie_title"],
+            start_time=full_start_time,
+            date_str=date_str_fmt,
+            ticket_url=absolute_url(url, ticket_href) if ticket_href else None,
+            movie_url=movie["movie_url"],
+            poster_url=movie["poster_url"],
+            genre=movie["genre"],
+            age_restriction=movie["age_restriction"],
+            details_type=self.details_type(type_code),
+            age_restriction_url=movie["age_restriction_url"],
+        )
+
+def make_movie(url, poster_src, raw_title, href, genres, age_src):
+    """Collect the per-movie fields shared by all of its showtimes."""
+    poster_url = poster_src
+    if poster_url and not poster_url.startswith("http"):
+        poster_url = absolute_url(url, poster_url)
+    age_restriction, age_restriction_url = parse_age(age_src, url)
+    return {
+        "movie_title": clean_movie_title(raw_title) if raw_title is not None else "Unknown",
+        "movie_url": absolute_url(url, href) if href is not None else None,
+        "poster_url": poster_url,
+        "genre": ", ".join(genres) if genres else None,
+        "age_restriction": age_restriction,
+        "age_restriction_url": age_restriction_url,
+    }
+
+# --- BeautifulSoup backend (reference implementation) ---
+
+def parse_with_bs4(html, url, today=None, context=None):
+    try:
+        soup = BeautifulSoup(html, 'html.parser')
+
+        # Extract cinema name from title
+        cinema_name = soup.title.string.strip()
+        logger.info(f"Scraping {cinema_name} at {url}")
+
+    except Exception as e:
+        logger.error(f"Failed to parse {url}: {e}")
+        return
+
+    context = context or ExtractionContext()
+
+    # 1. Find the 'musorlista' tab ID
+    # <div class="swiper-slide" data-tab="8" data-date="musorlista">
+    tabs_wrapper = soup.find(id="day-tabs-wrapper")
+    if not tabs_wrapper:
+        logger.warning(f"[{cinema_name}] Could not find #day-tabs-wrapper")
+        return
+
+    target_tab_id = None
+    for slide in tabs_wrapper.find_all("div", class_="swiper-slide"):
+        if slide.get("data-date") == "musorlista":
+            target_tab_id = slide.get("data-tab")
+            break
+
+    if not target_tab_id:
+        logger.warning(f"[{cinema_name}] Could not find 'musorlista' tab")
+        return
+
+    # 2. Extract content for the target tab
+    container = soup.find("div", class_=f"tab-{target_tab_id}")
+    if not container:
+        logger.warning(f"[{cinema_name}] Could not find container for tab-{target_tab_id}")
+        return
+
+    # 3. Iterate over days in the list
+    # The structure:
+    # <div class="day-wrapper">
+    #    <div class="day"><span class="date">február 23.</span>...</div>
+    #    <table class="movie-wrapper">...</table>
+    # </div>
+    for day_block in container.find_all("div", class_="day-wrapper"):
+        date_str_fmt = None
+        date_div = day_block.find("div", class_="day")
+        if date_div:
+            date_span = date_div.find("span", class_="date")
+            if date_span:
+                date_str_fmt = context.day(date_span.text, today)
+        if not date_str_fmt:
+            continue
+
+        # Parse Movies Tables (Handle multiple wrappers in one day)
+        for movie_table in day_block.find_all("table", class_="movie-wrapper"):
+            # Iterate rows (Outer TR contains poster and info/times table)
+            for row in movie_table.find_all("tr"):
+                # Ensure it's a movie row (has poster)
+                poster_td = row.find("td", class_="poster")
+                if not poster_td:
+                    continue
+
+                try:
+                    poster_img = poster_td.find("img")
+
+                    # Info & Times are in the sibling TD -> nested table -> tr -> td.info / td.times
+                    info_td = row.find("td", class_="info")
+                    if not info_td:
+                        continue
+
+                    # Title is either wrapped in an <a> or contains one
+                    raw_title = None
+                    href = None
+                    title_div = info_td.find("div", class_="title")
+                    if title_div:
+                        raw_title = title_div.text.strip()
+                        link = title_div.find_parent("a") or title_div.find("a")
+                        if link and link.has_attr("href"):
+                            href = link["href"]
+
+                    genres = []
+                    age_src = None
+                    meta_div = info_td.find("div", class_="meta")
+                    if meta_div:
+                        for genre_div in meta_div.find_all("div", class_="genre"):
+                            genres.append(genre_div.text.strip())
+                        age_img = meta_div.find("img")
+                        if age_img:
+                            age_src = age_img.get("src", "")
+
+                    movie = context.movie(url, poster_img.get("src") if poster_img else None,
+                                          raw_title, href, genres, age_src)
+
+                    # Filter by keywords
+                    if context.is_skipped(movie["movie_title"]):
+                        continue
+
+                    # Showtimes
+                    times_td = row.find("td", class_="times")
+                    if not times_td:
+                        continue
+                    for time_div in times_td.find_all("div", class_="movie-time"):
+                        a_tag = time_div.find("a")
+                        if not a_tag:
+                            continue
+                        time_span = a_tag.find("span", class_="time")
+                        type_span = a_tag.find("span", class_="type")
+                        st = context.showtime(
+                            cinema_name, movie, date_str_fmt,
+                            time_span.text.strip() if time_span else "",
+                            a_tag.get("href"),
+                            type_span.text.strip() if type_span else None,
+                            url,
+                        )
+                        if st is not None:
+                            yield st
+
+                except Exception as e:
+                    logger.error(f"Error parsing movie row in musorlista: {e}")
+                    continue
+
+        # Done with this day; free its subtree before walking the next one
+        day_block.decompose()
+
+# --- lxml backend (compiled XPath) ---
+
+def _has_class(name):
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+if lxml is not None:
+    _X_TITLE = etree.XPath("//title")
+    _X_TAB_SLIDES = etree.XPath(f"(//*[@id='day-tabs-wrapper'])[1]//div[{_has_class('swiper-slide')}]")
+    _X_HAS_TABS = etree.XPath("boolean(//*[@id='day-tabs-wrapper'])")
+    _X_DAY_BLOCKS = etree.XPath(f".//div[{_has_class('day-wrapper')}]")
+    _X_DATE_SPAN = etree.XPath(f"(.//div[{_has_class('day')}])[1]//span[{_has_class('date')}]")
+    _X_MOVIE_TABLES = etree.XPath(f".//table[{_has_class('movie-wrapper')}]")
+    _X_ROWS = etree.XPath(".//tr")
+    _X_POSTER_TD = etree.XPath(f"(.//td[{_has_class('poster')}])[1]")
+    _X_FIRST_IMG = etree.XPath("(.//img)[1]")
+    _X_INFO_TD = etree.XPath(f"(.//td[{_has_class('info')}])[1]")
+    _X_TITLE_DIV = etree.XPath(f"(.//div[{_has_class('title')}])[1]")
+    _X_PARENT_A = etree.XPath("ancestor::a[1]")
+    _X_CHILD_A = etree.XPath("(.//a)[1]")
+    _X_META_DIV = etree.XPath(f"(.//div[{_has_class('meta')}])[1]")
+    _X_GENRES = etree.XPath(f".//div[{_has_class('genre')}]")
+    _X_TIMES_TD = etree.XPath(f"(.//td[{_has_class('times')}])[1]")
+    _X_MOVIE_TIMES = etree.XPath(f".//div[{_has_class('movie-time')}]")
+    _X_FIRST_A = etree.XPath("(.//a)[1]")
+    _X_TIME_SPAN = etree.XPath(f"(.//span[{_has_class('time')}])[1]")
+    _X_TYPE_SPAN = etree.XPath(f"(.//span[{_has_class('type')}])[1]")
+
+def _first(xpath, node):
+    found = xpath(node)
+    return found[0] if found else None
+
+def _text(node):
+    return node.text_content()
+
+def parse_with_lxml(html, url, today=None, context=None):
+    try:
+        root = lxml.html.document_fromstring(html)
+
+        # Extract cinema name from title
+        cinema_name = _text(_X_TITLE(root)[0]).strip()
+        logger.info(f"Scraping {cinema_name} at {url}")
+
+    except Exception as e:
+        logger.error(f"Failed to parse {url}: {e}")
+        return
+
+    context = context or ExtractionContext()
+
+    # 1. Find the 'musorlista' tab ID
+    if not _X_HAS_TABS(root):
+        logger.warning(f"[{cinema_name}] Could not find #day-tabs-wrapper")
+        return
+
+    target_tab_id = None
+    for slide in _X_TAB_SLIDES(root):
+        if slide.get("data-date") == "musorlista":
+            target_tab_id = slide.get("data-tab")
+            break
+
+    if not target_tab_id:
+        logger.warning(f"[{cinema_name}] Could not find 'musorlista' tab")
+        return
+
+    # 2. Extract content for the target tab
+    container = _first(etree.XPath(f"(//div[{_has_class(f'tab-{target_tab_id}')}])[1]"), root)
+    if container is None:
+        logger.warning(f"[{cinema_name}] Could not find container for tab-{target_tab_id}")
+        return
+
+    # 3. Iterate over days in the list
+    for day_block in _X_DAY_BLOCKS(container):
+        date_span = _first(_X_DATE_SPAN, day_block)
+        date_str_fmt = context.day(_text(date_span), today) if date_span is not None else None
+        if not date_str_fmt:
+            continue
+
+        for movie_table in _X_MOVIE_TABLES(day_block):
+            for row in _X_ROWS(movie_table):
+                poster_td = _first(_X_POSTER_TD, row)
+                if poster_td is None:
+                    continue
+
+                try:
+                    poster_img = _first(_X_FIRST_IMG, poster_td)
+
+                    info_td = _first(_X_INFO_TD, row)
+                    if info_td is None:
+                        continue
+
+                    raw_title = None
+                    href = None
+                    title_div = _first(_X_TITLE_DIV, info_td)
+                    if title_div is not None:
+                        raw_title = _text(title_div).strip()
+                        link = _first(_X_PARENT_A, title_div)
+                        if link is None:
+                            link = _first(_X_CHILD_A, title_div)
+                        if link is not None and link.get("href") is not None:
+                            href = link.get("href")
+
+                    genres = []
+                    age_src = None
+                    meta_div = _first(_X_META_DIV, info_td)
+                    if meta_div is not None:
+                        genres = [_text(g).strip() for g in _X_GENRES(meta_div)]
+                        age_img = _first(_X_FIRST_IMG, meta_div)
+                        if age_img is not None:
+                            age_src = age_img.get("src", "")
+
+                    movie = context.movie(url, poster_img.get("src") if poster_img is not None else None,
+                                          raw_title, href, genres, age_src)
+
+                    if context.is_skipped(movie["movie_title"]):
+                        continue
+
+                    times_td = _first(_X_TIMES_TD, row)
+                    if times_td is None:
+                        continue
+                    for time_div in _X_MOVIE_TIMES(times_td):
+                        a_tag = _first(_X_FIRST_A, time_div)
+                        if a_tag is None:
+                            continue
+                        time_span = _first(_X_TIME_SPAN, a_tag)
+                        type_span = _first(_X_TYPE_SPAN, a_tag)
+                        st = context.showtime(
+                            cinema_name, movie, date_str_fmt,
+                            _text(time_span).strip() if time_span is not None else "",
+                            a_tag.get("href"),
+                            _text(type_span).strip() if type_span is not None else None,
+                            url,
+                        )
+                        if st is not None:
+                            yield st
+
+                except Exception as e:
+                    logger.error(f"Error parsing movie row in musorlista: {e}")
+                    continue
+
+        # Done with this day; free its subtree before walking the next one
+        day_block.clear()
+
+PARSER_BACKENDS = {"bs4": parse_with_bs4}
+if lxml is not None:
+    PARSER_BACKENDS["lxml"] = parse_with_lxml
+
+def get_parser_backend():
+    """Retrieve the parser backend name from SCRAPER_PARSER (default: fastest available)."""
+    name = os.getenv("SCRAPER_PARSER", "").strip().lower()
+    if name in PARSER_BACKENDS:
+        return name
+    if name:
+        logger.warning(f"Unknown or unavailable parser backend '{name}', using default")
+    return "lxml" if "lxml" in PARSER_BACKENDS else "bs4"
+
+def iter_cinema_page(html, url, backend=None, today=None, context=None):
+    """
+    Lazily parse a fetched Webstyles cinema page, yielding ScrapedShowtime
+    records day by day as each day-wrapper is walked. `today` is the date
+    the page was fetched on (default: now); its day labels are relative.
+    Pass one ExtractionContext to all pages of a scrape to share its memos.
+    """
+    return PARSER_BACKENDS[backend or get_parser_backend()](html, url, today, context)
+
+def parse_cinema_page(html, url, backend=None, today=None, context=None):
+    """Parse a fetched Webstyles cinema page into a list of ScrapedShowtime records."""
+    return list(iter_cinema_page(html, url, backend, today, context))
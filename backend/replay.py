@@ -0,0 +1,290 @@
+"""
+Record and replay cinema pages, so the scraper can be run and measured
+without hitting the live sites.
+
+Recording: with SCRAPE_RECORD_DIR set, every page the scraper downloads is
+saved as <dir>/<slug>.html, and <dir>/index.json maps each URL to its file,
+validators and the date it was fetched on.
+
+Replay: ReplayServer serves a recording directory over local HTTP (with
+ETag/304 support), and SCRAPE_REPLAY_URL points the scraper at it. Pages
+are still parsed under their original URL and relative day labels ("Ma",
+"Holnap") are resolved against the recording date. Showtimes of a replay
+are never archived or pruned as past, however old the recording is.
+
+Usage (from the backend directory):
+    python replay.py DIR [--db PATH] [--repeat N] [--golden FILE [--update-golden]]
+
+Runs scrape_all against the recordings in DIR on a throwaway database (or
+--db), prints the run stats and compares the stored showtimes with a golden
+file.
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import re
+import sys
+import tempfile
+import threading
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from config import env_str
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+RECORDED_AT_HEADER = "X-Recorded-At"
+
+# Showtime columns stored in golden files, in order
+GOLDEN_FIELDS = ("cinema", "movie", "start_time", "date_str", "ticket_url", "details_type")
+
+
+def page_slug(url):
+    """Stable, filesystem-safe name for a page URL."""
+    parts = urlsplit(url.split('#')[0])
+    name = re.sub(r"[^A-Za-z0-9]+", "-", f"{parts.netloc}{parts.path}").strip("-").lower()
+    digest = hashlib.sha1(url.split('#')[0].encode("utf-8")).hexdigest()[:8]
+    return f"{name[:60]}-{digest}"
+
+
+def load_index(directory):
+    path = os.path.join(directory, INDEX_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+class PageRecorder:
+    """Saves fetched pages and their validators into a recording directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def record(self, url, response):
+        slug = page_slug(url)
+        with open(os.path.join(self.directory, f"{slug}.html"), "wb") as f:
+            f.write(response.content)
+        with self._lock:
+            index = load_index(self.directory)
+            index[url] = {
+                "file": f"{slug}.html",
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "content_type": response.headers.get("Content-Type"),
+                "recorded_at": datetime.date.today().isoformat(),
+            }
+            tmp = os.path.join(self.directory, f".{INDEX_FILE}.tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2, ensure_ascii=False)
+            os.replace(tmp, os.path.join(self.directory, INDEX_FILE))
+        logger.info(f"Recorded {url} as {slug}.html")
+
+
+_recorders = {}
+_recorders_lock = threading.Lock()
+
+
+def record_page(url, response):
+    """Save a fetched page if SCRAPE_RECORD_DIR is set."""
+    directory = env_str("SCRAPE_RECORD_DIR")
+    if not directory:
+        return
+    with _recorders_lock:
+        recorder = _recorders.get(directory)
+        if recorder is None:
+            recorder = _recorders[directory] = PageRecorder(directory)
+    try:
+        recorder.record(url, response)
+    except OSError as e:
+        logger.error(f"Failed to record {url}: {e}")
+
+
+def replaying():
+    """
+    True while the scraper fetches from a replay server (SCRAPE_REPLAY_URL).
+    Recorded pages keep the dates they were recorded on, so the scraper
+    does not treat their showtimes as past.
+    """
+    return bool(env_str("SCRAPE_REPLAY_URL"))
+
+
+def replay_url(url):
+    """URL to fetch `url` from: the replay server's copy if SCRAPE_REPLAY_URL is set."""
+    base = env_str("SCRAPE_REPLAY_URL")
+    if not base:
+        return url
+    return f"{base.rstrip('/')}/{page_slug(url)}"
+
+
+def recorded_date(response):
+    """Date a replayed page was recorded on, or None for live responses."""
+    value = response.headers.get(RECORDED_AT_HEADER)
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+class ReplayServer:
+    """
+    Local HTTP stand-in for the cinema sites, serving a recording directory
+    at /<slug>. Use as a context manager; `url` is its base URL.
+    """
+
+    def __init__(self, directory, host="127.0.0.1", port=0):
+        self.directory = directory
+        self.pages = {}
+        for entry in load_index(directory).values():
+            path = os.path.join(directory, entry["file"])
+            with open(path, "rb") as f:
+                body = f.read()
+            self.pages[os.path.splitext(entry["file"])[0]] = (entry, body, os.path.getmtime(path))
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self.url = f"http://{host}:{self.server.server_address[1]}"
+        self._thread = None
+
+    def _handler(self):
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                page = pages.get(self.path.strip("/"))
+                if page is None:
+                    self.send_error(404)
+                    return
+                entry, body, mtime = page
+                etag = entry.get("etag") or '"' + hashlib.sha1(body).hexdigest() + '"'
+                last_modified = entry.get("last_modified") or formatdate(mtime, usegmt=True)
+                not_modified = (
+                    self.headers.get("If-None-Match") == etag
+                    or (not self.headers.get("If-None-Match")
+                        and self.headers.get("If-Modified-Since") == last_modified)
+                )
+                self.send_response(304 if not_modified else 200)
+                self.send_header("ETag", etag)
+                self.send_header("Last-Modified", last_modified)
+                self.send_header(RECORDED_AT_HEADER, entry.get("recorded_at", ""))
+                if not_modified:
+                    self.end_headers()
+                    return
+                self.send_header("Content-Type", entry.get("content_type") or "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, name="replay", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def stored_showtimes():
+    """The showtimes in the database as sorted GOLDEN_FIELDS lists."""
+    from database import SessionLocal, Showtime
+
+    with SessionLocal() as db:
+        rows = [
+            [
+                st.cinema.name, st.movie.title, st.start_time.isoformat() if st.start_time else None,
+                st.date_str, st.ticket_url, st.details_type,
+            ]
+            for st in db.query(Showtime).all()
+        ]
+    return sorted(rows, key=lambda row: [value or "" for value in row])
+
+
+def compare_golden(path, showtimes):
+    """Return (missing, unexpected) showtimes compared to the golden file."""
+    with open(path, encoding="utf-8") as f:
+        golden = {tuple(row) for row in json.load(f)["showtimes"]}
+    found = {tuple(row) for row in showtimes}
+    return sorted(golden - found, key=str), sorted(found - golden, key=str)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("directory", help="recording directory (with index.json)")
+    parser.add_argument("--db", help="SQLite file to scrape into (default: a throwaway database)")
+    parser.add_argument("--repeat", type=int, default=1, help="scrape this many times (later runs hit 304s)")
+    parser.add_argument("--golden", help="JSON file with the expected showtimes")
+    parser.add_argument("--update-golden", action="store_true", help="write the stored showtimes to --golden")
+    args = parser.parse_args()
+
+    index = load_index(args.directory)
+    if not index:
+        sys.exit(f"No recordings found in {args.directory}")
+
+    with tempfile.TemporaryDirectory() as tmp, ReplayServer(args.directory) as server:
+        # The database and scraper modules read their settings on import
+        os.environ.update(
+            MOVIE_THEATER_URLS=",".join(index),
+            SCRAPE_REPLAY_URL=server.url,
+            SCRAPE_RECORD_DIR="",
+            IMAGE_CACHE_MAX_MB="0",  # images would come from the live sites
+            MOVIE_DETAILS="false",  # and so would movie pages
+            SNAPSHOTS="false",
+            DATABASE_URL=f"sqlite:///{os.path.abspath(args.db or os.path.join(tmp, 'replay.db'))}",
+            DATA_VERSION_FILE=os.path.join(tmp, "data_version"),
+        )
+        from database import init_db
+        from scraper import scrape_all
+
+        logging.basicConfig(level=logging.INFO)
+        init_db()
+        for run in range(1, args.repeat + 1):
+            totals = scrape_all()
+            if totals is None:
+                sys.exit("Replay scraped nothing")
+            print(f"run {run}: " + ", ".join(
+                f"{key}={value:.3f}" if isinstance(value, float) else f"{key}={value}"
+                for key, value in totals.items()
+            ))
+
+        showtimes = stored_showtimes()
+        print(f"{len(showtimes)} showtimes stored from {len(index)} recorded page(s)")
+        if args.golden and args.update_golden:
+            with open(args.golden, "w", encoding="utf-8") as f:
+                # One showtime per line, so golden diffs stay readable
+                f.write(json.dumps({"fields": GOLDEN_FIELDS})[:-1] + ', "showtimes": [\n')
+                f.write(",\n".join(json.dumps(row, ensure_ascii=False) for row in showtimes))
+                f.write("\n]}\n")
+            print(f"Wrote {args.golden}")
+        elif args.golden:
+            missing, unexpected = compare_golden(args.golden, showtimes)
+            for row in missing[:20]:
+                print(f"missing:    {row}")
+            for row in unexpected[:20]:
+                print(f"unexpected: {row}")
+            if missing or unexpected:
+                sys.exit(f"Golden mismatch: {len(missing)} missing, {len(unexpected)} unexpected")
+            print("Matches golden output.")
+
+
+if __name__ == "__main__":
+    main()
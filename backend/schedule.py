@@ -0,0 +1,129 @@
+"""
+Adaptive scrape scheduling.
+
+Every scrape records per cinema page whether its showtimes changed (by a
+hash of the parsed records), stayed the same or failed. Each page keeps
+its own check interval: a change divides it by SCRAPE_INTERVAL_FACTOR, an
+unchanged page multiplies it, failures back off exponentially from the
+minimum. Intervals stay between SCRAPE_INTERVAL_MIN and SCRAPE_INTERVAL_MAX
+seconds and the next check is jittered by +-SCRAPE_INTERVAL_JITTER so
+pages do not all come due at once. The worker periodically queues a scrape
+of the pages that are due.
+"""
+import datetime
+import logging
+import random
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from config import env_float, env_str
+from database import ScrapeSchedule
+
+logger = logging.getLogger(__name__)
+
+SCHEDULE_MODES = ("adaptive", "daily")
+
+
+def get_schedule_mode():
+    """'adaptive' (default): scrape pages as they come due; 'daily': everything at 7:00."""
+    mode = env_str("SCRAPE_SCHEDULE", "adaptive").lower()
+    return mode if mode in SCHEDULE_MODES else "adaptive"
+
+
+def get_schedule_settings():
+    """Retrieve the adaptive scheduling policy from environment variables."""
+    min_interval = max(300.0, env_float("SCRAPE_INTERVAL_MIN", 3600))
+    return {
+        "min_interval": min_interval,
+        "max_interval": max(min_interval, env_float("SCRAPE_INTERVAL_MAX", 86400)),
+        "initial_interval": env_float("SCRAPE_INTERVAL_INITIAL", 14400),
+        "factor": max(1.0, env_float("SCRAPE_INTERVAL_FACTOR", 1.5)),
+        "jitter": min(0.5, max(0.0, env_float("SCRAPE_INTERVAL_JITTER", 0.1))),
+        "tick": max(10.0, env_float("SCRAPE_SCHEDULE_TICK", 60)),
+    }
+
+
+def next_interval(interval, outcome, failures, settings):
+    """New check interval (seconds) after a check with outcome new/changed/unchanged/failed."""
+    interval = interval or settings["initial_interval"]
+    if outcome == "changed":
+        interval /= settings["factor"]
+    elif outcome == "unchanged":
+        interval *= settings["factor"]
+    elif outcome == "failed":
+        interval = settings["min_interval"] * settings["factor"] ** failures
+    return min(settings["max_interval"], max(settings["min_interval"], interval))
+
+
+def jittered(now, interval, settings, rng=random):
+    """When to check next: `interval` from now, spread by the jitter, capped at the maximum."""
+    spread = interval * settings["jitter"]
+    delay = min(settings["max_interval"], interval + rng.uniform(-spread, spread))
+    return now + datetime.timedelta(seconds=delay)
+
+
+def check_outcome(status, showtimes_hash, schedule):
+    """Classify a cinema's scrape status (see scraper._report) for scheduling."""
+    if status in ("failed", "empty"):
+        return "failed"
+    if status == "unchanged":
+        return "unchanged"
+    if schedule.showtimes_hash is None:
+        return "new"  # first parse: nothing to compare with, keep the interval
+    return "unchanged" if showtimes_hash == schedule.showtimes_hash else "changed"
+
+
+def record_checks(db: Session, checks, now=None):
+    """
+    Update the schedule of every scraped page. `checks` holds (url,
+    cinema_name, status, showtimes_hash) tuples. Does not commit.
+    """
+    if not checks:
+        return
+    now = now or datetime.datetime.now()
+    settings = get_schedule_settings()
+    urls = [check[0] for check in checks]
+    schedules = {
+        schedule.url: schedule
+        for schedule in db.execute(select(ScrapeSchedule).where(ScrapeSchedule.url.in_(urls))).scalars()
+    }
+    for url, cinema_name, status, showtimes_hash in checks:
+        schedule = schedules.get(url)
+        if schedule is None:
+            schedule = schedules[url] = ScrapeSchedule(url=url, failures=0, checks=0, changes=0)
+            db.add(schedule)
+        outcome = check_outcome(status, showtimes_hash, schedule)
+
+        schedule.checks += 1
+        schedule.last_checked_at = now
+        if outcome == "failed":
+            schedule.failures += 1
+        else:
+            schedule.failures = 0
+            schedule.cinema_name = cinema_name or schedule.cinema_name
+        if outcome == "changed":
+            schedule.changes += 1
+            schedule.last_changed_at = now
+        if outcome in ("new", "changed") and showtimes_hash:
+            schedule.showtimes_hash = showtimes_hash
+        schedule.interval_seconds = round(
+            next_interval(schedule.interval_seconds, outcome, schedule.failures, settings)
+        )
+        schedule.next_check_at = jittered(now, schedule.interval_seconds, settings)
+        logger.info(
+            f"[{schedule.cinema_name or url}] {outcome}, next check in "
+            f"{(schedule.next_check_at - now).total_seconds() / 3600:.1f}h"
+        )
+
+
+def due_urls(db: Session, urls, now=None):
+    """The configured `urls` whose next check is due (or that were never scraped)."""
+    now = now or datetime.datetime.now()
+    next_checks = dict(db.execute(select(ScrapeSchedule.url, ScrapeSchedule.next_check_at)).all())
+    due = []
+    for url in urls:
+        next_check = next_checks.get(url.split('#')[0])
+        if next_check is None or next_check <= now:
+            due.append(url)
+    return due
@@ -1,12 +1,27 @@
 
 import os
 import logging
-import re
-import requests
-from bs4 import BeautifulSoup
+import time
+import hashlib
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-from database import SessionLocal, Showtime, Favorite, AppSettings, get_db
+from datetime import datetime
+from database import SessionLocal, AppSettings
+from fetcher import Fetcher, conditional_headers
+from cache import bump_data_version
+from parsers import ExtractionContext, iter_cinema_page
+from replay import record_page, replay_url, replaying, recorded_date
+from schedule import record_checks
+from images import cache_images
+from details import enrich_movies
+from snapshots import invalidate_snapshots, write_snapshots
+from sync import (
+    sync_cinema, reset_scraped_keys, upsert_batches, prune_showtimes, prune_past_showtimes, prune_favorites,
+    prune_orphans,
+    refresh_date_summaries, load_page_states, save_page_states, is_page_state_current, ShowtimeChanges,
+)
+from events import record_change, record_showtime_changes
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -20,359 +35,454 @@ def get_cinema_urls():
     urls = os.getenv("MOVIE_THEATER_URLS", "")
     return [url.strip() for url in urls.split(",") if url.strip()]
 
-def get_skip_keywords():
-    """Retrieve skip keywords from environment variable."""
-    keywords = os.getenv("SKIP_MOVIE_KEYWORDS", "")
-    return [k.strip().lower() for k in keywords.split(",") if k.strip()]
+class ScrapeResult:
+    """
+    Outcome of scraping one cinema URL.
+    `showtimes` is an iterable of ScrapedShowtime records, usually the lazy
+    parse of the page (see parse_lazily); `count` is the number of records
+    consumed so far. `showtimes_hash` fingerprints the parsed records once
+    they were all consumed, and `status` is the outcome set by _report().
+    """
 
-def clean_movie_title(title):
+    __slots__ = (
+        "url", "cinema_name", "showtimes", "count", "unchanged", "failed",
+        "etag", "last_modified", "content_hash", "showtimes_hash", "status",
+        "fetch_seconds", "parse_seconds", "bytes", "error",
+    )
+
+    def __init__(self, url, cinema_name=None, showtimes=None, unchanged=False, failed=False,
+                 etag=None, last_modified=None, content_hash=None,
+                 fetch_seconds=0.0, parse_seconds=0.0, bytes=0, error=None):
+        self.url = url
+        self.cinema_name = cinema_name
+        self.showtimes = showtimes if showtimes is not None else ()
+        self.count = 0
+        self.unchanged = unchanged
+        self.failed = failed
+        self.etag = etag
+        self.last_modified = last_modified
+        self.content_hash = content_hash
+        self.showtimes_hash = None
+        self.status = None
+        self.fetch_seconds = fetch_seconds
+        self.parse_seconds = parse_seconds
+        self.bytes = bytes
+        self.error = error
+
+def parse_lazily(result, records):
     """
-    Clean movie title by removing specific phrases and normalizing whitespace.
+    Yield parsed records while accounting parse time, record count, the
+    cinema name and the showtimes hash on `result`, so only the records in
+    flight are held in memory.
     """
-    phrases_to_remove = [
-        "- Original language with Hungarian subtitles",
-        "- With english subtitles",
-        "(original language with Hungarian subtitles)"
-    ]
-    
-    cleaned_title = title
-    for phrase in phrases_to_remove:
-        cleaned_title = cleaned_title.replace(phrase, "")
-    
-    # Replace double spaces and trim
-    cleaned_title = re.sub(r'\s+', ' ', cleaned_title).strip()
-    return cleaned_title
-
-def get_details_type(type_text):
-    """Normalize detail type (e.g. M -> Hungarian, F -> Subtitled)."""
-    if not type_text:
-        return 'szinkronizált'
-    type_text = type_text.strip().upper()
-    if type_text == 'M':
-        return 'magyar nyelvű'
-    if type_text == 'F':
-        return 'feliratos'
-    if type_text == 'E':
-        return 'eredeti nyelvű'
-    return 'szinkronizált'
-
-HU_MONTHS = {
-    "január": 1, "február": 2, "március": 3, "április": 4, "május": 5, "június": 6,
-    "július": 7, "augusztus": 8, "szeptember": 9, "október": 10, "november": 11, "december": 12
-}
-
-def scrape_cinema_site(url_base):
+    digest = hashlib.blake2b(digest_size=16)
+    while True:
+        started = time.perf_counter()
+        try:
+            st = next(records)
+        except StopIteration:
+            result.parse_seconds += time.perf_counter() - started
+            result.showtimes_hash = digest.hexdigest()
+            return
+        result.parse_seconds += time.perf_counter() - started
+        result.count += 1
+        result.cinema_name = st.cinema_name
+        digest.update(f"{st.movie_title}\x1f{st.start_time}\x1f{st.ticket_url}\x1f{st.details_type}\x1e".encode())
+        yield st
+
+def scrape_cinema_site(url_base, fetcher=None, page_state=None, context=None):
     """
     Generic scraper for Webstyles-based cinema sites.
     Updated to target 'musorlista' tab specifically.
+    Uses the shared `fetcher` pool when given, otherwise a one-off client.
+
+    The page is fetched here but parsed lazily: the result's `showtimes`
+    walks the page as it is consumed (by the sync stage).
+
+    `page_state` holds the validators stored for this URL (see PageState).
+    When the server answers 304 or the body hash matches, the page is not
+    parsed and the result is flagged as unchanged.
+
+    Pages are saved to SCRAPE_RECORD_DIR and fetched from SCRAPE_REPLAY_URL
+    when those are set (see replay.py). `context` is the scrape's shared
+    parsers.ExtractionContext.
     """
     # Clean URL
     url = url_base.split('#')[0]
-    
+
+    # Pages use relative dates ("Ma", "Holnap"), so unchanged bytes only
+    # mean unchanged showtimes on the day they were parsed.
+    if page_state and not is_page_state_current(page_state):
+        page_state = None
+
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = Fetcher()
+
+    started = time.perf_counter()
     try:
-        response = requests.get(url)
+        headers = conditional_headers(page_state) if page_state else {}
+        response = fetcher.get(replay_url(url), headers=headers)
         response.raise_for_status()
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Extract cinema name from title
-        cinema_name = soup.title.string.strip()
-        logger.info(f"Scraping {cinema_name} at {url}")
-
     except Exception as e:
         logger.error(f"Failed to fetch {url}: {e}")
-        return []
-
-    showtimes = []
-    
-    skip_keywords = get_skip_keywords()
-
-    # 1. Find the 'musorlista' tab ID
-    # <div class="swiper-slide" data-tab="8" data-date="musorlista">
-    tabs_wrapper = soup.find(id="day-tabs-wrapper")
-    if not tabs_wrapper:
-        logger.warning(f"[{cinema_name}] Could not find #day-tabs-wrapper")
-        return []
-
-    target_tab_id = None
-    for slide in tabs_wrapper.find_all("div", class_="swiper-slide"):
-        if slide.get("data-date") == "musorlista":
-            target_tab_id = slide.get("data-tab")
-            break
-            
-    if not target_tab_id:
-        logger.warning(f"[{cinema_name}] Could not find 'musorlista' tab")
-        return []
-    
-    # 2. Extract content for the target tab
-    container = soup.find("div", class_=f"tab-{target_tab_id}")
-    if not container:
-        logger.warning(f"[{cinema_name}] Could not find container for tab-{target_tab_id}")
-        return []
-
-    # 3. Iterate over days in the list
-    # The structure:
-    # <div class="day-wrapper">
-    #    <div class="day"><span class="date">február 23.</span>...</div>
-    #    <table class="movie-wrapper">...</table>
-    # </div>
-    
-    for day_block in container.find_all("div", class_="day-wrapper"):
-        # Parse Date
-        date_div = day_block.find("div", class_="day")
-        date_str_fmt = None
-        if date_div:
-            date_span = date_div.find("span", class_="date")
-            if date_span:
-                # "február 23." or "Ma" or "Holnap"
-                d_text = date_span.text.strip().replace('.', '')
-                
-                if d_text.lower() == "ma":
-                    now = datetime.now()
-                    date_str_fmt = now.strftime("%Y-%m-%d")
-                elif d_text.lower() == "holnap":
-                    now = datetime.now()
-                    tomorrow = now + timedelta(days=1)
-                    date_str_fmt = tomorrow.strftime("%Y-%m-%d")
-                else:
-                    # Regular date: "február 23"
-                    parts = d_text.split()
-                    if len(parts) >= 2:
-                        month_name = parts[0].lower()
-                        day_num = int(parts[1])
-                        month = HU_MONTHS.get(month_name, datetime.now().month)
-                        
-                        # Assume current year, handle year rollover if needed
-                        now = datetime.now()
-                        year = now.year
-                        if month < now.month and (now.month - month) > 6:
-                             year += 1
-                        
-                        date_str_fmt = f"{year}-{month:02d}-{day_num:02d}" 
-        
-        if not date_str_fmt:
-            # Fallback or skip
-            continue
+        return ScrapeResult(
+            url, cinema_name=page_state and page_state["cinema_name"], failed=True,
+            fetch_seconds=time.perf_counter() - started, error=str(e),
+        )
+    finally:
+        if own_fetcher:
+            fetcher.close()
+    fetch_time = time.perf_counter() - started
+
+    if response.status_code == 304:
+        logger.info(f"[{page_state['cinema_name']}] Not modified (304), skipping parse ({fetch_time:.2f}s)")
+        return ScrapeResult(url, cinema_name=page_state["cinema_name"], unchanged=True, fetch_seconds=fetch_time)
+
+    record_page(url, response)
+    content_hash = hashlib.sha256(response.content).hexdigest()
+    etag = response.headers.get("ETag")
+    last_modified = response.headers.get("Last-Modified")
+    if page_state and page_state["content_hash"] == content_hash:
+        logger.info(f"[{page_state['cinema_name']}] Content hash unchanged, skipping parse ({fetch_time:.2f}s)")
+        return ScrapeResult(
+            url, cinema_name=page_state["cinema_name"], unchanged=True,
+            etag=etag, last_modified=last_modified, content_hash=content_hash,
+            fetch_seconds=fetch_time, bytes=len(response.content),
+        )
+
+    logger.info(f"Fetched {url} in {fetch_time:.2f}s ({len(response.content)} bytes)")
+    result = ScrapeResult(
+        url,
+        etag=etag,
+        last_modified=last_modified,
+        content_hash=content_hash,
+        fetch_seconds=fetch_time,
+        bytes=len(response.content),
+    )
+    records = iter_cinema_page(response.text, url, today=recorded_date(response), context=context)
+    result.showtimes = parse_lazily(result, records)
+    return result
+
+def scrape_cinemas(urls, fetcher=None, page_states=None):
+    """
+    Fetch cinema sites concurrently over a shared connection pool.
+    Yields a ScrapeResult as each fetch finishes; its showtimes are parsed
+    as the caller consumes them. At most `max_workers` fetched pages wait
+    for the caller at a time, and a result is not kept once it was yielded,
+    so memory does not grow with the number of cinemas.
+    `page_states` maps URL -> stored validators for conditional fetching.
+    """
+    page_states = page_states or {}
+    if not urls:
+        return
+    context = ExtractionContext()
 
-        # Parse Movies Tables (Handle multiple wrappers in one day)
-        movie_tables = day_block.find_all("table", class_="movie-wrapper")
-        
-        for movie_table in movie_tables:
-            # Iterate rows (Outer TR contains poster and info/times table)
-            for row in movie_table.find_all("tr"):
-                # Ensure it's a movie row (has poster)
-                if not row.find("td", class_="poster"):
-                    continue
+    own_fetcher = fetcher is None
+    if own_fetcher:
+        fetcher = Fetcher()
 
+    try:
+        workers = min(fetcher.max_workers, len(urls))
+        done = queue.Queue()
+        pending = iter(urls)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape") as pool:
+            def submit_next():
+                url = next(pending, None)
+                if url is None:
+                    return 0
+                logger.info(f"Processing URL: {url}")
+                state = page_states.get(url.split('#')[0])
+                future = pool.submit(scrape_cinema_site, url, fetcher, state, context)
+                future.add_done_callback(lambda f: done.put((url, f)))
+                return 1
+
+            in_flight = sum(submit_next() for _ in range(workers))
+            while in_flight:
+                url, future = done.get()
                 try:
-                    # Poster
-                    poster_td = row.find("td", class_="poster")
-                    poster_img = poster_td.find("img")
-                    poster_url = poster_img.get("src") if poster_img else None
-                    if poster_url and not poster_url.startswith("http"):
-                         poster_url = f"{url.rstrip('/')}/{poster_url.lstrip('/')}"
-                    
-                    # Info & Times are in the sibling TD -> nested table -> tr -> td.info / td.times
-                    # We can find them recursively in the 'row'
-                    info_td = row.find("td", class_="info")
-                    if not info_td:
-                        continue
-
-                    # Title
-                    title_div = info_td.find("div", class_="title")
-                    # Title might be text inside div or inside 'a' inside div
-                    # Step 192: <div class="title">Halott ember...</div> wrapped in <a>
-                    # Or <div class="title"><a ...>...</a></div>
-                    # Let's handle both
-                    movie_title = "Unknown"
-                    movie_url = None
-                    
-                    if title_div:
-                        raw_title = title_div.text.strip()
-                        movie_title = clean_movie_title(raw_title)
-                        # Check if wrapped in A or contains A
-                        parent_a = title_div.find_parent("a")
-                        child_a = title_div.find("a")
-                        
-                        link = parent_a or child_a
-                        if link and link.has_attr("href"):
-                            href = link["href"]
-                            movie_url = f"{url.rstrip('/')}/{href.lstrip('/')}"
-                    
-                    # Filter by keywords
-                    if any(k in movie_title.lower() for k in skip_keywords):
-                        continue
-
-                    # Meta
-                    meta_div = info_td.find("div", class_="meta")
-                    genres = []
-                    age_restriction = None
-                    
-                    # Age Map (Copied)
-                    AGE_MAP = {
-                        "1": "KN", "2": "6", "3": "12", "4": "16", "5": "18", "6": "X",
-                        "7": "?", "8": "KN", "9": "6", "10": "12", "11": "16", "12": "18", "13": "X"
-                    }
-
-                    if meta_div:
-                        age_restriction_url = None
-                        for genre_div in meta_div.find_all("div", class_="genre"):
-                            genres.append(genre_div.text.strip())
-                        
-                        age_img = meta_div.find("img")
-                        if age_img and "ages" in age_img.get("src", ""):
-                            src = age_img["src"]
-                            match = re.search(r'ages/(\d+)', src)
-                            if match:
-                                age_id = match.group(1)
-                                age_restriction = AGE_MAP.get(age_id, age_id)
-                                age_restriction_url = f"{url.rstrip('/')}/{src.lstrip('/')}"
-                                if not src.startswith("http"):
-                                    age_restriction_url = f"{url.rstrip('/')}/{src.lstrip('/')}"
-                                else:
-                                    age_restriction_url = src
-                    
-                    genre_str = ", ".join(genres) if genres else None
-
-                    # Showtimes
-                    times_td = row.find("td", class_="times")
-                    if times_td:
-                        for time_div in times_td.find_all("div", class_="movie-time"):
-                            a_tag = time_div.find("a")
-                            if not a_tag: continue
-                            
-                            ticket_url_suffix = a_tag.get("href")
-                            ticket_url = f"{url.rstrip('/')}/{ticket_url_suffix.lstrip('/')}" if ticket_url_suffix else None
-                            
-                            time_span = a_tag.find("span", class_="time")
-                            start_time_str = time_span.text.strip() if time_span else ""
-                            
-                            type_span = a_tag.find("span", class_="type")
-                            details_type_code = type_span.text.strip() if type_span else None
-                            details_type = get_details_type(details_type_code)
-
-                            # Parse DateTime
-                            full_start_time = None
-                            try:
-                                full_start_time = datetime.strptime(f"{date_str_fmt} {start_time_str}", "%Y-%m-%d %H:%M")
-                            except ValueError:
-                                logger.warning(f"Failed to parse time: {date_str_fmt} {start_time_str}")
-                                continue
-
-                            st = Showtime(
-                                cinema_name=cinema_name,
-                                movie_title=movie_title,
-                                start_time=full_start_time,
-                                date_str=date_str_fmt,
-                                ticket_url=ticket_url,
-                                movie_url=movie_url,
-                                poster_url=poster_url,
-                                genre=genre_str,
-                                age_restriction=age_restriction,
-                                details_type=details_type,
-                                age_restriction_url=age_restriction_url
-                            )
-                            showtimes.append(st)
-
+                    result = future.result()
                 except Exception as e:
-                    logger.error(f"Error parsing movie row in musorlista: {e}")
-                    continue
+                    logger.error(f"Scraping {url} failed: {e}")
+                    result = ScrapeResult(url.split('#')[0], failed=True, error=str(e))
+                del future
+                in_flight += submit_next() - 1
+                yield result
+    finally:
+        if own_fetcher:
+            fetcher.close()
+
+SYNC_MODES = ("incremental", "full")
+
+def get_sync_mode():
+    """Retrieve the sync mode: 'incremental' (per cinema, default) or 'full'."""
+    mode = os.getenv("SCRAPE_SYNC_MODE", "incremental").strip().lower()
+    return mode if mode in SYNC_MODES else "incremental"
 
-    return showtimes
+# Counters and per-phase timings (seconds) summed over a scrape run
+STAT_KEYS = (
+    "showtimes", "inserted", "updated", "deleted", "bytes", "errors",
+    "fetch_seconds", "parse_seconds", "sync_seconds", "prune_seconds",
+)
 
-def scrape_all():
+def _empty_stats():
+    return dict.fromkeys(STAT_KEYS, 0)
+
+def _add_stats(totals, metrics):
+    for key in STAT_KEYS:
+        totals[key] += metrics.get(key, 0)
+
+def _cinema_metrics(result, stats=None, error=None):
     """
-    Main scraping function:
-    1. Scrape all configured URLs.
-    2. Sync data with DB (Upsert).
-    3. Prune old/missing showtimes.
+    Per-cinema metrics of one scrape: phase timings, bytes, row deltas, errors.
+    Records are parsed while they are synced, so parse time is taken out of
+    the sync time.
     """
-    db: Session = SessionLocal()
+    metrics = {
+        "cinema_name": result.cinema_name,
+        "showtimes": result.count,
+        "bytes": result.bytes,
+        "fetch_seconds": result.fetch_seconds,
+        "parse_seconds": result.parse_seconds,
+        "errors": 1 if (result.failed or error) else 0,
+        "error": error or result.error,
+    }
+    if stats is not None:
+        for key in ("inserted", "updated", "deleted", "prune_seconds"):
+            metrics[key] = stats[key]
+        metrics["sync_seconds"] = max(0.0, stats["sync_seconds"] - result.parse_seconds)
+    return metrics
+
+def _report(progress, result, status, metrics):
+    """Pass a cinema's state to the progress callback; never fails the scrape."""
+    result.status = status
+    if progress is None:
+        return
     try:
-        urls = get_cinema_urls()
-        all_showtimes = []
+        progress(result.url, status, **metrics)
+    except Exception as e:
+        logger.warning(f"Progress update for {result.url} failed: {e}")
 
-        for url in urls:
-            logger.info(f"Processing URL: {url}")
-            all_showtimes.extend(scrape_cinema_site(url))
+def _sync_full(db: Session, results, progress=None):
+    """
+    Sync every cinema in one transaction, then prune the whole catalogue.
+    The scraped catalogue is the entire valid state, so everything that was
+    not found is pruned; cinemas whose page did not change keep their rows.
+    Each cinema's records are upserted in batches as they are parsed and
+    only their keys are staged for the prune. Progress is reported once the
+    transaction has committed.
+    Returns aggregated stats, or None if nothing was scraped.
+    """
+    changed = []
+    unchanged_cinemas = set()
+    reports = []
+    totals = _empty_stats()
+    changes = ShowtimeChanges()
+    reset_scraped_keys(db)
+
+    for result in results:
+        if result.unchanged:
+            unchanged_cinemas.add(result.cinema_name)
+            reports.append((result, "unchanged", _cinema_metrics(result)))
+            continue
+        if result.failed:
+            reports.append((result, "failed", _cinema_metrics(result)))
+            continue
 
-        if not all_showtimes:
-            logger.info("No showtimes found to sync.")
-            return
+        started = time.perf_counter()
+        stats = upsert_batches(db, result.showtimes, changes=changes)
+        stats.update(deleted=0, prune_seconds=0.0, sync_seconds=time.perf_counter() - started)
+        if result.count:
+            changed.append(result)
+            reports.append((result, "synced", _cinema_metrics(result, stats)))
+        else:
+            logger.warning(f"No showtimes parsed from {result.url}.")
+            reports.append((result, "empty", _cinema_metrics(result)))
 
-        # --- Sync Logic (Upsert & Prune) ---
-        
-        # 1. Get IDs of showtimes found in this scrape
-        # We need a way to identify uniqueness.
-        # Combined key: cinema_name + movie_title + start_time
-        # But we want to UPSERT (update extras if they changed, e.g. ticket_url).
-        
-        # Strategy:
-        # Iterate all scraped showtimes.
-        # Check if exists in DB (by cinema, title, start_time).
-        # If exists -> Update attributes.
-        # If not -> Insert.
-        # Keep track of all processed/found DB IDs.
-        # Finally, delete all DB rows for these cinemas that were NOT in the found list AND are in the future?
-        # Or just prune everything for the dates we scraped?
-        # "Delete any showtimes from the database that were *not* found in this scrape session"
-        # This implies we should prune everything that is NOT in `all_showtimes`.
-        # SAFEGUARD: Only prune for the DATES that we actually scraped?
-        # Actually, the user requirement is "delete all data from db which is not fetched".
-        # This is simple but aggressive. If a scrape fails partially, we might lose data.
-        # But let's follow instructions: Sync the state.
-
-        found_ids = []
-        
-        for st in all_showtimes:
-            existing = db.query(Showtime).filter(
-                Showtime.cinema_name == st.cinema_name,
-                Showtime.movie_title == st.movie_title,
-                Showtime.start_time == st.start_time
-            ).first()
-
-            if existing:
-                # Update fields
-                existing.ticket_url = st.ticket_url
-                existing.movie_url = st.movie_url
-                existing.genre = st.genre
-                existing.age_restriction = st.age_restriction
-                existing.details_type = st.details_type
-                existing.age_restriction_url = st.age_restriction_url
-                db.flush() # Get ID if needed, but existing.id is there
-                found_ids.append(existing.id)
-            else:
-                db.add(st)
-                db.flush() # Generating ID
-                found_ids.append(st.id)
-        
+    for _, _, metrics in reports:
+        _add_stats(totals, metrics)
+
+    if not changed and not unchanged_cinemas:
+        db.rollback()
+        for report in reports:
+            _report(progress, *report)
+        return None
+
+    if changed:
+        started = time.perf_counter()
+        totals["deleted"] = prune_showtimes(db, keep_cinemas=unchanged_cinemas, changes=changes)
+        totals["prune_seconds"] += time.perf_counter() - started
+        save_page_states(db, changed)
+        record_showtime_changes(db, changes)
         db.commit()
+        bump_data_version()
+    else:
+        logger.info(f"All {len(unchanged_cinemas)} cinema pages unchanged, skipping sync.")
+        db.rollback()
+
+    for report in reports:
+        _report(progress, *report)
+    return totals
+
+def _sync_incremental(db: Session, results, progress=None):
+    """
+    Sync each cinema in its own transaction as soon as its page is fetched,
+    parsing and upserting its records in batches.
+    Failed, unchanged or empty cinemas keep their rows untouched.
+    Returns aggregated stats, or None if no cinema was scraped successfully.
+    """
+    totals = _empty_stats()
+    scraped = False
+
+    for result in results:
+        if result.failed:
+            metrics = _cinema_metrics(result)
+            _add_stats(totals, metrics)
+            _report(progress, result, "failed", metrics)
+            continue
+        scraped = True
+        if result.unchanged:
+            metrics = _cinema_metrics(result)
+            _add_stats(totals, dict(metrics, showtimes=0))
+            _report(progress, result, "unchanged", metrics)
+            continue
+
+        try:
+            changes = ShowtimeChanges()
+            stats = sync_cinema(db, None, result.showtimes, changes=changes, prune_past=not replaying())
+            if not result.count:
+                db.rollback()
+                logger.warning(f"No showtimes parsed from {result.url}, keeping existing rows.")
+                metrics = _cinema_metrics(result)
+                _add_stats(totals, metrics)
+                _report(progress, result, "empty", metrics)
+                continue
+            save_page_states(db, [result])
+            record_showtime_changes(db, changes, cinema=result.cinema_name)
+            db.commit()
+            bump_data_version()
+        except Exception as e:
+            db.rollback()
+            logger.error(f"[{result.cinema_name}] Sync failed: {e}")
+            metrics = _cinema_metrics(result, error=f"Sync failed: {e}")
+            _add_stats(totals, dict(metrics, showtimes=0))
+            _report(progress, result, "failed", metrics)
+            continue
+
+        metrics = _cinema_metrics(result, stats)
+        _add_stats(totals, metrics)
+        _report(progress, result, "synced", metrics)
+        logger.info(
+            f"[{result.cinema_name}] Synced {result.count} showtimes "
+            f"({stats['inserted']} inserted, {stats['updated']} updated, {stats['deleted']} pruned; "
+            f"fetch {result.fetch_seconds:.2f}s, parse {result.parse_seconds:.2f}s, "
+            f"sync {metrics['sync_seconds']:.2f}s, prune {stats['prune_seconds']:.2f}s)."
+        )
 
-        # 2. Prune
-        # Delete showtimes NOT in found_ids
-        # We should probably only prune for the related cinemas to avoid wiping other cinemas if we ever add more?
-        # But specs say "Delete ... not found in this scrape session".
-        # If we scrape ALL configured URLs, then `all_showtimes` represents the entire valid state.
-        # So we can delete everything else.
-        
-        # Optimization: Delete where ID not in found_ids
-        if found_ids:
-             db.query(Showtime).filter(Showtime.id.notin_(found_ids)).delete(synchronize_session=False)
+    return totals if scraped else None
+
+def _track(results, scraped):
+    """
+    Pass results through, keeping each in `scraped` (for the schedule) once
+    the caller is done with it, without its exhausted showtimes iterable.
+    """
+    for result in results:
+        yield result
+        result.showtimes = ()
+        scraped.append(result)
+
+def _refresh_snapshots(db: Session, totals=None):
+    """Rewrite the /api/movies snapshot files (snapshots.py); never fails the scrape."""
+    started = time.perf_counter()
+    try:
+        count = write_snapshots(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Writing snapshots failed: {e}")
+        count = 0
+    if totals is not None:
+        totals["snapshots"] = count
+        totals["snapshot_seconds"] = time.perf_counter() - started
+
+def scrape_all(progress=None, urls=None):
+    """
+    Main scraping function:
+    1. Move the showtimes of past days to the archive (showtime_archive),
+       unless replaying recorded pages (see replay.py).
+    2. Scrape all configured URLs, or only `urls` (concurrently).
+    3. Sync data with DB (Upsert).
+    4. Prune old/missing showtimes.
+    5. Refresh the per-date summary (date_summaries).
+    6. Fetch the details of new or expired movie pages (details.py).
+    7. Cache thumbnails of new poster and age rating images (images.py).
+    8. Write the /api/movies snapshot files (snapshots.py).
+
+    SCRAPE_SYNC_MODE=incremental (default) syncs and prunes each cinema on
+    its own as soon as it is scraped; 'full' syncs the whole catalogue in one
+    transaction and prunes everything that was not found. Either way pages
+    are parsed lazily and synced in SYNC_BATCH_SIZE batches. Scrapes of a
+    subset of the cinemas (`urls`) are always incremental. The outcome for
+    each cinema feeds the adaptive schedule (see schedule.py).
+
+    `progress(url, status, **metrics)` is called as each cinema finishes
+    (in full mode: after the commit), outside of any open write transaction,
+    with its phase timings, bytes, row deltas and errors.
+    Returns the aggregated stats (STAT_KEYS plus favorites_pruned, archived
+    and duration_seconds), or None if no cinema was scraped; errors are logged
+    and re-raised.
+    """
+    started = time.perf_counter()
+    db: Session = SessionLocal()
+    try:
+        partial = urls is not None
+        urls = urls if partial else get_cinema_urls()
+        page_states = load_page_states(db)
+        db.commit()
+
+        # Snapshots would be stale once the first cinema commits
+        invalidate_snapshots()
+
+        # Past days leave the live table first; a full sync would delete them
+        archived = 0
+        if not replaying():
+            past = ShowtimeChanges()
+            archived = prune_past_showtimes(db, changes=past)
+            record_showtime_changes(db, past)
+            db.commit()
+        if archived:
+            logger.info(f"Archived {archived} past showtimes.")
+            bump_data_version()
+        scraped = []
+        results = _track(scrape_cinemas(urls, page_states=page_states), scraped)
+        # A full sync would prune the cinemas left out of a partial scrape
+        if get_sync_mode() == "full" and not partial:
+            totals = _sync_full(db, results, progress)
         else:
-             # Scrape returned empty list? If so, should we wipe DB?
-             # Probably safer to only wipe if we are sure scrape succeeded.
-             # But function says "No showtimes found to sync" -> returns early.
-             pass
+            totals = _sync_incremental(db, results, progress)
 
+        record_checks(db, [
+            (result.url, result.cinema_name, result.status, result.showtimes_hash) for result in scraped
+        ])
         db.commit()
-        
-        # 3. Prune Favorites
-        # Remove movies from favorites that are no longer in the theaters
-        all_scraped_titles = set(st.movie_title for st in all_showtimes)
-        if all_scraped_titles:
-             db.query(Favorite).filter(Favorite.movie_title.notin_(all_scraped_titles)).delete(synchronize_session=False)
-             db.commit()
-        
-        # 4. Update Last Scrape Time
+
+        if totals is None:
+            logger.info("No showtimes found to sync.")
+            _refresh_snapshots(db)
+            return None
+
+        # Remove favorites for movies that are no longer in the theaters
+        prune_started = time.perf_counter()
+        favorites_pruned = prune_favorites(db)
+        if favorites_pruned:
+            record_change(db, "favorites", pruned=favorites_pruned)
+        prune_orphans(db)
+        totals["prune_seconds"] += time.perf_counter() - prune_started
+        totals["favorites_pruned"] = favorites_pruned
+        totals["archived"] = archived
+        refresh_date_summaries(db)
+
+        # Update Last Scrape Time
         now_str = datetime.now().isoformat()
         last_scrape = db.query(AppSettings).filter(AppSettings.key == "last_scrape_time").first()
         if last_scrape:
@@ -380,12 +490,43 @@ def scrape_all():
         else:
             db.add(AppSettings(key="last_scrape_time", value=now_str))
         db.commit()
-
-        logger.info(f"Scraping completed. Synced {len(found_ids)} showtimes.")
+        bump_data_version()
+
+        # Showtimes are already visible; details and thumbnails follow once downloaded
+        try:
+            details = enrich_movies(db)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Fetching movie details failed: {e}")
+        else:
+            totals.update(details)
+            if details.get("details_fetched"):
+                bump_data_version()
+
+        image_started = time.perf_counter()
+        try:
+            totals["images_fetched"], relinked = cache_images(db)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Caching images failed: {e}")
+        else:
+            if relinked:
+                bump_data_version()
+        totals["image_seconds"] = time.perf_counter() - image_started
+        _refresh_snapshots(db, totals)
+
+        totals["duration_seconds"] = time.perf_counter() - started
+        logger.info(
+            f"Scraping completed in {totals['duration_seconds']:.2f}s. Synced {totals['showtimes']} showtimes "
+            f"({totals['inserted']} inserted, {totals['updated']} updated, {totals['deleted']} pruned, "
+            f"{favorites_pruned} favorites pruned, {archived} archived, {totals['errors']} errors)."
+        )
+        return totals
 
     except Exception as e:
         db.rollback()
         logger.error(f"Scraping failed: {e}")
+        raise
     finally:
         db.close()
 
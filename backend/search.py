@@ -0,0 +1,212 @@
+"""
+In-memory title search for /api/search.
+
+Titles are matched on their search key (parsers.fold_title: lowercased,
+accents folded, subtitle suffixes removed), which sync stores with each
+movie. Matches are tried from best to worst until `limit` results are found:
+
+  exact / prefix  the whole key starts with the query (binary search over
+                  the sorted keys)
+  words           every query word starts a word of the title
+  fuzzy           every query word starts, or is similar to, a word of the
+                  title (trigram Dice similarity over the word vocabulary,
+                  so typos and dropped letters still match)
+
+Everything is precomputed per data version; a lookup is a few binary
+searches and set intersections over the titles sharing a query word. The
+best titles of the one and two letter prefixes, which match a large part of
+the keys, are ranked in advance, and fuzzy matching only counts the words
+sharing one of the query's rarest trigrams.
+"""
+import heapq
+import math
+from bisect import bisect_left
+
+from parsers import fold_title
+
+# Minimum trigram similarity (Dice coefficient) of a fuzzy word match
+FUZZY_THRESHOLD = 0.5
+
+# Prefixes up to this length have their best titles ranked in advance, up
+# to the largest /api/search limit
+SHORT_PREFIX = 2
+SHORT_PREFIX_RESULTS = 100
+
+# Query words whose fuzzy matches are kept per index
+SIMILAR_CACHE_SIZE = 4096
+
+# Match kinds, best first
+EXACT, PREFIX, WORDS, FUZZY = "exact", "prefix", "words", "fuzzy"
+
+_MAX_CHAR = "\U0010ffff"
+
+
+def trigrams(word):
+    """Trigrams of a word padded like pg_trgm ("ab" -> "  a", " ab", "ab ")."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """
+    Immutable search index over (id, title, search_key, poster_url) rows.
+    Titles are numbered shortest key first, so lower numbers rank higher
+    among equally good matches.
+    """
+
+    def __init__(self, rows):
+        entries = sorted(
+            ((search_key or fold_title(title), movie_id, title, poster_url)
+             for movie_id, title, search_key, poster_url in rows),
+            key=lambda entry: (len(entry[0]), entry[0]),
+        )
+        self.keys = [entry[0] for entry in entries]
+        self.rows = [entry[1:] for entry in entries]
+        sorted_keys = sorted((key, i) for i, key in enumerate(self.keys))
+        self.sorted_key_strings = [key for key, _ in sorted_keys]
+        self.sorted_ids = [i for _, i in sorted_keys]
+        self.short_prefixes = {}
+        for i, key in enumerate(self.keys):
+            for n in range(1, min(SHORT_PREFIX, len(key)) + 1):
+                ranked = self.short_prefixes.setdefault(key[:n], [])
+                if len(ranked) < SHORT_PREFIX_RESULTS:
+                    ranked.append(i)
+
+        # Word vocabulary: sorted words and the titles containing each
+        word_titles = {}
+        for i, key in enumerate(self.keys):
+            for word in set(key.split()):
+                word_titles.setdefault(word, []).append(i)
+        self.vocab = sorted(word_titles)
+        self.word_titles = [frozenset(word_titles[word]) for word in self.vocab]
+        self.word_title_counts = [len(titles) for titles in self.word_titles]
+        self.title_words = [
+            frozenset(bisect_left(self.vocab, word) for word in key.split()) for key in self.keys
+        ]
+
+        # Trigram postings over the vocabulary, for fuzzy word matches
+        self.gram_words = {}
+        self.word_grams = []
+        for w, word in enumerate(self.vocab):
+            grams = frozenset(trigrams(word))
+            self.word_grams.append(grams)
+            for gram in grams:
+                self.gram_words.setdefault(gram, []).append(w)
+        self._similar = {}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _prefix_words(self, term):
+        lo = bisect_left(self.vocab, term)
+        return range(lo, bisect_left(self.vocab, term + _MAX_CHAR, lo))
+
+    def _similar_words(self, term):
+        """
+        {word id: similarity} of vocabulary words similar to `term`, or that
+        it is a prefix of (similarity 1). Memoized: queries typed letter by
+        letter repeat their words.
+        """
+        similar = self._similar.get(term)
+        if similar is not None:
+            return similar
+        prefix_words = self._prefix_words(term)
+        grams = trigrams(term)
+        # A word of n >= max(2, c) trigrams sharing c of the term's g reaches
+        # FUZZY_THRESHOLD only if c >= `needed`, so it shares one of any
+        # g - needed + 1 of them: only the words of the rarest ones are candidates
+        g = len(grams)
+        needed = math.ceil(max(FUZZY_THRESHOLD * g / (2 - FUZZY_THRESHOLD), FUZZY_THRESHOLD * (g + 2) / 2))
+        postings = sorted((self.gram_words.get(gram, ()) for gram in grams), key=len)
+        candidates = set()
+        for words in postings[:g - needed + 1]:
+            candidates.update(words)
+        candidates.difference_update(prefix_words)
+        similar = {}
+        for w in candidates:
+            word_grams = self.word_grams[w]
+            score = 2.0 * len(grams & word_grams) / (g + len(word_grams))
+            if score >= FUZZY_THRESHOLD:
+                similar[w] = score
+        similar.update(dict.fromkeys(prefix_words, 1.0))
+        if len(self._similar) >= SIMILAR_CACHE_SIZE:
+            self._similar.clear()
+        self._similar[term] = similar
+        return similar
+
+    def _titles(self, words):
+        """Titles containing any of `words` (word ids)."""
+        if len(words) == 1:
+            return self.word_titles[next(iter(words))]
+        return frozenset().union(*(self.word_titles[w] for w in words))
+
+    def _intersect(self, ranked, exclude):
+        """
+        Titles where every term of `ranked` [(titles, {word id: score})],
+        smallest first, matches a word. Intersects from the most selective
+        term; terms matching many titles only filter the remaining candidates.
+        """
+        candidates = None
+        for size, m in ranked:
+            if candidates is None:
+                candidates = self._titles(m) - exclude
+            elif size <= 8 * len(candidates) or len(m) <= 2:
+                # Intersect word by word rather than build the union of large title sets
+                candidates = set().union(*(candidates.intersection(self.word_titles[w]) for w in m))
+            else:
+                words = m.keys()
+                candidates = {i for i in candidates if not words.isdisjoint(self.title_words[i])}
+            if not candidates:
+                break
+        return candidates
+
+    def _match_terms(self, matches, limit, exclude):
+        """
+        Titles where every term matches a word, given per term {word id: score}.
+        Returns up to `limit` [(score, title)] in rank order, score being the
+        mean of each term's best word score.
+        """
+        sizes = [sum(map(self.word_title_counts.__getitem__, m)) for m in matches]
+        ranked = sorted(zip(sizes, matches), key=lambda item: item[0])
+        top = heapq.nsmallest(limit, self._intersect(ranked, exclude))
+        title_words = self.title_words
+        found = []
+        for i in top:
+            words = title_words[i]
+            score = sum(max(map(m.__getitem__, m.keys() & words)) for m in matches)
+            found.append((score / len(matches), i))
+        exclude.update(i for _, i in found)
+        return found
+
+    def search(self, query, limit=20, fuzzy=True):
+        """Return up to `limit` (row, score, match) tuples, best first."""
+        q = fold_title(query)
+        if not q or limit < 1:
+            return []
+
+        if len(q) <= SHORT_PREFIX and limit <= SHORT_PREFIX_RESULTS:
+            prefix = self.short_prefixes.get(q, [])[:limit]
+        else:
+            lo = bisect_left(self.sorted_key_strings, q)
+            hi = bisect_left(self.sorted_key_strings, q + _MAX_CHAR, lo)
+            prefix = heapq.nsmallest(limit, self.sorted_ids[lo:hi])
+        results = [(i, 1.0, EXACT if self.keys[i] == q else PREFIX) for i in prefix]
+        seen = set(prefix)
+
+        # A repeated word matches the same title words again
+        terms = list(dict.fromkeys(q.split()))
+        if len(results) < limit:
+            matches = [dict.fromkeys(self._prefix_words(term), 1.0) for term in terms]
+            if all(matches):
+                found = self._match_terms(matches, limit - len(results), seen)
+                results.extend((i, score, WORDS) for score, i in found)
+
+        if fuzzy and len(results) < limit:
+            matches = [self._similar_words(term) for term in terms]
+            if all(matches):
+                # Rank fuzzy matches by similarity, so collect more than needed
+                found = self._match_terms(matches, 4 * (limit - len(results)), seen)
+                found.sort(key=lambda item: (-item[0], item[1]))
+                results.extend((i, score, FUZZY) for score, i in found[:limit - len(results)])
+
+        return [(self.rows[i], score, match) for i, score, match in results]
@@ -0,0 +1,193 @@
+"""
+Static snapshots of /api/movies.
+
+Between scrapes the showtimes do not change, so at the end of every scrape
+write_snapshots() serializes the two common /api/movies requests to files:
+the full list (from today on, no filters) and one file per date
+(date_from = date_to). Each file is also stored gzip and brotli compressed,
+ready to be sent as is.
+
+Files go to a new version directory under SNAPSHOT_DIR; manifest.json names
+the current version, its build date and each file's ETag (the content hash
+of the JSON), and is replaced atomically. The API serves a snapshot as a
+file (no query, no serialization) while the manifest is from today, and
+falls back to the database otherwise. A scrape removes the manifest before
+it changes any row, so a snapshot is never older than the data.
+"""
+import gzip
+import json
+import logging
+import os
+import shutil
+import time
+from datetime import date, datetime, time as dt_time
+from itertools import groupby
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always written
+    brotli = None
+
+from cache import MIN_COMPRESS_SIZE, make_etag
+from config import env_bool, env_str
+from database import Showtime, Movie, Cinema
+
+logger = logging.getLogger(__name__)
+
+# The fields of a /api/movies row (main.ShowtimeSchema), in order
+SHOWTIME_COLUMNS = (
+    Showtime.id,
+    Cinema.name.label("cinema_name"),
+    Movie.title.label("movie_title"),
+    Showtime.start_time,
+    Showtime.date_str,
+    Showtime.ticket_url,
+    Movie.movie_url,
+    Movie.poster_url,
+    Movie.genre,
+    Movie.age_restriction,
+    Showtime.details_type,
+    Movie.age_restriction_url,
+    Movie.poster_image,
+    Movie.age_restriction_image,
+)
+
+MANIFEST = "manifest.json"
+
+# Compressed once per scrape rather than per response, so at high levels
+SUFFIXES = {"gzip": ".gz"}
+ENCODERS = {"gzip": lambda body: gzip.compress(body, compresslevel=9)}
+if brotli is not None:
+    SUFFIXES["br"] = ".br"
+    ENCODERS["br"] = lambda body: brotli.compress(body, quality=9)
+
+
+def get_snapshot_dir():
+    """Where snapshots are written (SNAPSHOT_DIR), or None with SNAPSHOTS=false."""
+    if not env_bool("SNAPSHOTS", True):
+        return None
+    return env_str("SNAPSHOT_DIR", "data/snapshots")
+
+
+def serialize_showtimes(rows):
+    """The /api/movies JSON body of SHOWTIME_COLUMNS rows (byte for byte what the endpoint sends)."""
+    return json.dumps(
+        [dict(row._mapping, start_time=row.start_time.isoformat()) for row in rows],
+        ensure_ascii=False, separators=(",", ":"),
+    ).encode()
+
+
+def _write_file(path, body):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
+
+
+def _write_snapshot(base, name, body):
+    """Write a body and its compressed variants; returns its manifest entry."""
+    path = os.path.join(base, name)
+    _write_file(path, body)
+    encodings = []
+    if len(body) >= MIN_COMPRESS_SIZE:
+        for encoding, encode in ENCODERS.items():
+            _write_file(path + SUFFIXES[encoding], encode(body))
+            encodings.append(encoding)
+    return {"path": name, "etag": make_etag(body), "bytes": len(body), "encodings": encodings}
+
+
+def invalidate_snapshots():
+    """Stop serving snapshots until the next write_snapshots() (call before changing showtimes)."""
+    directory = get_snapshot_dir()
+    if directory:
+        try:
+            os.remove(os.path.join(directory, MANIFEST))
+        except FileNotFoundError:
+            pass
+
+
+def write_snapshots(db: Session):
+    """
+    Write the full list and per-date snapshots of today's /api/movies data
+    and switch the manifest to them. Keeps the previous version (its files
+    may still be being sent) and deletes older ones. Returns the number of
+    snapshots written.
+    """
+    directory = get_snapshot_dir()
+    if not directory:
+        return 0
+    started = time.perf_counter()
+    today = date.today()
+    rows = db.execute(
+        select(*SHOWTIME_COLUMNS)
+        .join(Cinema, Cinema.id == Showtime.cinema_id)
+        .join(Movie, Movie.id == Showtime.movie_id)
+        .where(Showtime.start_time >= datetime.combine(today, dt_time.min))
+        .order_by(Showtime.start_time, Showtime.id)
+    ).all()
+
+    version = str(time.time_ns())
+    base = os.path.join(directory, version)
+    files = {"all": _write_snapshot(base, "movies.json", serialize_showtimes(rows))}
+    # Same bounds as /api/movies?date_from=D&date_to=D: the start_time's day
+    for day, day_rows in groupby(rows, key=lambda row: row.start_time.date().isoformat()):
+        files[day] = _write_snapshot(base, f"dates/{day}.json", serialize_showtimes(day_rows))
+
+    manifest_path = os.path.join(directory, MANIFEST)
+    tmp = f"{manifest_path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump({"version": version, "date": today.isoformat(), "files": files}, f)
+    os.replace(tmp, manifest_path)
+
+    versions = sorted((name for name in os.listdir(directory) if name.isdigit()), key=int)
+    for name in versions[:-2]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+    logger.info(
+        f"Wrote {len(files)} snapshots ({len(rows)} showtimes, "
+        f"{sum(entry['bytes'] for entry in files.values()) / 2**20:.1f} MiB) in {time.perf_counter() - started:.2f}s"
+    )
+    return len(files)
+
+
+# (directory, manifest file stamp, manifest) of the last manifest read
+_manifest = (None, None, None)
+
+
+def load_manifest(directory):
+    """The current manifest, or None; re-read only when the file is replaced."""
+    global _manifest
+    path = os.path.join(directory, MANIFEST)
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (st.st_ino, st.st_mtime_ns)
+    if _manifest[:2] != (directory, stamp):
+        try:
+            with open(path) as f:
+                _manifest = (directory, stamp, json.load(f))
+        except (OSError, ValueError):
+            return None
+    return _manifest[2]
+
+
+def snapshot_file(key, encoding, today):
+    """
+    The snapshot for `key` ("all" or a YYYY-MM-DD date) as (path, etag,
+    content-coding or None), preferring `encoding`; None if there is no
+    current snapshot for it.
+    """
+    directory = get_snapshot_dir()
+    manifest = load_manifest(directory) if directory else None
+    if manifest is None or manifest["date"] != today.isoformat():
+        return None
+    entry = manifest["files"].get(key)
+    if entry is None:
+        return None
+    path = os.path.join(directory, manifest["version"], entry["path"])
+    if encoding in entry["encodings"]:
+        return path + SUFFIXES[encoding], f'{entry["etag"][:-1]}-{encoding}"', encoding
+    return path, entry["etag"], None
@@ -0,0 +1,518 @@
+import json
+import logging
+import datetime
+import time
+from collections import defaultdict
+from itertools import chain, islice
+from sqlalchemy import (
+    Table, Column, Integer, DateTime, MetaData, select, insert, bindparam, exists, text, and_, func, distinct,
+    literal,
+)
+from sqlalchemy.orm import Session
+
+from config import env_bool, env_int
+from parsers import fold_title
+from database import Showtime, Movie, Cinema, Favorite, PageState, DateSummary, ArchivedShowtime
+
+logger = logging.getLogger(__name__)
+
+# Natural key of a showtime (backed by the uq_showtime_key index)
+KEY_FIELDS = ("cinema_id", "movie_id", "start_time")
+
+# Showtime fields refreshed on an existing row when they change
+SYNC_FIELDS = ("date_str", "ticket_url", "details_type")
+
+# Movie metadata, stored once per title
+MOVIE_FIELDS = ("movie_url", "poster_url", "genre", "age_restriction", "age_restriction_url")
+
+# Columns of an archived showtime, flattened from the showtime, cinema and movie rows
+ARCHIVE_FIELDS = (
+    "cinema_name", "movie_title", "start_time", "date_str", "ticket_url", "details_type",
+    "movie_url", "genre", "age_restriction",
+)
+
+# Keep IN (...) lists well below SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+class ShowtimeChanges:
+    """
+    Ids of the rows a sync touched, for the change stream (see events.py):
+    showtimes inserted, updated and deleted, and movies whose metadata changed.
+    """
+
+    def __init__(self):
+        self.inserted = set()
+        self.updated = set()
+        self.deleted = set()
+        self.movies = set()
+
+    def __bool__(self):
+        return bool(self.inserted or self.updated or self.deleted or self.movies)
+
+    def as_dict(self):
+        """Sorted id lists; a row inserted or updated and then deleted is only reported as deleted."""
+        inserted = self.inserted - self.deleted
+        return {
+            "inserted": sorted(inserted),
+            "updated": sorted(self.updated - inserted - self.deleted),
+            "deleted": sorted(self.deleted),
+            "movies": sorted(self.movies),
+        }
+
+def get_batch_size():
+    """Number of scraped records upserted at a time (SYNC_BATCH_SIZE)."""
+    return max(1, env_int("SYNC_BATCH_SIZE", 1000))
+
+showtimes_table = Showtime.__table__
+movies_table = Movie.__table__
+cinemas_table = Cinema.__table__
+favorites_table = Favorite.__table__
+date_summaries_table = DateSummary.__table__
+archive_table = ArchivedShowtime.__table__
+
+# Per-connection scratch table holding the keys seen in the current scrape.
+# Pruning joins against it instead of sending a huge NOT IN (...) list.
+_temp_metadata = MetaData()
+scraped_keys = Table(
+    "scraped_keys",
+    _temp_metadata,
+    Column("cinema_id", Integer, primary_key=True),
+    Column("movie_id", Integer, primary_key=True),
+    Column("start_time", DateTime, primary_key=True),
+    prefixes=["TEMPORARY"],
+)
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    values = list(values)
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+def _batches(records, size):
+    """Split any iterable into lists of at most `size` items without materializing it."""
+    records = iter(records)
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def resolve_cinemas(db: Session, names):
+    """Return {name: id} for the given cinema names, inserting unknown ones."""
+    ids = {}
+    for chunk in _chunks(names):
+        ids.update(db.execute(
+            select(cinemas_table.c.name, cinemas_table.c.id).where(cinemas_table.c.name.in_(chunk))
+        ).all())
+    missing = [name for name in names if name not in ids]
+    if missing:
+        db.execute(cinemas_table.insert(), [{"name": name} for name in missing])
+        for chunk in _chunks(missing):
+            ids.update(db.execute(
+                select(cinemas_table.c.name, cinemas_table.c.id).where(cinemas_table.c.name.in_(chunk))
+            ).all())
+    return ids
+
+
+def upsert_movies(db: Session, movies, changes=None):
+    """
+    Upsert movie metadata given as {title: {field: value}}, where the values
+    also name the cinema they were scraped from (source_cinema_id). A movie
+    takes its metadata from one cinema: the URLs are links into that
+    cinema's site, so another cinema showing it only fills in missing
+    fields, and ownership passes on once the source no longer shows it
+    (release_movie_sources). Only movies whose metadata changed are updated.
+    Returns ({title: id}, inserted_count, updated_count).
+    """
+    existing = {}
+    columns = [movies_table.c.id, movies_table.c.title, movies_table.c.source_cinema_id] + [
+        movies_table.c[f] for f in MOVIE_FIELDS
+    ]
+    for chunk in _chunks(movies):
+        for row in db.execute(select(*columns).where(movies_table.c.title.in_(chunk))):
+            existing[row.title] = row
+
+    inserts = []
+    updates = []
+    changed = set()
+    for title, values in movies.items():
+        current = existing.get(title)
+        source = values.get("source_cinema_id")
+        if current is None:
+            inserts.append(dict(values, title=title, search_key=fold_title(title)))
+            continue
+        if current.source_cinema_id in (None, source):
+            new = {f: values[f] for f in MOVIE_FIELDS}
+        else:
+            source = current.source_cinema_id
+            new = {f: values[f] if getattr(current, f) is None else getattr(current, f) for f in MOVIE_FIELDS}
+        if any(getattr(current, f) != new[f] for f in MOVIE_FIELDS):
+            changed.add(current.id)
+        elif current.source_cinema_id == source:
+            continue
+        updates.append(dict({f"new_{f}": new[f] for f in MOVIE_FIELDS}, new_source_cinema_id=source, row_id=current.id))
+
+    if inserts:
+        db.execute(movies_table.insert(), inserts)
+        for chunk in _chunks([m["title"] for m in inserts]):
+            for row in db.execute(select(*columns).where(movies_table.c.title.in_(chunk))):
+                existing[row.title] = row
+    if updates:
+        stmt = (
+            movies_table.update()
+            .where(movies_table.c.id == bindparam("row_id"))
+            .values({f: bindparam(f"new_{f}") for f in MOVIE_FIELDS + ("source_cinema_id",)})
+        )
+        db.execute(stmt, updates)
+        if changes is not None:
+            changes.movies.update(changed)
+
+    return {title: row.id for title, row in existing.items()}, len(inserts), len(changed)
+
+
+def upsert_showtimes(db: Session, showtimes, changes=None):
+    """
+    Set-based upsert of scraped showtimes (flat records as produced by the
+    parsers). Resolves cinema and movie ids, loads the existing rows in the
+    time span the records cover for each cinema, bulk-inserts new rows and
+    bulk-updates only rows whose fields changed. The ids of the rows are
+    collected in `changes` (a ShowtimeChanges), if given.
+    Returns (stats, keys) where keys is the set of natural keys that were synced.
+    """
+    # Deduplicate by natural key; the last scraped row wins, also for movie metadata
+    scraped = {}
+    for st in showtimes:
+        scraped[(st.cinema_name, st.movie_title, st.start_time)] = st
+
+    cinema_ids = resolve_cinemas(db, {st.cinema_name for st in scraped.values()})
+    movies = {}
+    for st in scraped.values():
+        movies[st.movie_title] = dict(
+            {f: getattr(st, f) for f in MOVIE_FIELDS}, source_cinema_id=cinema_ids[st.cinema_name]
+        )
+    movie_ids, movies_inserted, movies_updated = upsert_movies(db, movies, changes)
+
+    values_by_key = {}
+    for st in scraped.values():
+        key = (cinema_ids[st.cinema_name], movie_ids[st.movie_title], st.start_time)
+        values_by_key[key] = dict(zip(KEY_FIELDS, key), **{f: getattr(st, f) for f in SYNC_FIELDS})
+
+    # Time span per cinema, so a batch only loads the rows it can match (ix_showtime_cinema_start_id)
+    spans = {}
+    for cinema_id, _, start_time in values_by_key:
+        low, high = spans.get(cinema_id, (start_time, start_time))
+        spans[cinema_id] = (min(low, start_time), max(high, start_time))
+
+    existing = {}
+    columns = [showtimes_table.c.id] + [showtimes_table.c[f] for f in KEY_FIELDS + SYNC_FIELDS]
+    for cinema_id, (low, high) in spans.items():
+        stmt = select(*columns).where(and_(
+            showtimes_table.c.cinema_id == cinema_id,
+            showtimes_table.c.start_time.between(low, high),
+        ))
+        for row in db.execute(stmt):
+            existing[tuple(getattr(row, f) for f in KEY_FIELDS)] = row
+
+    inserts = []
+    updates = []
+    for key, values in values_by_key.items():
+        current = existing.get(key)
+        if current is None:
+            inserts.append(values)
+            continue
+        if any(getattr(current, f) != values[f] for f in SYNC_FIELDS):
+            updates.append(dict({f"new_{f}": values[f] for f in SYNC_FIELDS}, row_id=current.id))
+
+    if inserts:
+        if changes is None:
+            db.execute(showtimes_table.insert(), inserts)
+        else:
+            changes.inserted.update(
+                db.execute(showtimes_table.insert().returning(showtimes_table.c.id), inserts).scalars()
+            )
+    if updates:
+        stmt = (
+            showtimes_table.update()
+            .where(showtimes_table.c.id == bindparam("row_id"))
+            .values({f: bindparam(f"new_{f}") for f in SYNC_FIELDS})
+        )
+        db.execute(stmt, updates)
+        if changes is not None:
+            changes.updated.update(update["row_id"] for update in updates)
+
+    stats = {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "unchanged": len(values_by_key) - len(inserts) - len(updates),
+        "movies_inserted": movies_inserted,
+        "movies_updated": movies_updated,
+    }
+    return stats, set(values_by_key)
+
+
+def _cinema_id(name):
+    return select(cinemas_table.c.id).where(cinemas_table.c.name == name).scalar_subquery()
+
+
+def reset_scraped_keys(db: Session):
+    """Create (once per connection) and empty the scraped_keys staging table."""
+    conn = db.connection()
+    scraped_keys.create(conn, checkfirst=True)
+    conn.execute(scraped_keys.delete())
+
+def stage_keys(db: Session, keys):
+    """Add natural keys to the scraped_keys staging table (duplicates are ignored)."""
+    if keys:
+        db.connection().execute(
+            scraped_keys.insert().prefix_with("OR IGNORE"), [dict(zip(KEY_FIELDS, key)) for key in keys]
+        )
+
+def upsert_batches(db: Session, showtimes, batch_size=None, changes=None):
+    """
+    Consume an iterable of scraped records in fixed-size batches: upsert each
+    batch and stage its keys for a later prune, so only one batch is held in
+    memory. The caller resets the staging table first.
+    Returns stats with the record count and the date range that was seen.
+    """
+    totals = {
+        "showtimes": 0, "inserted": 0, "updated": 0, "unchanged": 0,
+        "movies_inserted": 0, "movies_updated": 0, "date_from": None, "date_to": None,
+    }
+    for batch in _batches(showtimes, batch_size or get_batch_size()):
+        stats, keys = upsert_showtimes(db, batch, changes)
+        stage_keys(db, keys)
+        for key, value in stats.items():
+            totals[key] += value
+        totals["showtimes"] += len(batch)
+        dates = [st.date_str for st in batch]
+        if totals["date_from"] is None or min(dates) < totals["date_from"]:
+            totals["date_from"] = min(dates)
+        if totals["date_to"] is None or max(dates) > totals["date_to"]:
+            totals["date_to"] = max(dates)
+    return totals
+
+def _delete_showtimes(db: Session, stmt, changes=None):
+    """Run a showtimes DELETE, collecting the deleted ids in `changes` if given; returns the row count."""
+    if changes is None:
+        return db.connection().execute(stmt).rowcount
+    deleted = db.connection().execute(stmt.returning(showtimes_table.c.id)).scalars().all()
+    changes.deleted.update(deleted)
+    return len(deleted)
+
+
+def prune_showtimes(db: Session, keys=None, keep_cinemas=(), cinema=None, date_from=None, date_to=None,
+                    changes=None):
+    """
+    Delete every showtime whose natural key is not in `keys`, except rows of
+    the `keep_cinemas` (names). `cinema` and `date_from`/`date_to` (inclusive
+    YYYY-MM-DD) narrow the prune to one cinema and the date range its scrape
+    covered. The keys are staged in a temp table and pruned with an anti-join;
+    with keys=None the keys already staged by upsert_batches() are used.
+    Returns the number of deleted rows.
+    """
+    conn = db.connection()
+    if keys is not None:
+        reset_scraped_keys(db)
+        stage_keys(db, keys)
+
+    found = exists().where(*(scraped_keys.c[f] == showtimes_table.c[f] for f in KEY_FIELDS))
+    stmt = showtimes_table.delete().where(~found)
+    if keep_cinemas:
+        kept = select(cinemas_table.c.id).where(cinemas_table.c.name.in_(keep_cinemas))
+        stmt = stmt.where(showtimes_table.c.cinema_id.notin_(kept))
+    if cinema is not None:
+        stmt = stmt.where(showtimes_table.c.cinema_id == _cinema_id(cinema))
+    if date_from is not None:
+        stmt = stmt.where(showtimes_table.c.date_str >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(showtimes_table.c.date_str <= date_to)
+    deleted = _delete_showtimes(db, stmt, changes)
+    conn.execute(scraped_keys.delete())
+    return deleted
+
+
+def archive_enabled():
+    """Whether past showtimes are kept in the archive (ARCHIVE_SHOWTIMES) or just deleted."""
+    return env_bool("ARCHIVE_SHOWTIMES", True)
+
+
+def archive_showtimes(db: Session, condition):
+    """
+    Copy the showtimes matching `condition` into showtime_archive, with
+    their cinema and movie fields; showtimes archived before are kept as
+    they were. Returns the number of rows added.
+    """
+    rows = (
+        select(
+            cinemas_table.c.name, movies_table.c.title, showtimes_table.c.start_time, showtimes_table.c.date_str,
+            showtimes_table.c.ticket_url, showtimes_table.c.details_type, movies_table.c.movie_url,
+            movies_table.c.genre, movies_table.c.age_restriction, literal(datetime.datetime.now(), DateTime),
+        )
+        .join(cinemas_table, cinemas_table.c.id == showtimes_table.c.cinema_id)
+        .join(movies_table, movies_table.c.id == showtimes_table.c.movie_id)
+        .where(condition)
+    )
+    stmt = insert(archive_table).prefix_with("OR IGNORE").from_select(list(ARCHIVE_FIELDS) + ["archived_at"], rows)
+    return db.execute(stmt).rowcount
+
+
+def prune_past_showtimes(db: Session, cinema=None, before=None, changes=None):
+    """
+    Move showtimes dated before `before` (default: today) to the archive, or
+    delete them with ARCHIVE_SHOWTIMES=false, optionally for one cinema.
+    Returns the number of rows removed from showtimes.
+    """
+    before = before or datetime.date.today().isoformat()
+    condition = showtimes_table.c.date_str < before
+    if cinema is not None:
+        condition = and_(condition, showtimes_table.c.cinema_id == _cinema_id(cinema))
+    if archive_enabled():
+        archive_showtimes(db, condition)
+    return _delete_showtimes(db, showtimes_table.delete().where(condition), changes)
+
+
+def prune_favorites(db: Session):
+    """Remove favorites for movies that no longer have any showtime."""
+    result = db.execute(text(
+        "DELETE FROM favorites WHERE NOT EXISTS ("
+        "SELECT 1 FROM showtimes s JOIN movies m ON m.id = s.movie_id "
+        "WHERE m.title = favorites.movie_title)"
+    ))
+    return result.rowcount
+
+
+def release_movie_sources(db: Session):
+    """
+    Clear the source cinema of movies it no longer shows, so the next cinema
+    synced that does show them takes over their metadata (upsert_movies).
+    """
+    return db.execute(text(
+        "UPDATE movies SET source_cinema_id = NULL WHERE source_cinema_id IS NOT NULL AND NOT EXISTS ("
+        "SELECT 1 FROM showtimes s WHERE s.movie_id = movies.id AND s.cinema_id = movies.source_cinema_id)"
+    )).rowcount
+
+
+def prune_orphans(db: Session):
+    """Remove movies and cinemas that no longer have any showtime, and release stale movie sources."""
+    movies = db.execute(text(
+        "DELETE FROM movies WHERE NOT EXISTS ("
+        "SELECT 1 FROM showtimes s WHERE s.movie_id = movies.id)"
+    )).rowcount
+    release_movie_sources(db)
+    db.execute(text(
+        "DELETE FROM cinemas WHERE NOT EXISTS ("
+        "SELECT 1 FROM showtimes s WHERE s.cinema_id = cinemas.id)"
+    ))
+    return movies
+
+
+def refresh_date_summaries(db: Session):
+    """
+    Recompute the date_summaries table: per date the number of showtimes,
+    movies and cinemas, and the favorites playing. Does not commit.
+    Returns the number of dates.
+    """
+    counts = db.execute(
+        select(
+            showtimes_table.c.date_str,
+            func.count(),
+            func.count(distinct(showtimes_table.c.movie_id)),
+            func.count(distinct(showtimes_table.c.cinema_id)),
+        ).group_by(showtimes_table.c.date_str)
+    ).all()
+    favorites = defaultdict(list)
+    for date_str, title in db.execute(
+        select(showtimes_table.c.date_str, movies_table.c.title)
+        .join(movies_table, movies_table.c.id == showtimes_table.c.movie_id)
+        .join(favorites_table, favorites_table.c.movie_title == movies_table.c.title)
+        .distinct()
+        .order_by(showtimes_table.c.date_str, movies_table.c.title)
+    ):
+        favorites[date_str].append(title)
+
+    now = datetime.datetime.now()
+    db.execute(date_summaries_table.delete())
+    rows = [
+        {
+            "date_str": date_str, "showtimes": showtimes, "movies": movies, "cinemas": cinemas,
+            "favorites": json.dumps(favorites[date_str], ensure_ascii=False), "computed_at": now,
+        }
+        for date_str, showtimes, movies, cinemas in counts
+        if date_str
+    ]
+    if rows:
+        db.execute(insert(date_summaries_table), rows)
+    return len(rows)
+
+
+def sync_cinema(db: Session, cinema_name, showtimes, batch_size=None, changes=None, prune_past=True):
+    """
+    Incrementally sync one cinema's scrape (any iterable of records): upsert
+    in batches, then prune only that cinema's rows within the date range the
+    scrape returned, plus (with `prune_past`) its rows from past days.
+    `cinema_name` may be None to take it from the records. Nothing is pruned
+    if no record was seen.
+    Does not commit; the caller owns the transaction. Row ids are collected
+    in `changes` (a ShowtimeChanges), if given.
+    Stats include the time spent in each phase (sync_seconds, prune_seconds).
+    """
+    started = time.perf_counter()
+    reset_scraped_keys(db)
+    records = iter(showtimes)
+    first = next(records, None)
+    if first is not None:
+        cinema_name = cinema_name or first.cinema_name
+        records = chain([first], records)
+    stats = upsert_batches(db, records, batch_size, changes)
+    synced = time.perf_counter()
+    stats["deleted"] = 0
+    if stats["showtimes"]:
+        stats["deleted"] = prune_showtimes(
+            db, cinema=cinema_name, date_from=stats["date_from"], date_to=stats["date_to"], changes=changes
+        )
+        if prune_past:
+            stats["deleted"] += prune_past_showtimes(db, cinema=cinema_name, changes=changes)
+    stats["sync_seconds"] = synced - started
+    stats["prune_seconds"] = time.perf_counter() - synced
+    return stats
+
+def load_page_states(db: Session):
+    """Load stored page validators as plain dicts keyed by URL."""
+    return {
+        state.url: {
+            "cinema_name": state.cinema_name,
+            "etag": state.etag,
+            "last_modified": state.last_modified,
+            "content_hash": state.content_hash,
+            "parsed_at": state.parsed_at,
+        }
+        for state in db.query(PageState).all()
+    }
+
+
+def is_page_state_current(page_state):
+    """
+    Validators are only trusted on the day the page was parsed, since the
+    listing uses relative dates, and only if the cinema is known.
+    """
+    parsed_at = page_state.get("parsed_at")
+    return bool(
+        page_state.get("cinema_name")
+        and parsed_at
+        and parsed_at.date() == datetime.date.today()
+    )
+
+
+def save_page_states(db: Session, results):
+    """Store validators of freshly parsed pages (ScrapeResult objects)."""
+    now = datetime.datetime.now()
+    for result in results:
+        db.merge(PageState(
+            url=result.url,
+            cinema_name=result.cinema_name,
+            etag=result.etag,
+            last_modified=result.last_modified,
+            content_hash=result.content_hash,
+            parsed_at=now,
+        ))
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+
+# The backend modules read their settings on import, so point them at a
+# throwaway database before any test imports them
+_tmp = tempfile.mkdtemp(prefix="backend-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_tmp}/test.db",
+    DATA_VERSION_FILE=os.path.join(_tmp, "data_version"),
+    API_KEY="test",
+    API_DB_MODE="sync",
+    MOVIE_THEATER_URLS="",
+    MOVIE_DETAILS="false",
+    IMAGE_CACHE_MAX_MB="0",
+    SNAPSHOTS="false",
+    SCRAPE_RECORD_DIR="",
+    SCRAPE_REPLAY_URL="",
+)
+
+
+def reset_database():
+    """Create the schema if needed and delete every row."""
+    import database
+
+    database.init_db()
+    with database.engine.begin() as conn:
+        for table in reversed(database.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+
+@pytest.fixture
+def db():
+    """A session on the test database, emptied before each test."""
+    import database
+
+    reset_database()
+    with database.SessionLocal() as session:
+        yield session
@@ -0,0 +1,110 @@
+"""Showtime archive (sync.prune_past_showtimes, /api/archive): archiving past days once, and exporting them."""
+import csv
+import datetime
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import insert, select
+
+import main
+from database import ArchivedShowtime, Showtime
+from parsers import ScrapedShowtime
+from scraper import ScrapeResult, _sync_incremental, scrape_all
+from sync import prune_past_showtimes, upsert_showtimes
+
+HEADERS = {"X-API-Key": "test"}
+TODAY = datetime.date.today()
+
+
+def record(day, hour, cinema="A", title="Film"):
+    date = TODAY + datetime.timedelta(days=day)
+    return ScrapedShowtime(
+        cinema_name=cinema, movie_title=title, date_str=date.isoformat(),
+        start_time=datetime.datetime.combine(date, datetime.time(hour)), ticket_url=f"/{cinema}/{day}/{hour}",
+    )
+
+
+def archived(db):
+    return db.execute(
+        select(ArchivedShowtime.cinema_name, ArchivedShowtime.start_time, ArchivedShowtime.archived_at)
+        .order_by(ArchivedShowtime.start_time)
+    ).all()
+
+
+def live_days(db):
+    return sorted((start.date() - TODAY).days for start in db.execute(select(Showtime.start_time)).scalars())
+
+
+def test_past_showtimes_are_archived_once(db):
+    upsert_showtimes(db, [record(-2, 20), record(-1, 18), record(-1, 20), record(0, 20)])
+    db.commit()
+    assert prune_past_showtimes(db) == 3
+    db.commit()
+    first = archived(db)
+    assert len(first) == 3 and live_days(db) == [0]
+
+    # The same past showtimes synced again (e.g. an old page) leave the archive as it was
+    upsert_showtimes(db, [record(-1, 18), record(-1, 20)])
+    db.commit()
+    assert prune_past_showtimes(db) == 2
+    db.commit()
+    assert archived(db) == first
+    assert live_days(db) == [0]
+
+
+def test_replay_does_not_archive(db, monkeypatch):
+    upsert_showtimes(db, [record(-1, 20), record(1, 20)])
+    db.commit()
+    monkeypatch.setenv("SCRAPE_REPLAY_URL", "http://127.0.0.1:9")
+
+    # Recorded pages keep their dates: a replayed cinema still shows yesterday
+    result = ScrapeResult("https://a.example/", cinema_name="A", showtimes=[record(-1, 20), record(1, 21)])
+    result.count = 2
+    _sync_incremental(db, [result])
+    scrape_all(urls=[])
+
+    assert archived(db) == []
+    assert live_days(db) == [-1, 1]
+
+    monkeypatch.delenv("SCRAPE_REPLAY_URL")
+    scrape_all(urls=[])
+    db.expire_all()
+    assert [(row.start_time.date() - TODAY).days for row in archived(db)] == [-1]
+    assert live_days(db) == [1]
+
+
+@pytest.fixture
+def archive_rows(db):
+    """Two pages and one row of archived showtimes, many sharing a start time across page boundaries."""
+    starts = [datetime.datetime(2026, 10, 1, 20) + datetime.timedelta(hours=i // 7)
+              for i in range(2 * main.ARCHIVE_PAGE_SIZE + 1)]
+    rows = [
+        {"cinema_name": f"Mozi {i % 7}", "movie_title": f"Film {i}", "start_time": start,
+         "date_str": start.date().isoformat()}
+        for i, start in enumerate(starts)
+    ]
+    db.execute(insert(ArchivedShowtime), rows)
+    db.commit()
+    return db.execute(
+        select(ArchivedShowtime.id).order_by(ArchivedShowtime.start_time, ArchivedShowtime.id)
+    ).scalars().all()
+
+
+def test_archive_ndjson_streams_every_row_once(db, archive_rows):
+    with TestClient(main.app) as client:
+        response = client.get("/api/archive", headers=HEADERS)
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["id"] for line in lines] == archive_rows
+    assert lines[0]["cinema_name"] == "Mozi 0" and lines[0]["start_time"] == "2026-10-01T20:00:00"
+
+
+def test_archive_csv_streams_every_row_once(db, archive_rows):
+    with TestClient(main.app) as client:
+        response = client.get("/api/archive", params={"format": "csv"}, headers=HEADERS)
+    assert response.status_code == 200
+    header, *rows = list(csv.reader(io.StringIO(response.text)))
+    assert header[0] == "id" and len(header) == len(rows[0])
+    assert [int(row[0]) for row in rows] == archive_rows
@@ -0,0 +1,109 @@
+"""
+Scraper benchmarks (pytest-benchmark) on synthetic pages (benchmarks/synthetic.py)
+at 1x, 10x and 100x the size of a real cinema page: parse throughput per
+parser backend, the per-row field extraction, and a replayed scrape_all
+(fetch, parse, sync) with the size of the resulting database.
+
+The 10x and 100x cases are marked slow and only run when selected:
+    python -m pytest tests/test_benchmarks.py -m slow
+Pass --benchmark-skip to run only the other tests.
+"""
+import datetime
+import os
+from functools import lru_cache
+
+import pytest
+
+import database
+from bench_extraction import baseline_extract, context_extract, make_rows
+from bench_scrape_pipeline import write_recordings
+from conftest import reset_database
+from parsers import PARSER_BACKENDS, SHOWTIME_FIELDS, parse_cinema_page
+from replay import ReplayServer
+from synthetic import make_page
+
+SCALES = [1, pytest.param(10, marks=pytest.mark.slow), pytest.param(100, marks=pytest.mark.slow)]
+TODAY = datetime.date.today()
+URL = "https://cinema.example"
+CINEMAS = 4
+
+
+def records(showtimes):
+    return sorted(tuple(getattr(st, f) for f in SHOWTIME_FIELDS) for st in showtimes)
+
+
+@lru_cache(maxsize=None)
+def reference(scale):
+    """The synthetic page of a scale and its showtimes as parsed by the bs4 backend."""
+    html = make_page(TODAY, scale=scale)
+    return html, records(parse_cinema_page(html, URL, "bs4", today=TODAY))
+
+
+@pytest.mark.parametrize("backend", PARSER_BACKENDS)
+@pytest.mark.parametrize("scale", SCALES)
+def test_parse_throughput(benchmark, scale, backend):
+    html, expected = reference(scale)
+    showtimes = benchmark(parse_cinema_page, html, URL, backend, today=TODAY)
+    assert len(showtimes) == 392 * scale
+    assert records(showtimes) == expected
+    benchmark.extra_info["page_bytes"] = len(html.encode("utf-8"))
+    benchmark.extra_info["showtimes_per_sec"] = len(showtimes) / benchmark.stats.stats.mean
+
+
+@pytest.mark.parametrize("scale", SCALES)
+def test_extraction(benchmark, scale, monkeypatch):
+    monkeypatch.setenv("SKIP_MOVIE_KEYWORDS", "Film 3 ,keyword1,keyword2")
+    rows = make_rows(TODAY, scale)
+    found = benchmark(context_extract, rows, "Sample Mozi", TODAY)
+    # ExtractionContext must produce what the extraction before it did
+    assert records(found) == records(baseline_extract(rows, "Sample Mozi"))
+
+
+@pytest.fixture
+def recordings(tmp_path, monkeypatch):
+    """A replay server for CINEMAS synthetic pages; yields a function writing them at a scale."""
+    def write(scale, variant=0):
+        directory = tmp_path / f"scale{scale}-{variant}"
+        urls = write_recordings(str(directory), TODAY, CINEMAS, scale, variant)
+        monkeypatch.setenv("MOVIE_THEATER_URLS", ",".join(urls))
+        return str(directory)
+    return write
+
+
+def replay_scrape(directory):
+    from scraper import scrape_all
+
+    with ReplayServer(directory) as server:
+        os.environ["SCRAPE_REPLAY_URL"] = server.url
+        try:
+            return scrape_all()
+        finally:
+            os.environ["SCRAPE_REPLAY_URL"] = ""
+
+
+def database_bytes():
+    path = database.engine.url.database
+    return sum(os.path.getsize(p) for p in (path, f"{path}-wal") if os.path.exists(p))
+
+
+@pytest.mark.parametrize("scale", SCALES)
+def test_scrape_pipeline_initial(benchmark, scale, recordings):
+    directory = recordings(scale)
+    totals = benchmark.pedantic(replay_scrape, args=(directory,), setup=reset_database, rounds=3)
+    assert totals["inserted"] == totals["showtimes"] == 392 * scale * CINEMAS
+    benchmark.extra_info.update(
+        sync_seconds=totals["sync_seconds"], parse_seconds=totals["parse_seconds"], db_bytes=database_bytes(),
+    )
+
+
+@pytest.mark.parametrize("scale", SCALES)
+def test_scrape_pipeline_changed(benchmark, scale, recordings):
+    base, changed = recordings(scale), recordings(scale, variant=1)
+
+    def seed():
+        reset_database()
+        replay_scrape(base)
+
+    totals = benchmark.pedantic(replay_scrape, args=(changed,), setup=seed, rounds=3)
+    assert 0 < totals["inserted"] == totals["deleted"] < totals["showtimes"]
+    benchmark.extra_info.update(sync_seconds=totals["sync_seconds"], db_bytes=database_bytes())
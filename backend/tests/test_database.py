@@ -0,0 +1,96 @@
+"""Schema setup (database.py): migrating the legacy flat showtimes table."""
+import datetime
+
+import pytest
+from sqlalchemy import text
+
+import database
+from conftest import reset_database
+
+LEGACY_COLUMNS = (
+    "id", "cinema_name", "movie_title", "start_time", "date_str", "ticket_url", "movie_url", "poster_url",
+    "genre", "age_restriction", "age_restriction_url", "details_type",
+)
+
+
+def legacy_row(id, cinema, title, day, **fields):
+    start = datetime.datetime(2026, 10, day, 20)
+    return dict(dict.fromkeys(LEGACY_COLUMNS), id=id, cinema_name=cinema, movie_title=title, start_time=start,
+                date_str=start.date().isoformat(), ticket_url=f"/jegy/{id}", **fields)
+
+
+def create_legacy_table(rows):
+    """Replace the schema with the old layout: one showtimes table with the metadata on every row."""
+    database.Base.metadata.drop_all(database.engine)
+    with database.engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE showtimes ({', '.join(LEGACY_COLUMNS)})"))
+        conn.execute(text("CREATE INDEX ix_showtimes_movie_title ON showtimes (movie_title)"))
+        conn.execute(text(
+            f"INSERT INTO showtimes VALUES ({', '.join(f':{column}' for column in LEGACY_COLUMNS)})"
+        ), rows)
+
+
+def dump(conn):
+    movies = conn.execute(text(
+        "SELECT title, movie_url, poster_url, genre, age_restriction, age_restriction_url FROM movies ORDER BY title"
+    )).all()
+    showtimes = conn.execute(text(
+        "SELECT s.id, c.name, m.title, s.date_str, s.ticket_url FROM showtimes s "
+        "JOIN cinemas c ON c.id = s.cinema_id JOIN movies m ON m.id = s.movie_id ORDER BY s.id"
+    )).all()
+    return [tuple(row) for row in movies], [tuple(row) for row in showtimes]
+
+
+@pytest.fixture
+def legacy_rows():
+    rows = [
+        legacy_row(1, "A", "Dűne", 1, movie_url="/film/dune-old", poster_url="/img/dune.jpg", genre="sci-fi",
+                   age_restriction="12"),
+        legacy_row(2, "B", "Dűne", 2, movie_url="/film/dune", age_restriction_url="/ages/12.png"),
+        # The newest row of a title lacks some metadata the older rows have
+        legacy_row(3, "A", "Dűne", 3),
+        legacy_row(4, "B", "Kis Vuk", 3, genre="animáció"),
+        # Duplicate natural key of row 4
+        legacy_row(5, "B", "Kis Vuk", 3, genre="mese"),
+    ]
+    yield rows
+    reset_database()
+
+
+def test_legacy_metadata_is_the_newest_non_null_value(legacy_rows):
+    create_legacy_table(legacy_rows)
+    database.init_db()
+
+    with database.engine.connect() as conn:
+        movies, showtimes = dump(conn)
+        assert movies == [
+            ("Dűne", "/film/dune", "/img/dune.jpg", "sci-fi", "12", "/ages/12.png"),
+            ("Kis Vuk", None, None, "mese", None, None),
+        ]
+        assert showtimes == [
+            (1, "A", "Dűne", "2026-10-01", "/jegy/1"),
+            (2, "B", "Dűne", "2026-10-02", "/jegy/2"),
+            (3, "A", "Dűne", "2026-10-03", "/jegy/3"),
+            (4, "B", "Kis Vuk", "2026-10-03", "/jegy/4"),
+        ]
+        assert not conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'showtimes_legacy'")).first()
+
+
+def test_migration_can_run_again(legacy_rows):
+    create_legacy_table(legacy_rows)
+    database.init_db()
+    with database.engine.connect() as conn:
+        migrated = dump(conn)
+
+    # Nothing left to migrate
+    database.init_db()
+    # A migration interrupted after its rows were copied starts over from the legacy table
+    with database.engine.begin() as conn:
+        conn.execute(text(f"CREATE TABLE showtimes_legacy ({', '.join(LEGACY_COLUMNS)})"))
+        conn.execute(text(
+            f"INSERT INTO showtimes_legacy VALUES ({', '.join(f':{column}' for column in LEGACY_COLUMNS)})"
+        ), legacy_rows)
+    database.init_db()
+
+    with database.engine.connect() as conn:
+        assert dump(conn) == migrated
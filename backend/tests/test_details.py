@@ -0,0 +1,68 @@
+"""Movie details (details.py): each source parse_detail_page falls back to, and the cache cleanup."""
+import datetime
+import os
+
+import pytest
+from sqlalchemy import insert, select
+
+from database import Movie, MovieDetail
+from details import enrich_movies, parse_detail_page, parse_runtime
+from sync import CHUNK_SIZE
+
+FIXTURE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def parse_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, name), "rb") as f:
+        return parse_detail_page(f.read())
+
+
+def test_json_ld():
+    # JSON-LD wins over the "Játékidő" line and the meta description
+    assert parse_fixture("details_json_ld.html") == {
+        "original_title": "Dune: Part Two",
+        "runtime_minutes": 166,
+        "synopsis": "Paul Atreides egyesül Chanival és a fremenekkel.",
+        "cast": ["Timothée Chalamet", "Zendaya"],
+    }
+
+
+def test_label_lines():
+    # Values on the label's line or in the next element
+    assert parse_fixture("details_labels.html") == {
+        "original_title": "Little Fox",
+        "runtime_minutes": 85,
+        "synopsis": "Vuk, a kis róka, egy napon elveszíti a családját.",
+        "cast": ["Hámori Gabriella", "Szabó Sipos Barnabás", "Kerekes József"],
+    }
+
+
+def test_meta_description():
+    assert parse_fixture("details_meta.html") == {
+        "original_title": None,
+        "runtime_minutes": 95,
+        "synopsis": "Lali büféje a Balaton mellett.",
+        "cast": None,
+    }
+
+
+@pytest.mark.parametrize("value, minutes", [
+    ("120 perc", 120), ("1 óra 50 perc", 110), ("2h", 120), ("PT1H50M", 110), ("PT90M", 90), ("95", 95),
+    ("", None), ("hosszú", None),
+])
+def test_parse_runtime(value, minutes):
+    assert parse_runtime(value) == minutes
+
+
+def test_enrich_forgets_unused_urls(db, monkeypatch):
+    monkeypatch.setenv("MOVIE_DETAILS", "true")
+    now = datetime.datetime.now()
+    db.execute(insert(Movie), [{"title": "Kis Vuk", "movie_url": "https://a.example/film/0"}])
+    db.execute(insert(MovieDetail), [
+        {"movie_url": f"https://a.example/film/{i}", "fetched_at": now} for i in range(2 * CHUNK_SIZE + 1)
+    ])
+    db.commit()
+
+    stats = enrich_movies(db)
+    assert (stats["details_hit"], stats["details_fetched"]) == (1, 0)
+    assert db.execute(select(MovieDetail.movie_url)).scalars().all() == ["https://a.example/film/0"]
@@ -0,0 +1,59 @@
+"""Change stream (events.py, /api/events): waking on data changes and recording only real changes."""
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+
+import main
+from cache import bump_data_version, response_cache
+from database import ChangeEvent
+
+HEADERS = {"X-API-Key": "test"}
+
+
+@pytest.fixture
+def client(db):
+    with TestClient(main.app) as client:
+        yield client
+
+
+@pytest.fixture
+def fresh_watcher(monkeypatch):
+    """Each asyncio.run() is a new event loop, so start the version watcher anew."""
+    monkeypatch.setattr(main, "_version_changed", None)
+    monkeypatch.setattr(main, "_version_watcher", None)
+
+
+def test_wait_for_change_returns_at_once_after_an_earlier_bump(fresh_watcher):
+    async def wait():
+        seen = response_cache.version
+        # Changed after the stream read its data, before it started waiting
+        bump_data_version()
+        started = time.perf_counter()
+        assert await main.wait_for_change(seen, 5)
+        return time.perf_counter() - started
+
+    assert asyncio.run(wait()) < main.EVENT_POLL_SECONDS
+
+
+def test_wait_for_change_times_out_without_a_bump(fresh_watcher):
+    async def wait():
+        return await main.wait_for_change(response_cache.version, 0.1)
+
+    assert asyncio.run(wait()) is False
+
+
+def test_favorite_events_only_for_real_changes(client, db):
+    assert client.post("/api/favorites", json={"movie_title": "Dűne"}, headers=HEADERS).status_code == 200
+    assert client.post("/api/favorites", json={"movie_title": "Dűne"}, headers=HEADERS).status_code == 200
+    assert client.delete("/api/favorites/Kis Vuk", headers=HEADERS).status_code == 200
+    assert client.delete("/api/favorites/Dűne", headers=HEADERS).status_code == 200
+    assert client.delete("/api/favorites/Dűne", headers=HEADERS).status_code == 200
+
+    events = db.execute(select(ChangeEvent.kind, ChangeEvent.payload).order_by(ChangeEvent.id)).all()
+    assert [tuple(event) for event in events] == [
+        ("favorites", '{"added":["Dűne"]}'),
+        ("favorites", '{"removed":["Dűne"]}'),
+    ]
@@ -0,0 +1,67 @@
+"""
+Golden-output tests (run from the backend directory with python -m pytest).
+
+The parser test is benchmarks/golden.py as a pytest: every fixture is
+parsed by every parser backend. The replay test scrapes the same fixture
+end to end through replay.py (fetch, parse, sync into a throwaway
+database) twice, the second run getting 304s, and compares the stored
+showtimes with the fixture's golden file.
+"""
+import glob
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from golden import FIXTURE_DIR, FIELDS, extract
+from parsers import PARSER_BACKENDS
+from replay import GOLDEN_FIELDS, INDEX_FILE, page_slug
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = sorted(
+    os.path.basename(path)[:-len(".golden.json")] for path in glob.glob(os.path.join(FIXTURE_DIR, "*.golden.json"))
+)
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURE_DIR, f"{name}.html"), encoding="utf-8") as f:
+        html = f.read()
+    with open(os.path.join(FIXTURE_DIR, f"{name}.golden.json"), encoding="utf-8") as f:
+        golden = json.load(f)
+    return html, golden
+
+
+@pytest.mark.parametrize("backend", PARSER_BACKENDS)
+@pytest.mark.parametrize("name", FIXTURES)
+def test_parser_matches_golden(name, backend):
+    html, golden = load_fixture(name)
+    found = extract(html, golden["url"], golden["today"], backend)
+    assert sorted(map(tuple, found)) == sorted(map(tuple, golden["showtimes"]))
+
+
+@pytest.mark.parametrize("name", FIXTURES)
+def test_replay_matches_golden(name, tmp_path):
+    html, golden = load_fixture(name)
+    recordings = tmp_path / "recordings"
+    recordings.mkdir()
+    slug = page_slug(golden["url"])
+    (recordings / f"{slug}.html").write_text(html, encoding="utf-8")
+    (recordings / INDEX_FILE).write_text(json.dumps(
+        {golden["url"]: {"file": f"{slug}.html", "recorded_at": golden["today"]}}
+    ))
+    # The stored columns of the parser golden, in replay.py's golden format
+    columns = [FIELDS.index(field) for field in ("cinema_name", "movie_title") + GOLDEN_FIELDS[2:]]
+    (tmp_path / "replay.golden.json").write_text(json.dumps({
+        "fields": GOLDEN_FIELDS, "showtimes": [[row[i] for i in columns] for row in golden["showtimes"]],
+    }, ensure_ascii=False), encoding="utf-8")
+
+    env = {key: value for key, value in os.environ.items() if not key.startswith("SCRAPE_")}
+    result = subprocess.run(
+        [sys.executable, os.path.join(BACKEND_DIR, "replay.py"), str(recordings),
+         "--repeat", "2", "--golden", str(tmp_path / "replay.golden.json")],
+        cwd=tmp_path, env=env, capture_output=True, text=True,
+    )
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Matches golden output." in result.stdout
@@ -0,0 +1,28 @@
+"""Thumbnail cache (images.py): linking movies to cached images and forgetting unused URLs."""
+import datetime
+
+import pytest
+from sqlalchemy import insert, select
+
+from database import CachedImage, Movie
+from images import cache_images, images_enabled
+from sync import CHUNK_SIZE
+
+pytestmark = pytest.mark.skipif(not images_enabled({"max_bytes": 1}), reason="Pillow is not installed")
+
+
+def test_cache_forgets_unused_urls_and_links_movies(db, monkeypatch, tmp_path):
+    monkeypatch.setenv("IMAGE_CACHE_MAX_MB", "1")
+    monkeypatch.setenv("IMAGE_CACHE_DIR", str(tmp_path))
+    now = datetime.datetime.now()
+    poster = "https://a.example/img/0.jpg"
+    db.execute(insert(Movie), [{"title": "Kis Vuk", "poster_url": poster}])
+    db.execute(insert(CachedImage), [
+        {"url": f"https://a.example/img/{i}.jpg", "digest": f"{i:032x}", "fetched_at": now}
+        for i in range(2 * CHUNK_SIZE + 1)
+    ])
+    db.commit()
+
+    assert cache_images(db) == (0, 1)
+    assert db.execute(select(CachedImage.url)).scalars().all() == [poster]
+    assert db.execute(select(Movie.poster_image)).scalar() == f"{0:032x}"
@@ -0,0 +1,106 @@
+"""Scrape job queue (jobs.py): deduplication, widening and follow-up full scrapes."""
+import datetime
+import time
+
+from sqlalchemy import event, select, update
+
+import database
+import jobs
+from database import ScrapeJob
+from jobs import (
+    ACTIVE, FOLLOW_UP, JobProgress, claim_next_job, enqueue_scrape, fail_stale_jobs, finish_job, job_urls,
+)
+
+
+def active_jobs(db):
+    """{active slot: job id} of the queued or running jobs."""
+    jobs = db.execute(select(ScrapeJob).where(ScrapeJob.active.is_not(None))).scalars()
+    return {job.active: job.id for job in jobs}
+
+
+def test_full_trigger_claimed_while_widening_queues_follow_up(db):
+    partial_id, _ = enqueue_scrape("schedule", urls=["https://a.example/"])
+    claimed = {}
+
+    # A worker claims the partial job between the SELECT and the widening UPDATE
+    def claim_first(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("UPDATE scrape_jobs SET urls") and not claimed:
+            claimed["id"] = claim_next_job()
+            claimed["urls"] = job_urls(claimed["id"])
+
+    event.listen(database.engine, "before_cursor_execute", claim_first)
+    try:
+        job_id, created = enqueue_scrape("api")
+    finally:
+        event.remove(database.engine, "before_cursor_execute", claim_first)
+
+    assert claimed == {"id": partial_id, "urls": ["https://a.example/"]}
+    assert created and job_id != partial_id
+    assert job_urls(partial_id) == ["https://a.example/"]
+    assert active_jobs(db)[FOLLOW_UP] == job_id
+    assert job_urls(job_id) is None
+
+
+def test_repeated_full_triggers_get_the_same_job(db):
+    first = enqueue_scrape("api")
+    assert first[1]
+    assert enqueue_scrape("api") == (first[0], False)
+    assert enqueue_scrape("schedule", urls=["https://a.example/"]) == (first[0], False)
+    assert active_jobs(db) == {ACTIVE: first[0]}
+
+
+def test_full_trigger_widens_queued_partial_job(db):
+    partial_id, _ = enqueue_scrape("schedule", urls=["https://a.example/"])
+    assert enqueue_scrape("api") == (partial_id, False)
+    assert job_urls(partial_id) is None
+    assert claim_next_job() == partial_id
+
+
+def test_full_trigger_follows_running_partial_job(db):
+    partial_id, _ = enqueue_scrape("schedule", urls=["https://a.example/"])
+    assert claim_next_job() == partial_id
+
+    follow_up_id, created = enqueue_scrape("api")
+    assert created and follow_up_id != partial_id
+    assert enqueue_scrape("api") == (follow_up_id, False)
+    assert job_urls(partial_id) == ["https://a.example/"]
+    # The follow-up waits for the running job
+    assert claim_next_job() is None
+
+    finish_job(partial_id)
+    assert active_jobs(db) == {ACTIVE: follow_up_id}
+    assert claim_next_job() == follow_up_id
+    assert job_urls(follow_up_id) is None
+
+
+def test_stale_running_job_fails_and_releases_active(db):
+    job_id, _ = enqueue_scrape("api")
+    assert claim_next_job() == job_id
+    assert fail_stale_jobs() == 0
+
+    db.execute(update(ScrapeJob).where(ScrapeJob.id == job_id).values(
+        heartbeat_at=datetime.datetime.now() - datetime.timedelta(hours=1)
+    ))
+    db.commit()
+    assert fail_stale_jobs() == 1
+
+    job = db.get(ScrapeJob, job_id)
+    db.refresh(job)
+    assert (job.status, job.active, job.error) == ("failed", None, "Worker stopped responding")
+    new_id, created = enqueue_scrape("api")
+    assert created and new_id != job_id
+
+
+def test_progress_keeps_heartbeat_between_callbacks(db, monkeypatch):
+    monkeypatch.setattr(jobs, "get_stale_after", lambda: 0.2)
+    job_id, _ = enqueue_scrape("api")
+    assert claim_next_job() == job_id
+    old = datetime.datetime.now() - datetime.timedelta(hours=1)
+
+    with JobProgress(job_id, ["https://a.example/"]):
+        # A long phase without progress callbacks (details, thumbnails, snapshots)
+        db.execute(update(ScrapeJob).where(ScrapeJob.id == job_id).values(heartbeat_at=old))
+        db.commit()
+        time.sleep(0.3)
+
+    assert db.execute(select(ScrapeJob.heartbeat_at).where(ScrapeJob.id == job_id)).scalar() > old
@@ -0,0 +1,71 @@
+"""Title search (search.py): match kinds, their ranking and the short prefix shortcut."""
+import random
+
+from bench_search import make_titles
+from parsers import fold_title
+from search import EXACT, FUZZY, PREFIX, WORDS, TitleIndex
+
+TITLES = [
+    "Dűne",
+    "Dűne: Második rész",
+    "A dűne gyermekei",
+    "Duna mentén",
+    "Üvegtigris",
+    "Üvegtigris 2",
+    "A kis hableány",
+    "Kis Vuk",
+]
+
+
+def make_index(titles=TITLES):
+    return TitleIndex([(i, title, None, None) for i, title in enumerate(titles)])
+
+
+def ranked(index, query, **kwargs):
+    """[(title, match)] of a search, best first."""
+    return [(row[1], match) for row, _, match in index.search(query, **kwargs)]
+
+
+def test_exact_then_prefix_then_words_then_fuzzy():
+    assert ranked(make_index(), "dune") == [
+        ("Dűne", EXACT),
+        ("Dűne: Második rész", PREFIX),
+        ("A dűne gyermekei", WORDS),
+        ("Duna mentén", FUZZY),
+    ]
+
+
+def test_prefix_ranks_shorter_titles_first():
+    assert ranked(make_index(), "uveg") == [("Üvegtigris", PREFIX), ("Üvegtigris 2", PREFIX)]
+
+
+def test_words_match_word_prefixes_in_any_order():
+    assert ranked(make_index(), "vuk ki") == [("Kis Vuk", WORDS)]
+    assert ranked(make_index(), "kis hab") == [("A kis hableány", WORDS)]
+    assert ranked(make_index(), "kis kis") == [("Kis Vuk", WORDS), ("A kis hableány", WORDS)]
+
+
+def test_fuzzy_matches_typos_ranked_by_similarity():
+    index = make_index()
+    assert ranked(index, "uvegtigirs") == [("Üvegtigris", FUZZY), ("Üvegtigris 2", FUZZY)]
+    assert ranked(index, "hablany kis") == [("A kis hableány", FUZZY)]
+    assert ranked(index, "hablany kis", fuzzy=False) == []
+    [(row, score, match)] = index.search("masodk dunne")
+    assert (row[1], match) == ("Dűne: Második rész", FUZZY) and 0.5 < score < 1
+
+
+def test_limit():
+    index = make_index()
+    assert ranked(index, "dune", limit=2) == [("Dűne", EXACT), ("Dűne: Második rész", PREFIX)]
+    assert index.search("dune", limit=0) == []
+    assert index.search("  ") == []
+
+
+def test_short_prefixes_match_the_binary_search():
+    index = make_index(make_titles(2000, random.Random(0)))
+    for query in ["a", "k", "ko", "őz", "zz"]:
+        for limit in (1, 20, 100, 101):
+            expected = sorted(i for i, key in enumerate(index.keys) if key.startswith(fold_title(query)))[:limit]
+            found = [index.rows.index(row) for row, _, match in index.search(query, limit, fuzzy=False)
+                     if match in (EXACT, PREFIX)]
+            assert found == expected
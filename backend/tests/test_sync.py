@@ -0,0 +1,104 @@
+"""Incremental sync (sync.py): what a cinema's scrape prunes and what it leaves alone."""
+import datetime
+
+from sqlalchemy import select
+
+from database import Cinema, Showtime
+from parsers import ScrapedShowtime
+from scraper import ScrapeResult, _sync_incremental
+from sync import ShowtimeChanges, prune_showtimes, sync_cinema, upsert_showtimes
+
+TODAY = datetime.date.today()
+
+
+def record(cinema, day, hour, title="Film"):
+    """A scraped showtime `day` days from today."""
+    date = TODAY + datetime.timedelta(days=day)
+    return ScrapedShowtime(
+        cinema_name=cinema, movie_title=title, date_str=date.isoformat(),
+        start_time=datetime.datetime.combine(date, datetime.time(hour)), ticket_url=f"/{cinema}/{day}/{hour}",
+    )
+
+
+def stored(db):
+    """{(cinema, day, hour)} of the showtimes in the database."""
+    rows = db.execute(
+        select(Cinema.name, Showtime.start_time)
+        .join(Cinema, Cinema.id == Showtime.cinema_id)
+    )
+    return {(name, (start.date() - TODAY).days, start.hour) for name, start in rows}
+
+
+def seed(db, *records):
+    upsert_showtimes(db, records)
+    db.commit()
+    return stored(db)
+
+
+def test_empty_scrape_leaves_cinema_untouched(db):
+    before = seed(db, record("A", -1, 20), record("A", 0, 20), record("A", 1, 20))
+    stats = sync_cinema(db, "A", [])
+    db.commit()
+    assert stats["deleted"] == 0
+    assert stored(db) == before
+
+
+def test_failed_or_empty_cinemas_keep_their_rows(db):
+    before = seed(db, record("A", 0, 20), record("B", 0, 20), record("C", 0, 20))
+
+    def breaks_midway():
+        yield record("C", 0, 21)
+        raise RuntimeError("connection reset")
+
+    results = [
+        ScrapeResult("https://a.example/", cinema_name="A", failed=True),
+        ScrapeResult("https://b.example/", cinema_name="B"),
+        ScrapeResult("https://c.example/", cinema_name="C", showtimes=breaks_midway()),
+    ]
+    assert _sync_incremental(db, results)["errors"] == 2
+    assert [result.status for result in results] == ["failed", "empty", "failed"]
+    assert stored(db) == before
+
+
+def test_prunes_scraped_date_range_and_past_days_only(db):
+    seed(
+        db,
+        record("A", -2, 20), record("A", -1, 20),
+        record("A", 0, 18), record("A", 1, 18), record("A", 1, 20), record("A", 2, 18), record("A", 3, 18),
+        record("B", -1, 20), record("B", 1, 18),
+    )
+    changes = ShowtimeChanges()
+    stats = sync_cinema(db, "A", [record("A", 1, 20), record("A", 2, 21)], changes=changes)
+    db.commit()
+
+    assert stored(db) == {
+        # Outside the scraped days 1-2
+        ("A", 0, 18), ("A", 3, 18),
+        # Scraped
+        ("A", 1, 20), ("A", 2, 21),
+        # Another cinema, also in the past
+        ("B", -1, 20), ("B", 1, 18),
+    }
+    assert (stats["inserted"], stats["unchanged"], stats["deleted"]) == (1, 1, 4)
+    assert len(changes.deleted) == 4 and len(changes.inserted) == 1
+
+
+def test_prune_without_past_days(db):
+    seed(db, record("A", -1, 20), record("A", 1, 18))
+    sync_cinema(db, "A", [record("A", 1, 20)], prune_past=False)
+    db.commit()
+    assert stored(db) == {("A", -1, 20), ("A", 1, 20)}
+
+
+def test_anti_join_deletes_exactly_the_missing_keys(db):
+    seed(db, *(record(cinema, day, hour) for cinema in "AB" for day in range(3) for hour in (18, 20)))
+    rows = db.execute(select(Showtime.id, Cinema.name, Showtime.cinema_id, Showtime.movie_id, Showtime.start_time)
+                      .join(Cinema, Cinema.id == Showtime.cinema_id)).all()
+    keep = {row.id: (row.cinema_id, row.movie_id, row.start_time) for row in rows if row.start_time.hour == 18}
+    missing_a = {row.id for row in rows if row.id not in keep and row.name == "A"}
+
+    changes = ShowtimeChanges()
+    assert prune_showtimes(db, keys=set(keep.values()), keep_cinemas=["B"], changes=changes) == len(missing_a)
+    db.commit()
+    assert changes.deleted == missing_a
+    assert set(db.execute(select(Showtime.id)).scalars()) == {row.id for row in rows} - missing_a
@@ -0,0 +1,109 @@
+"""
+Standalone scraper worker.
+
+Runs queued scrape jobs (see jobs.py) one at a time, outside the API
+process, and queues scheduled scrapes: with SCRAPE_SCHEDULE=adaptive
+(default) the cinemas whose next check is due (see schedule.py), with
+SCRAPE_SCHEDULE=daily all cinemas at 7:00. The API only enqueues jobs
+through POST /api/scrape and reports their progress.
+
+Usage (from the backend directory):
+    python worker.py          # run until stopped
+    python worker.py --once   # queue a scrape, run it, exit
+"""
+import argparse
+import datetime
+import logging
+import signal
+import threading
+
+from apscheduler.schedulers.background import BackgroundScheduler
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from config import env_float
+from database import init_db, SessionLocal
+from jobs import enqueue_scrape, claim_next_job, finish_job, job_urls, JobProgress
+from schedule import get_schedule_mode, get_schedule_settings, due_urls
+from scraper import scrape_all, get_cinema_urls
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def run_job(job_id):
+    logger.info(f"Starting scrape job {job_id}")
+    try:
+        urls = job_urls(job_id)
+        with JobProgress(job_id, urls or get_cinema_urls()) as progress:
+            totals = scrape_all(progress=progress, urls=urls)
+    except Exception as e:
+        finish_job(job_id, error=str(e) or type(e).__name__)
+        return
+    if totals is None:
+        finish_job(job_id, error="No cinema was scraped successfully")
+    else:
+        finish_job(job_id, stats=totals)
+    logger.info(f"Finished scrape job {job_id}")
+
+def run_pending():
+    """Run queued jobs until the queue is empty."""
+    while True:
+        job_id = claim_next_job()
+        if job_id is None:
+            return
+        run_job(job_id)
+
+def enqueue_due():
+    """Queue a scrape of the cinemas whose adaptive schedule is due."""
+    with SessionLocal() as db:
+        urls = due_urls(db, get_cinema_urls())
+    if urls:
+        enqueue_scrape(trigger="schedule", urls=urls)
+
+def run_worker(stop_event, schedule=True):
+    """Poll the queue until `stop_event` is set, optionally queueing scheduled scrapes."""
+    poll_interval = max(0.5, env_float("SCRAPE_WORKER_POLL", 2.0))
+    scheduler = None
+    if schedule:
+        scheduler = BackgroundScheduler()
+        if get_schedule_mode() == "adaptive":
+            tick = get_schedule_settings()["tick"]
+            scheduler.add_job(enqueue_due, 'interval', seconds=tick, next_run_time=datetime.datetime.now())
+            logger.info(f"Scheduler started. Checking for due cinemas every {tick:.0f}s.")
+        else:
+            # Schedule scraping daily at 7:00 AM
+            scheduler.add_job(enqueue_scrape, 'cron', hour=7, minute=0, kwargs={"trigger": "schedule"})
+            logger.info("Scheduler started. Scraping job set for 7:00 AM daily.")
+        scheduler.start()
+
+    try:
+        while not stop_event.is_set():
+            try:
+                run_pending()
+            except Exception as e:
+                logger.error(f"Worker loop error: {e}")
+            stop_event.wait(poll_interval)
+    finally:
+        if scheduler is not None:
+            scheduler.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scraper worker")
+    parser.add_argument("--once", action="store_true", help="queue a scrape, run it and exit")
+    args = parser.parse_args()
+
+    init_db()
+    if args.once:
+        enqueue_scrape(trigger="cli")
+        run_pending()
+        return
+
+    stop_event = threading.Event()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, lambda *_: stop_event.set())
+    logger.info("Scraper worker started")
+    run_worker(stop_event)
+
+if __name__ == "__main__":
+    main()
@@ -2,7 +2,10 @@
 "use client";
 
 import React, { useEffect, useState, useMemo, useCallback } from 'react';
-import api, { getFavorites, addFavorite, removeFavorite, getStatus, triggerScrape } from '@/lib/api';
+import api, {
+  getFavorites, addFavorite, removeFavorite, getStatus, triggerScrape, getScrapeJob, getDateSummary,
+  getShowtimesByIds, subscribeToChanges
+} from '@/lib/api';
 import { logout } from '@/app/actions/auth';
 import DateTabs from '@/components/DateTabs';
 import MovieListRow from '@/components/MovieListRow';
@@ -24,15 +27,26 @@ interface Showtime {
   age_restriction: string | null;
   age_restriction_url: string | null;
   details_type: string | null;
+  poster_image: string | null;
+  age_restriction_image: string | null;
 }
 
 interface Favorite {
   movie_title: string;
 }
 
+interface DateSummary {
+  date: string;
+  showtimes: number;
+  movies: number;
+  cinemas: number;
+  favorites: string[];
+}
+
 export default function Home() {
   const { dict } = useTranslation();
   const [showtimes, setShowtimes] = useState<Showtime[]>([]);
+  const [dateSummary, setDateSummary] = useState<DateSummary[]>([]);
   const [favorites, setFavorites] = useState<Set<string>>(new Set());
   const [loading, setLoading] = useState(true);
 
@@ -46,10 +60,19 @@ export default function Home() {
   useEffect(() => {
     const fetchData = async () => {
       try {
+        // The small per-date summary arrives first, so the date tabs render before the showtime list
+        const summaryPromise = getDateSummary().then((summary: DateSummary[]) => {
+          setDateSummary(summary);
+          if (summary.length > 0) {
+            setSelectedDate(prev => prev ?? summary[0].date);
+          }
+        }).catch(error => console.error("Failed to fetch date summary", error));
+
         const [showtimesRes, favoritesRes, statusRes] = await Promise.all([
           api.get<Showtime[]>('/movies'),
           getFavorites(),
-          getStatus()
+          getStatus(),
+          summaryPromise
         ]);
 
         setShowtimes(showtimesRes.data);
@@ -60,9 +83,9 @@ export default function Home() {
         if (showtimesRes.data.length > 0) {
           // Find earliest unique date
           const sorted = [...showtimesRes.data].sort((a, b) => new Date(a.date_str).getTime() - new Date(b.date_str).getTime());
-          setSelectedDate(sorted[0].date_str);
+          setSelectedDate(prev => prev ?? sorted[0].date_str);
         } else {
-          setSelectedDate(format(new Date(), 'yyyy-MM-dd'));
+          setSelectedDate(prev => prev ?? format(new Date(), 'yyyy-MM-dd'));
         }
       } catch (error) {
         console.error("Failed to fetch data", error);
@@ -73,6 +96,40 @@ export default function Home() {
     fetchData();
   }, []);
 
+  // Apply the backend's change events as they happen instead of refetching everything
+  useEffect(() => {
+    const refreshSummary = async () => {
+      const [summary, statusRes] = await Promise.all([getDateSummary(), getStatus()]);
+      setDateSummary(summary);
+      setLastScraped(statusRes.last_scrape_time);
+    };
+
+    return subscribeToChanges(async (kind, data) => {
+      try {
+        if (kind === 'favorites') {
+          const [favoritesRes, summary] = await Promise.all([getFavorites(), getDateSummary()]);
+          setFavorites(new Set(favoritesRes.map((f: Favorite) => f.movie_title)));
+          setDateSummary(summary);
+          return;
+        }
+        if (kind !== 'showtimes' || data.reset || data.movies.length > 0) {
+          // Movie metadata is repeated on every showtime, so reload the list
+          const showtimesRes = await api.get<Showtime[]>('/movies');
+          setShowtimes(showtimesRes.data);
+        } else {
+          const changed: number[] = [...data.inserted, ...data.updated];
+          const rows: Showtime[] = changed.length > 0 ? await getShowtimesByIds(changed) : [];
+          const removed = new Set<number>([...data.deleted, ...data.updated]);
+          setShowtimes(prev => [...prev.filter(st => !removed.has(st.id)), ...rows]
+            .sort((a, b) => a.start_time.localeCompare(b.start_time) || a.id - b.id));
+        }
+        await refreshSummary();
+      } catch (error) {
+        console.error("Failed to apply change", error);
+      }
+    });
+  }, []);
+
   const handleToggleFavorite = useCallback(async (movieTitle: string) => {
     const isFav = favorites.has(movieTitle);
 
@@ -106,18 +163,22 @@ export default function Home() {
     if (isSyncing) return;
     setIsSyncing(true);
     try {
-      await triggerScrape();
-      // Wait a bit for background scrape to start, then poll or just wait
-      // For simplicity, we'll just wait 5 seconds and refresh
-      setTimeout(async () => {
-        const [showtimesRes, statusRes] = await Promise.all([
-          api.get<Showtime[]>('/movies'),
-          getStatus()
-        ]);
-        setShowtimes(showtimesRes.data);
-        setLastScraped(statusRes.last_scrape_time);
-        setIsSyncing(false);
-      }, 5000);
+      const { job_id } = await triggerScrape();
+      // Poll the worker's job until it finishes (give up after ~5 minutes), then refresh
+      for (let attempt = 0; attempt < 150; attempt++) {
+        await new Promise(resolve => setTimeout(resolve, 2000));
+        const job = await getScrapeJob(job_id);
+        if (job.status === 'done' || job.status === 'failed') break;
+      }
+      const [showtimesRes, statusRes, summary] = await Promise.all([
+        api.get<Showtime[]>('/movies'),
+        getStatus(),
+        getDateSummary()
+      ]);
+      setShowtimes(showtimesRes.data);
+      setDateSummary(summary);
+      setLastScraped(statusRes.last_scrape_time);
+      setIsSyncing(false);
     } catch (error) {
       console.error("Sync failed", error);
       setIsSyncing(false);
@@ -135,8 +196,10 @@ export default function Home() {
 
   // Process data for view
   const { dates, favoritesList, otherMovies, cinemas } = useMemo(() => {
-    // Extract unique dates
-    const uniqueDates = Array.from(new Set(showtimes.map(st => st.date_str))).sort();
+    // Dates come from the backend summary; fall back to scanning the showtimes
+    const uniqueDates = dateSummary.length > 0
+      ? dateSummary.map(d => d.date)
+      : Array.from(new Set(showtimes.map(st => st.date_str))).sort();
 
     // Filter by selected date
     const showtimesForDate = showtimes.filter(st => st.date_str === selectedDate);
@@ -161,6 +224,8 @@ export default function Home() {
           genre: st.genre,
           age_restriction: st.age_restriction,
           age_restriction_url: st.age_restriction_url,
+          poster_image: st.poster_image,
+          age_restriction_image: st.age_restriction_image,
           showtimes: [],
           isFavorite: favorites.has(st.movie_title)
         });
@@ -193,7 +258,7 @@ export default function Home() {
       otherMovies: regularMovies.sort(sortFn),
       cinemas: uniqueCinemas
     };
-  }, [showtimes, selectedDate, favorites, selectedCinema]);
+  }, [showtimes, dateSummary, selectedDate, favorites, selectedCinema]);
 
 
   return (
@@ -273,8 +338,22 @@ export default function Home() {
       {/* Content */}
       <div className="max-w-4xl mx-auto px-4 pt-3">
         {loading ? (
-          <div className="flex flex-col items-center justify-center py-20 opacity-50">
-            <div>{dict.common.loading}</div>
+          <div className="flex flex-col gap-4">
+            {dates.length > 0 && (
+              <div className="sticky top-0 z-20 bg-background/80 backdrop-blur-md mb-0 -mx-4 px-4 md:mx-0 md:px-0">
+                <DateTabs
+                  dates={dates}
+                  selectedDate={selectedDate}
+                  onSelectDate={setSelectedDate}
+                  cinemas={cinemas}
+                  selectedCinema={selectedCinema}
+                  onSelectCinema={setSelectedCinema}
+                />
+              </div>
+            )}
+            <div className="flex flex-col items-center justify-center py-20 opacity-50">
+              <div>{dict.common.loading}</div>
+            </div>
           </div>
         ) : (favoritesList.length === 0 && otherMovies.length === 0) ? (
           <div className="text-center py-20 opacity-50">
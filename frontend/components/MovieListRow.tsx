@@ -1,5 +1,6 @@
 import React, { useState } from 'react';
 import { useTranslation } from '@/components/I18nProvider';
+import { imageUrl } from '@/lib/api';
 
 interface Showtime {
     id: number;
@@ -17,6 +18,8 @@ interface Movie {
     genre: string | null;
     age_restriction: string | null;
     age_restriction_url: string | null;
+    poster_image: string | null;
+    age_restriction_image: string | null;
     showtimes: Showtime[];
     isFavorite: boolean;
 }
@@ -102,7 +105,8 @@ export default function MovieListRow({ movie, onToggleFavorite }: MovieListRowPr
                         <div className="w-[100px] h-[150px] relative rounded-md overflow-hidden bg-muted transition-all duration-200 group-hover:scale-105 group-hover:ring-2 group-hover:ring-primary group-hover:ring-offset-2 group-hover:ring-offset-background">
                             {movie.poster_url ? (
                                 <img
-                                    src={movie.poster_url}
+                                    src={imageUrl(movie.poster_image, movie.poster_url) || undefined}
+                                    loading="lazy"
                                     alt={movie.title}
                                     className="w-full h-full object-cover"
                                 />
@@ -137,7 +141,7 @@ export default function MovieListRow({ movie, onToggleFavorite }: MovieListRowPr
                         <div className="flex flex-wrap items-center gap-2">
                             {movie.age_restriction && (
                                 <AgeIcon
-                                    url={movie.age_restriction_url}
+                                    url={imageUrl(movie.age_restriction_image, movie.age_restriction_url)}
                                     age={movie.age_restriction}
                                 />
                             )}
@@ -8,6 +8,26 @@ const api = axios.create({
     },
 });
 
+// Cached thumbnail (poster_image / age_restriction_image) if the backend has one, else the original URL
+export const imageUrl = (image: string | null, url: string | null) =>
+    image ? `/backend/images/${image}.webp` : url;
+
+// Showtimes by id, to apply a change event (repeated ?id=, which axios would send as id[])
+export const getShowtimesByIds = async (ids: number[]) => {
+    const params = new URLSearchParams(ids.map(id => ['id', String(id)]));
+    const response = await api.get('/movies', { params });
+    return response.data;
+};
+
+// Listen to the backend's change stream (Server-Sent Events); returns a function closing it
+export const subscribeToChanges = (onEvent: (kind: string, data: any) => void) => {
+    const source = new EventSource('/backend/events');
+    for (const kind of ['showtimes', 'movies', 'favorites', 'reset']) {
+        source.addEventListener(kind, event => onEvent(kind, JSON.parse((event as MessageEvent).data)));
+    }
+    return () => source.close();
+};
+
 export const getFavorites = async () => {
     const response = await api.get('/favorites');
     return response.data;
@@ -23,6 +43,21 @@ export const removeFavorite = async (movieTitle: string) => {
     return response.data;
 };
 
+export const getDateSummary = async () => {
+    const response = await api.get('/summary');
+    return response.data;
+};
+
+export const searchMovies = async (q: string, limit = 20) => {
+    const response = await api.get('/search', { params: { q, limit } });
+    return response.data;
+};
+
+export const getMovieDetails = async (title: string) => {
+    const response = await api.get('/movies/details', { params: { title } });
+    return response.data;
+};
+
 export const getStatus = async () => {
     const response = await api.get('/status');
     return response.data;
@@ -33,4 +68,9 @@ export const triggerScrape = async () => {
     return response.data;
 };
 
+export const getScrapeJob = async (jobId: number) => {
+    const response = await api.get(`/scrape/jobs/${jobId}`);
+    return response.data;
+};
+
 export default api;